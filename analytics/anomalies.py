@@ -0,0 +1,218 @@
+import numpy as np
+import pandas as pd
+
+# ------------------------
+# Detection Settings
+# ------------------------
+# Metric -> direction that counts as "bad". Sentiment anomalies are drops,
+# toxicity and volume anomalies are rises.
+METRICS = {
+    "avg_sentiment_score": -1,
+    "avg_toxicity_score": 1,
+    "mention_count": 1,
+}
+
+METRIC_SHORT = {
+    "avg_sentiment_score": "sentiment",
+    "avg_toxicity_score": "toxicity",
+    "mention_count": "volume",
+}
+
+BASELINE_WINDOW = 28      # trailing days used as the baseline (excludes today)
+MIN_PERIODS = 7           # baseline days required before a z-score is trusted
+Z_THRESHOLD = 3.0
+
+EWMA_LAMBDA = 0.3         # smoothing for the EWMA control chart
+EWMA_L = 3.0              # control limit width in (asymptotic) sigmas
+
+# Smallest baseline std the EWMA limits use: a flat baseline (e.g. a brand
+# with the same volume every day) would otherwise put the limit on the mean
+STD_FLOOR = {
+    "avg_sentiment_score": 0.05,
+    "avg_toxicity_score": 0.02,
+    "mention_count": 1.0,
+}
+
+SPIKE_RATIO = 3.0         # volume >= 3x baseline mean ...
+MIN_SPIKE_COUNT = 10      # ... and at least this many mentions
+
+_EPS = 1e-9
+
+
+# ------------------------
+# Matrix Construction
+# ------------------------
+def build_matrix(df: pd.DataFrame):
+    """
+    Scatters long-form sentiment_timeseries rows into one dense array.
+
+    Returns (X, present, dates, brands) where X has shape
+    (metrics, days, brands) and `present` marks the (day, brand) cells that
+    have a rollup row. Missing cells are NaN for score metrics. For
+    mention_count they are 0 from the brand's first row on, so a quiet day
+    counts as zero volume, and NaN before it: days before a brand was
+    tracked are not part of its baseline.
+    """
+    day = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]")
+    start = day.min()
+    dates = pd.date_range(start, day.max(), freq="D")
+    t_idx = (day - start).astype(np.int64)
+    b_idx, brands = pd.factorize(df["brand"], sort=True)
+    brands = np.asarray(brands, dtype=object)
+
+    X = np.full((len(METRICS), len(dates), len(brands)), np.nan, dtype=np.float64)
+    for i, metric in enumerate(METRICS):
+        X[i, t_idx, b_idx] = pd.to_numeric(df[metric], errors="coerce").to_numpy(
+            dtype=np.float64, na_value=np.nan
+        )
+
+    present = np.zeros((len(dates), len(brands)), dtype=bool)
+    present[t_idx, b_idx] = True
+
+    vol = list(METRICS).index("mention_count")
+    tracked = np.arange(len(dates))[:, None] >= present.argmax(axis=0)[None, :]
+    X[vol] = np.where(tracked, np.nan_to_num(X[vol], nan=0.0), np.nan)
+
+    return X, present, dates, brands
+
+
+# ------------------------
+# Vectorized Statistics
+# ------------------------
+def trailing_mean_std(X: np.ndarray, window: int, min_periods: int):
+    """
+    Mean / sample std over the previous `window` days (excluding the current
+    day) for every (metric, brand) at once, via cumulative sums along time.
+    NaNs are ignored; cells with fewer than `min_periods` points are NaN.
+    """
+    valid = ~np.isnan(X)
+    x = np.where(valid, X, 0.0)
+
+    pad = np.zeros((X.shape[0], 1, X.shape[2]))
+    cs = np.concatenate([pad, np.cumsum(x, axis=1)], axis=1)
+    cs2 = np.concatenate([pad, np.cumsum(x * x, axis=1)], axis=1)
+    cn = np.concatenate([pad, np.cumsum(valid, axis=1)], axis=1)
+
+    T = X.shape[1]
+    hi = np.arange(T)                        # window ends before day t
+    lo = np.maximum(hi - window, 0)
+
+    s = cs[:, hi] - cs[:, lo]
+    s2 = cs2[:, hi] - cs2[:, lo]
+    n = cn[:, hi] - cn[:, lo]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s / n
+        var = (s2 - n * mean * mean) / (n - 1)
+    std = np.sqrt(np.clip(var, 0.0, None))
+
+    enough = n >= min_periods
+    mean = np.where(enough, mean, np.nan)
+    std = np.where(enough, std, np.nan)
+    return mean, std
+
+
+def ewma(X: np.ndarray, lam: float) -> np.ndarray:
+    """
+    EWMA along the time axis for all (metric, brand) series together.
+    Missing days carry the previous value forward.
+    """
+    out = np.empty_like(X)
+    prev = X[:, 0].copy()
+    out[:, 0] = prev
+    for t in range(1, X.shape[1]):
+        cur = X[:, t]
+        upd = lam * cur + (1.0 - lam) * prev
+        prev = np.where(np.isnan(cur), prev, np.where(np.isnan(prev), cur, upd))
+        out[:, t] = prev
+    return out
+
+
+# ------------------------
+# Detection
+# ------------------------
+def detect_anomalies(
+    df: pd.DataFrame,
+    evaluate_from=None,
+    window: int = BASELINE_WINDOW,
+    min_periods: int = MIN_PERIODS,
+    z_threshold: float = Z_THRESHOLD,
+    ewma_lambda: float = EWMA_LAMBDA,
+    ewma_l: float = EWMA_L,
+    spike_ratio: float = SPIKE_RATIO,
+    min_spike_count: int = MIN_SPIKE_COUNT,
+) -> pd.DataFrame:
+    """
+    Rolling z-scores, EWMA control limits and volume spikes for every brand
+    and metric in one pass over a (metrics, days, brands) matrix.
+
+    `df` is long-form sentiment_timeseries (brand, date + metric columns).
+    Pass `evaluate_from` (a date) to load history for the baseline but only
+    return verdicts for days >= evaluate_from.
+
+    Returns one row per (brand, date) present in `df`:
+    brand, date, anomaly_flag, anomaly_reason.
+    """
+    cols = ["brand", "date", "anomaly_flag", "anomaly_reason"]
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+
+    X, present, dates, brands = build_matrix(df)
+    direction = np.array(list(METRICS.values()), dtype=np.float64)[:, None, None]
+
+    mean, std = trailing_mean_std(X, window, min_periods)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (X - mean) / np.where(std > _EPS, std, np.nan)
+    z_hit = np.nan_to_num(direction * z, nan=0.0) >= z_threshold
+
+    # EWMA chart against the trailing baseline, asymptotic limits
+    E = ewma(X, ewma_lambda)
+    floor = np.array(list(STD_FLOOR.values()), dtype=np.float64)[:, None, None]
+    width = ewma_l * np.fmax(std, floor) * np.sqrt(ewma_lambda / (2.0 - ewma_lambda))
+    with np.errstate(invalid="ignore"):
+        ewma_hit = np.nan_to_num(direction * (E - mean) - width, nan=-1.0) > 0
+
+    vol = list(METRICS).index("mention_count")
+    has_base = ~np.isnan(mean[vol])
+    base = np.nan_to_num(mean[vol], nan=0.0)
+    spike = (
+        has_base
+        & (X[vol] >= min_spike_count)
+        & (X[vol] >= spike_ratio * np.maximum(base, 1.0))
+    )
+
+    hits = z_hit | ewma_hit                              # (metrics, days, brands)
+    flag = hits.any(axis=0) | spike                      # (days, brands)
+
+    # Only days that actually exist in the rollup, and only the requested range
+    if evaluate_from is not None:
+        present[dates < pd.Timestamp(evaluate_from)] = False
+    keep = present.reshape(-1)
+
+    flat_flag = flag.reshape(-1)
+    reasons = np.full(flat_flag.shape, None, dtype=object)
+
+    # Reasons are only built for flagged cells, which are rare
+    names = list(METRICS)
+    for idx in np.flatnonzero(flat_flag & keep):
+        t, b = divmod(idx, len(brands))
+        parts = []
+        for m, metric in enumerate(names):
+            short = METRIC_SHORT[metric]
+            if z_hit[m, t, b]:
+                parts.append(f"{short} z={z[m, t, b]:+.1f}")
+            elif ewma_hit[m, t, b]:
+                parts.append(f"{short} ewma {E[m, t, b]:.2f} vs baseline {mean[m, t, b]:.2f}")
+        if spike[t, b]:
+            parts.append(f"volume spike {X[vol, t, b]:.0f} vs avg {base[t, b]:.1f}")
+        reasons[idx] = "; ".join(parts)
+
+    rows = np.flatnonzero(keep)
+    out = pd.DataFrame({
+        "brand": brands[rows % len(brands)],
+        "date": dates[rows // len(brands)].date,
+        "anomaly_flag": flat_flag[keep],
+        "anomaly_reason": reasons[keep],
+    })
+    return out
@@ -0,0 +1,198 @@
+import string
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# ------------------------
+# c-TF-IDF Settings
+# ------------------------
+TOP_TERMS = 8
+MIN_TERM_COUNT = 3        # occurrences (across all brands) before a term can label a cluster
+MAX_FEATURES = 200_000    # vocabulary cap, most frequent terms kept
+
+# Stripped from token edges; tokens that still contain non-letters
+# (numbers, versions, emoji, URLs) are dropped
+_PUNCTUATION = string.punctuation + "“”‘’…–—"
+
+TextColumn = Union[pa.Array, pa.ChunkedArray, Sequence[str]]
+
+
+def _stop_words(brands: Iterable[str]) -> pa.Array:
+    # Every cluster of a brand mentions the brand, so its name never labels one
+    brand_tokens = {t for b in brands for t in str(b).lower().split()}
+    return pa.array(sorted(ENGLISH_STOP_WORDS | brand_tokens))
+
+
+# ------------------------
+# Tokenization (Arrow kernels, no per-document Python)
+# ------------------------
+def tokenize(texts: pa.Array, stop_words: pa.Array) -> Tuple[np.ndarray, pa.Array]:
+    """
+    Unigrams and adjacent-pair bigrams of already normalized texts.
+    Returns (doc_idx, terms): terms[i] occurs in texts[doc_idx[i]].
+    Bigrams are formed after stop words are removed, like sklearn's
+    CountVectorizer(ngram_range=(1, 2), stop_words=...).
+    """
+    lists = pc.utf8_split_whitespace(texts)
+    doc_idx = pc.list_parent_indices(lists).to_numpy()
+    tokens = pc.utf8_trim(pc.list_flatten(lists), characters=_PUNCTUATION)
+
+    keep = pc.and_(
+        pc.and_(pc.greater_equal(pc.utf8_length(tokens), 2), pc.utf8_is_alpha(tokens)),
+        pc.invert(pc.is_in(tokens, value_set=stop_words)),
+    )
+    tokens = tokens.filter(keep)
+    doc_idx = doc_idx[keep.to_numpy(zero_copy_only=False)]
+
+    same_doc = doc_idx[1:] == doc_idx[:-1]
+    bigrams = pc.binary_join_element_wise(tokens[:-1], tokens[1:], " ").filter(pa.array(same_doc))
+    return (
+        np.concatenate([doc_idx, doc_idx[:-1][same_doc]]),
+        pa.concat_arrays([tokens, bigrams]),
+    )
+
+
+# ------------------------
+# Matrix Construction
+# ------------------------
+def class_term_matrix(texts: pa.Array, class_idx: np.ndarray, n_classes: int,
+                      stop_words: pa.Array) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Term counts summed per class: (n_classes, vocab) CSR, plus the vocab.
+    Identical texts are tokenized once: a (n_classes, n_unique_texts)
+    count matrix times the unique-text/term matrix gives the class totals
+    in one sparse product.
+    """
+    encoded = pc.dictionary_encode(texts)
+    text_idx = encoded.indices.to_numpy()
+    unique_texts = encoded.dictionary
+    n_texts = len(unique_texts)
+
+    classes_by_text = sparse.csr_matrix(
+        (np.ones(len(text_idx), dtype=np.float32), (class_idx, text_idx)),
+        shape=(n_classes, n_texts),
+    )
+
+    doc_idx, terms = tokenize(unique_texts, stop_words)
+    terms = pc.dictionary_encode(terms)
+    term_idx = terms.indices.to_numpy()
+    vocab = terms.dictionary.to_numpy(zero_copy_only=False)
+    text_terms = sparse.csr_matrix(
+        (np.ones(len(term_idx), dtype=np.float32), (doc_idx, term_idx)),
+        shape=(n_texts, len(vocab)),
+    )
+
+    tf = (classes_by_text @ text_terms).tocsc()
+    totals = np.asarray(tf.sum(axis=0)).ravel()
+    keep = np.flatnonzero(totals >= MIN_TERM_COUNT)
+    if len(keep) > MAX_FEATURES:
+        keep = np.sort(keep[np.argsort(-totals[keep], kind="stable")[:MAX_FEATURES]])
+    return tf[:, keep].tocsr(), vocab[keep]
+
+
+def ctfidf(tf: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    Class-based TF-IDF: term frequency within the class (L1-normalized)
+    times log(1 + A / f_t), where f_t is the term's count over all classes
+    and A the average number of terms per class.
+    """
+    class_sizes = np.asarray(tf.sum(axis=1), dtype=np.float64).ravel()
+    term_totals = np.asarray(tf.sum(axis=0), dtype=np.float64).ravel()
+    avg_size = class_sizes.mean() if len(class_sizes) else 0.0
+    idf = np.log1p(avg_size / np.maximum(term_totals, 1.0))
+
+    inv_sizes = np.divide(1.0, class_sizes, out=np.zeros_like(class_sizes), where=class_sizes > 0)
+    return (sparse.diags(inv_sizes) @ tf @ sparse.diags(idf)).tocsr()
+
+
+def top_terms(weights: sparse.csr_matrix, vocab: np.ndarray, top_n: int = TOP_TERMS) -> List[List[str]]:
+    """Highest-weighted terms per row, best first. Reads only each row's nonzeros."""
+    out = []
+    for i in range(weights.shape[0]):
+        lo, hi = weights.indptr[i], weights.indptr[i + 1]
+        data = weights.data[lo:hi]
+        cols = weights.indices[lo:hi]
+        if len(data) > top_n:
+            keep = np.argpartition(-data, top_n)[:top_n]
+            data, cols = data[keep], cols[keep]
+        order = np.argsort(-data, kind="stable")
+        out.append(vocab[cols[order]].tolist())
+    return out
+
+
+# ------------------------
+# Entry Point
+# ------------------------
+def cluster_top_terms(texts: TextColumn, brands: Sequence[str], cluster_ids: Sequence[int],
+                      top_n: int = TOP_TERMS) -> Dict[Tuple[str, int], List[str]]:
+    """
+    c-TF-IDF top terms for every (brand, cluster) in one pass. texts are
+    normalized review bodies (an Arrow column straight from
+    db.copy_reader, or any sequence of str), aligned with brands and
+    cluster_ids. Classes span all brands, so a term common to every
+    cluster everywhere ("app", "bank") scores low while one specific to a
+    cluster ranks high.
+    """
+    if len(texts) == 0:
+        return {}
+
+    if isinstance(texts, pa.ChunkedArray):
+        texts = texts.combine_chunks()
+    elif not isinstance(texts, pa.Array):
+        texts = pa.array(texts, type=pa.string())
+    texts = pc.fill_null(texts, "")
+
+    brands = np.asarray(brands, dtype=object)
+    class_idx, classes = pd.factorize(
+        pd.MultiIndex.from_arrays([brands, np.asarray(cluster_ids, dtype=np.int64)])
+    )
+    tf, vocab = class_term_matrix(texts, class_idx, len(classes), _stop_words(pd.unique(brands)))
+    terms = top_terms(ctfidf(tf), vocab, top_n)
+    return {(b, int(c)): t for (b, c), t in zip(classes, terms)}
+
+
+# ------------------------
+# Exemplars
+# ------------------------
+EXEMPLARS_PER_CLUSTER = 5
+
+
+def centroids(X: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Mean vector per label (row i = label i), via one sparse product."""
+    n_labels = int(labels.max()) + 1 if len(labels) else 0
+    counts = np.bincount(labels, minlength=n_labels).astype(X.dtype)
+    indicator = sparse.csr_matrix(
+        (np.ones(len(labels), dtype=X.dtype), (labels, np.arange(len(labels)))),
+        shape=(n_labels, len(labels)),
+    )
+    return np.asarray(indicator @ X) / np.maximum(counts, 1)[:, None]
+
+
+def assign_nearest(X: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """
+    Row index into centers of each row's nearest center (euclidean), from
+    one matrix product: ||x - c||^2 ranks like ||c||^2 - 2 x.c per row.
+    """
+    scores = (centers ** 2).sum(axis=1) - 2 * (X @ centers.T)
+    return np.argmin(scores, axis=1)
+
+
+def nearest_to_centroid(X: np.ndarray, labels: np.ndarray, centers: np.ndarray,
+                        per_cluster: int = EXEMPLARS_PER_CLUSTER) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row indices of the per_cluster rows closest to their own centroid in
+    each cluster, grouped by label and nearest first, plus those distances.
+    One sort for all clusters: rows are ordered by (label, distance) and
+    each row's rank within its label comes from its group's start offset.
+    """
+    dist = np.linalg.norm(X - centers[labels], axis=1)
+    order = np.lexsort((dist, labels))
+    sorted_labels = labels[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_labels, sorted_labels, side="left")
+    keep = order[rank < per_cluster]
+    return keep, dist[keep]
@@ -0,0 +1,268 @@
+"""
+Columnar per-review feature store.
+
+One row per review with the features ad-hoc analysis keeps re-joining for
+(rating vs. sentiment, version regressions, toxicity by cluster), written as
+hive-partitioned Parquet under FEATURE_STORE_DIR:
+
+    <root>/brand=<brand>/month=<YYYY-MM>/part-<from_raw_id>-<n>.parquet
+
+Materialization is incremental by raw_id range per brand. The materialized
+upper bound is kept in <root>/_state.json and only advanced after the files
+for a range are written; file names are derived from the range start, so a
+rerun after a crash overwrites rather than duplicates.
+
+Rows rescored after they were materialized (mentions_ml.processed_at moves
+on --recompute and on retried scores) are refreshed by rewriting their whole
+brand/month partition (rewrite_partition). <root>/_rescored.json holds the
+newest processed_at the store already reflects.
+
+load_features() reads only the requested columns, prunes brand/month
+directories and uses row-group statistics for the day filter, so a column
+subset never reads the whole dataset.
+"""
+
+import os
+import json
+import shutil
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from observability.instrument import bind_iter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", os.path.join(ROOT, "data", "features"))
+STATE_FILE = "_state.json"
+RESCORED_FILE = "_rescored.json"
+# Partition rewrites are staged here; "_" keeps it out of load_features
+REWRITE_DIR = "_rewrite"
+
+# Rows pulled from Postgres per Arrow record batch
+FETCH_ROWS = 50_000
+
+SCHEMA = pa.schema(
+    [
+        ("raw_id", pa.int64()),
+        ("source", pa.string()),
+        ("created_day", pa.date32()),
+        ("rating", pa.int16()),
+        ("version", pa.string()),
+        ("text_length", pa.int32()),
+        ("token_count", pa.int32()),
+        ("sentiment_label", pa.string()),
+        ("sentiment_score", pa.float32()),
+        ("toxicity_score", pa.float32()),
+        ("escalation_score", pa.float32()),
+        ("cluster_id", pa.int32()),
+        # Partition columns
+        ("brand", pa.string()),
+        ("month", pa.string()),
+    ]
+)
+
+PARTITIONING = ds.partitioning(
+    pa.schema([("brand", pa.string()), ("month", pa.string())]),
+    flavor="hive",
+)
+
+FEATURE_COLUMNS = [f.name for f in SCHEMA if f.name not in ("brand", "month")]
+
+
+# ------------------------
+# State
+# ------------------------
+def load_state(root: str = FEATURE_STORE_DIR) -> Dict[str, int]:
+    """{brand: highest raw_id materialized}."""
+    path = os.path.join(root, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _replace_json(root: str, name: str, data):
+    os.makedirs(root, exist_ok=True)
+    tmp = os.path.join(root, name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(root, name))
+
+
+def save_state(state: Dict[str, int], root: str = FEATURE_STORE_DIR):
+    _replace_json(root, STATE_FILE, state)
+
+
+def load_rescored_through(root: str = FEATURE_STORE_DIR) -> Optional[datetime]:
+    """Newest mentions_ml.processed_at reflected in the store, or None for a new store."""
+    path = os.path.join(root, RESCORED_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return datetime.fromisoformat(json.load(f)["processed_at"])
+
+
+def save_rescored_through(ts: datetime, root: str = FEATURE_STORE_DIR):
+    _replace_json(root, RESCORED_FILE, {"processed_at": ts.isoformat()})
+
+
+# ------------------------
+# Materialization
+# ------------------------
+def fetch_feature_batches(conn, brand: str, after: int, upto: int,
+                          fetch_rows: int = FETCH_ROWS,
+                          month: Optional[str] = None) -> Iterable[pa.RecordBatch]:
+    """
+    Streams features for brand with after < raw_id <= upto from a server-side
+    cursor, as Arrow record batches in SCHEMA order. month ("YYYY-MM")
+    restricts them to one partition.
+    """
+    params = [brand, after, upto]
+    month_filter = ""
+    if month is not None:
+        month_filter = """
+              AND mr.created_utc >= %s::date
+              AND mr.created_utc < %s::date + INTERVAL '1 month'"""
+        params += [f"{month}-01", f"{month}-01"]
+
+    with conn.cursor(name="feature_store_fetch") as cur:
+        cur.itersize = fetch_rows
+        cur.execute(
+            f"""
+            SELECT
+                mr.raw_id,
+                mr.source,
+                mr.created_utc::date,
+                mr.rating,
+                mr.version,
+                COALESCE(length(mr.body), 0),
+                mr.token_count,
+                ml.sentiment_label,
+                ml.sentiment_score::float8,
+                ml.toxicity_score::float8,
+                ml.escalation_score::float8,
+                rc.cluster_id,
+                mr.brand,
+                to_char(mr.created_utc, 'YYYY-MM')
+            FROM mentions_raw mr
+            LEFT JOIN mentions_ml ml ON ml.raw_id = mr.raw_id
+            LEFT JOIN review_clusters rc ON rc.raw_id = mr.raw_id
+            WHERE mr.brand = %s
+              AND mr.raw_id > %s
+              AND mr.raw_id <= %s{month_filter}
+            ORDER BY mr.raw_id;
+            """,
+            params,
+        )
+        while True:
+            rows = cur.fetchmany(fetch_rows)
+            if not rows:
+                return
+            columns = list(zip(*rows))
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(col, type=f.type) for col, f in zip(columns, SCHEMA)],
+                schema=SCHEMA,
+            )
+
+
+def write_features(batches: Iterable[pa.RecordBatch], after: int,
+                   root: str = FEATURE_STORE_DIR) -> int:
+    """Writes one raw_id range into the partitioned dataset. Returns rows written."""
+    written = 0
+
+    def counted():
+        nonlocal written
+        for batch in batches:
+            written += batch.num_rows
+            yield batch
+
+    # write_dataset drains the iterator on an Arrow thread
+    ds.write_dataset(
+        bind_iter(counted()),
+        root,
+        schema=SCHEMA,
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"part-{after}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return written
+
+
+def rewrite_partition(batches: Iterable[pa.RecordBatch], root: str = FEATURE_STORE_DIR) -> int:
+    """
+    Replaces the brand/month partition the batches belong to (one partition:
+    see fetch_feature_batches(month=...)) with their rows. The files are
+    written to REWRITE_DIR first and swapped in, named as a range starting
+    at 0 so later appended ranges never collide with them. Returns rows written.
+    """
+    staging = os.path.join(root, REWRITE_DIR)
+    shutil.rmtree(staging, ignore_errors=True)
+    written = write_features(batches, 0, staging)
+    if written:
+        # Exactly one brand=<...>/month=<...> directory, named by the writer
+        brand_dir = os.listdir(staging)[0]
+        month_dir = os.listdir(os.path.join(staging, brand_dir))[0]
+        target = os.path.join(root, brand_dir, month_dir)
+        shutil.rmtree(target, ignore_errors=True)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(os.path.join(staging, brand_dir, month_dir), target)
+    shutil.rmtree(staging, ignore_errors=True)
+    return written
+
+
+# ------------------------
+# Loading
+# ------------------------
+def load_features(columns: Optional[List[str]] = None, brands: Optional[List[str]] = None,
+                  start: Optional[date] = None, end: Optional[date] = None,
+                  as_numpy: bool = False, root: str = FEATURE_STORE_DIR
+                  ) -> Union[pa.Table, Dict[str, np.ndarray]]:
+    """
+    Reads a column subset of the feature table.
+
+    brands prunes partition directories; start/end (inclusive days) are
+    pushed down to Parquet row-group statistics. Returns an Arrow table, or
+    {column: ndarray} with as_numpy=True (nulls become NaN for numeric
+    columns, None for strings).
+    """
+    columns = columns or FEATURE_COLUMNS + ["brand"]
+    if not os.path.isdir(root):
+        table = SCHEMA.empty_table().select(columns)
+    else:
+        dataset = ds.dataset(root, schema=SCHEMA, format="parquet", partitioning=PARTITIONING,
+                             exclude_invalid_files=True, ignore_prefixes=["_", "."])
+
+        filters = []
+        if brands:
+            filters.append(ds.field("brand").isin([b.lower() for b in brands]))
+        if start is not None:
+            filters.append(ds.field("created_day") >= pa.scalar(start, pa.date32()))
+            filters.append(ds.field("month") >= start.strftime("%Y-%m"))
+        if end is not None:
+            filters.append(ds.field("created_day") <= pa.scalar(end, pa.date32()))
+            filters.append(ds.field("month") <= end.strftime("%Y-%m"))
+
+        expr = None
+        for f in filters:
+            expr = f if expr is None else expr & f
+        table = dataset.to_table(columns=columns, filter=expr)
+
+    if not as_numpy:
+        return table
+
+    out = {}
+    for name in columns:
+        col = table.column(name)
+        if pa.types.is_integer(col.type) or pa.types.is_floating(col.type):
+            if col.null_count:
+                col = pc.cast(col, pa.float64())
+            out[name] = col.to_numpy(zero_copy_only=False)
+        else:
+            out[name] = np.asarray(col.to_pylist(), dtype=object)
+    return out
@@ -3,6 +3,7 @@ from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 import numpy as np
 import re
+from typing import List, NamedTuple, Optional, Sequence
 
 # ------------------------
 # Light Text Normalization
@@ -36,10 +37,17 @@ def vader_sentiment(text: str) -> float:
     return _vader.polarity_scores(text)["compound"]  # [-1, 1]
 
 
+def vader_sentiment_batch(texts: List[str], normalized: bool = False) -> List[float]:
+    if not normalized:
+        texts = [normalize_text(t) for t in texts]
+    return [_vader.polarity_scores(t)["compound"] if t else 0.0 for t in texts]
+
+
 # ------------------------
 # Transformer: RoBERTa
 # ------------------------
 _MODEL = "cardiffnlp/twitter-roberta-base-sentiment"
+SENTIMENT_MODEL = _MODEL
 _tokenizer = AutoTokenizer.from_pretrained(_MODEL)
 _model = AutoModelForSequenceClassification.from_pretrained(_MODEL)
 _model.eval()
@@ -50,8 +58,11 @@ LABEL_MAP = {
     2: 1.0    # positive
 }
 
-def transformer_sentiment(text: str) -> float:
-    text = normalize_text(text)
+def transformer_sentiment(text: str, normalized: bool = False) -> float:
+    # normalized=True: text is already normalize_text output (e.g. the
+    # ingest-time mentions_raw.normalized_text column)
+    if not normalized:
+        text = normalize_text(text)
     if not text:
         return 0.0
 
@@ -70,21 +81,87 @@ def transformer_sentiment(text: str) -> float:
     return float(np.dot(probs, [-1.0, 0.0, 1.0]))
 
 
+def transformer_sentiment_batch(texts: List[str], normalized: bool = False,
+                                batch_size: int = 32) -> List[float]:
+    """
+    transformer_sentiment for many texts, batch_size per forward pass.
+    Texts are grouped by length so each batch pads to a similar length.
+    """
+    if not normalized:
+        texts = [normalize_text(t) for t in texts]
+
+    scores = [0.0] * len(texts)
+    order = sorted((i for i, t in enumerate(texts) if t), key=lambda i: len(texts[i]))
+    polarity = torch.tensor([-1.0, 0.0, 1.0])
+
+    for start in range(0, len(order), batch_size):
+        idx = order[start : start + batch_size]
+        inputs = _tokenizer(
+            [texts[i] for i in idx],
+            truncation=True,
+            padding=True,
+            return_tensors="pt"
+        )
+        with torch.no_grad():
+            probs = torch.softmax(_model(**inputs).logits, dim=1)
+        for i, score in zip(idx, (probs @ polarity).tolist()):
+            scores[i] = float(score)
+    return scores
+
+
 # ------------------------
 # Rating + Text Fusion
 # ------------------------
+# Part of the scoring config version stored with every mentions_ml row
+TEXT_WEIGHT = 0.7
+RATING_WEIGHT = 0.3
+LABEL_THRESHOLD = 0.2
+
 def combine_sentiment(text_score: float, rating: int | None) -> float:
     if rating is None:
         return text_score
 
     # Maps rating 1–5 → [-1, 1]
     rating_norm = (rating - 3) / 2
-    return 0.7 * text_score + 0.3 * rating_norm
+    return TEXT_WEIGHT * text_score + RATING_WEIGHT * rating_norm
 
 
 def sentiment_label(score: float) -> str:
-    if score > 0.2:
+    if score > LABEL_THRESHOLD:
         return "positive"
-    if score < -0.2:
+    if score < -LABEL_THRESHOLD:
         return "negative"
     return "neutral"
+
+
+# ------------------------
+# Cascade: VADER first, RoBERTa for the hard cases
+# ------------------------
+VADER_MODEL = "vaderSentiment"
+
+# |VADER compound| below this is too weak to trust on its own
+CASCADE_AMBIGUOUS_BAND = 0.35
+# Max distance between VADER and the rating mapped to [-1, 1] before the
+# two are considered to disagree
+CASCADE_MAX_RATING_GAP = 1.0
+
+
+class CascadeThresholds(NamedTuple):
+    ambiguous_band: float = CASCADE_AMBIGUOUS_BAND
+    max_rating_gap: float = CASCADE_MAX_RATING_GAP
+
+
+def cascade_route(vader_scores: Sequence[float], ratings: Sequence[Optional[int]],
+                  thresholds: CascadeThresholds) -> np.ndarray:
+    """
+    True where a review needs the transformer: VADER is inside the ambiguous
+    band, or a star rating is present and VADER disagrees with it.
+    """
+    v = np.asarray(vader_scores, dtype=np.float64)
+    r = np.array([np.nan if x is None else x for x in ratings], dtype=np.float64)
+    has_rating = ~np.isnan(r)
+    rating_norm = np.where(has_rating, (r - 3) / 2, v)
+
+    ambiguous = np.abs(v) < thresholds.ambiguous_band
+    disagree = has_rating & (np.abs(v - rating_norm) > thresholds.max_rating_gap)
+    return ambiguous | disagree
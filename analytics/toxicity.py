@@ -19,22 +19,46 @@ TOXIC_KEYWORDS = [
     "unworthy"
 ]
 
-def toxicity_score(text: str) -> float:
+# Keyword hits that saturate toxicity at 1.0
+TOXICITY_SATURATION_HITS = 3
+
+ESCALATION_TOXICITY = 0.65
+ESCALATION_SENTIMENT = -0.5
+ESCALATION_KEYWORDS = ["refund", "fraud", "scam", "lawsuit"]
+ESCALATION_MIN_SIGNALS = 2
+
+
+def toxicity_config() -> dict:
+    """The rules above, as stamped into mentions_ml.scoring_config."""
+    return {
+        "toxic_keywords": sorted(TOXIC_KEYWORDS),
+        "toxicity_saturation_hits": TOXICITY_SATURATION_HITS,
+        "escalation_toxicity": ESCALATION_TOXICITY,
+        "escalation_sentiment": ESCALATION_SENTIMENT,
+        "escalation_keywords": sorted(ESCALATION_KEYWORDS),
+        "escalation_min_signals": ESCALATION_MIN_SIGNALS,
+    }
+
+
+def toxicity_score(text: str, normalized: bool = False) -> float:
     if not text:
         return 0.0
 
-    text = text.lower()
+    if not normalized:
+        text = text.lower()
     hits = sum(1 for kw in TOXIC_KEYWORDS if kw in text)
-    return min(hits / 3, 1.0)  # cap at 1.0
+    return min(hits / TOXICITY_SATURATION_HITS, 1.0)  # cap at 1.0
 
-def escalation_flag(sentiment_score: float, toxicity: float, text: str) -> bool:
+def escalation_flag(sentiment_score: float, toxicity: float, text: str, normalized: bool = False) -> bool:
     signals = 0
+    if not normalized:
+        text = text.lower()
 
-    if toxicity >= 0.65:
+    if toxicity >= ESCALATION_TOXICITY:
         signals += 1
-    if sentiment_score <= -0.5:
+    if sentiment_score <= ESCALATION_SENTIMENT:
         signals += 1
-    if any(kw in text.lower() for kw in ["refund", "fraud", "scam", "lawsuit"]):
+    if any(kw in text for kw in ESCALATION_KEYWORDS):
         signals += 1
 
-    return signals >= 2
+    return signals >= ESCALATION_MIN_SIGNALS
@@ -0,0 +1,12 @@
+import json
+import hashlib
+
+
+def config_version(config: dict) -> str:
+    """
+    Short stable id for a scoring config (mentions_ml.scoring_config):
+    its revision plus a hash of the canonical JSON. Kept free of model
+    imports so jobs that only restamp versions do not load the transformer.
+    """
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"r{config['revision']}-{digest[:10]}"
@@ -0,0 +1,183 @@
+"""
+Dashboard read model.
+
+Fetches every per-brand dashboard panel in ONE round trip: each panel is a
+CTE aggregated to JSON, and the outer SELECT returns a single row with one
+JSON column per panel. Over a WAN link to Supabase that is one RTT instead
+of one per panel.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict
+
+import pandas as pd
+
+RECENT_LIMIT = 20
+NEGATIVE_LIMIT = 5
+TREND_DAYS = 90
+
+DASHBOARD_SQL = """
+WITH
+recent AS (
+    SELECT created_utc, author, rating, body, version
+    FROM mentions_raw
+    WHERE source = 'google_play'
+      AND brand = %(brand)s
+    ORDER BY created_utc DESC
+    LIMIT %(recent_limit)s
+),
+sentiment AS (
+    SELECT sentiment_label, COUNT(*) AS count
+    FROM mentions_ml
+    WHERE brand = %(brand)s
+    GROUP BY sentiment_label
+),
+trend AS (
+    SELECT date, mention_count, avg_sentiment_score, avg_toxicity_score,
+           anomaly_flag, anomaly_reason
+    FROM sentiment_timeseries
+    WHERE brand = %(brand)s
+      AND date >= CURRENT_DATE - %(trend_days)s
+),
+worst AS (
+    SELECT raw_id, sentiment_score, toxicity_score
+    FROM mentions_ml
+    WHERE brand = %(brand)s
+      AND sentiment_score IS NOT NULL
+    ORDER BY sentiment_score ASC
+    LIMIT %(negative_limit)s
+),
+negative AS (
+    SELECT r.created_utc, r.body, w.sentiment_score, w.toxicity_score
+    FROM worst w
+    JOIN mentions_raw r ON r.raw_id = w.raw_id
+),
+cluster_stats AS (
+    SELECT rc.cluster_id,
+           COUNT(*) AS review_count,
+           AVG(ml.sentiment_score) AS avg_sentiment
+    FROM review_clusters rc
+    LEFT JOIN mentions_ml ml ON ml.raw_id = rc.raw_id AND ml.brand = rc.brand
+    WHERE rc.brand = %(brand)s
+    GROUP BY rc.cluster_id
+),
+clusters AS (
+    SELECT c.cluster_id, c.review_count, c.avg_sentiment, cs.top_terms
+    FROM cluster_stats c
+    LEFT JOIN cluster_summaries cs
+      ON cs.brand = %(brand)s AND cs.cluster_id = c.cluster_id
+),
+insights AS (
+    SELECT cluster_id, primary_issue, summary, trend_label, user_impact,
+           count_last_7d, count_prev_7d, delta_count
+    FROM cluster_insights
+    WHERE brand = %(brand)s
+      AND (window_end, generated_at) = (
+        -- Newest window, then its newest generation (backfills write many windows at once)
+        SELECT window_end, generated_at
+        FROM cluster_insights
+        WHERE brand = %(brand)s
+        ORDER BY window_end DESC, generated_at DESC
+        LIMIT 1
+      )
+)
+SELECT
+    (SELECT COALESCE(json_agg(recent ORDER BY created_utc DESC), '[]') FROM recent)          AS recent,
+    (SELECT COALESCE(json_agg(sentiment), '[]') FROM sentiment)                               AS sentiment,
+    (SELECT COALESCE(json_agg(trend ORDER BY date), '[]') FROM trend)                         AS trend,
+    (SELECT COALESCE(json_agg(negative ORDER BY sentiment_score), '[]') FROM negative)        AS negative,
+    (SELECT COALESCE(json_agg(clusters ORDER BY review_count DESC), '[]') FROM clusters)      AS clusters,
+    (SELECT COALESCE(json_agg(insights ORDER BY
+        (trend_label = 'growing') DESC,
+        (user_impact = 'high') DESC,
+        delta_count DESC), '[]') FROM insights)                                             AS insights;
+"""
+
+# Panel -> ordered column dtypes. Empty panels still get the right columns.
+PANEL_SCHEMAS: Dict[str, Dict[str, str]] = {
+    "recent": {
+        "created_utc": "datetime64[ns]",
+        "author": "string",
+        "rating": "Int64",
+        "body": "string",
+        "version": "string",
+    },
+    "sentiment": {
+        "sentiment_label": "string",
+        "count": "Int64",
+    },
+    "trend": {
+        "date": "datetime64[ns]",
+        "mention_count": "Int64",
+        "avg_sentiment_score": "float64",
+        "avg_toxicity_score": "float64",
+        "anomaly_flag": "boolean",
+        "anomaly_reason": "string",
+    },
+    "negative": {
+        "created_utc": "datetime64[ns]",
+        "body": "string",
+        "sentiment_score": "float64",
+        "toxicity_score": "float64",
+    },
+    "clusters": {
+        "cluster_id": "Int64",
+        "review_count": "Int64",
+        "avg_sentiment": "float64",
+        "top_terms": "string",
+    },
+    "insights": {
+        "cluster_id": "Int64",
+        "primary_issue": "string",
+        "summary": "string",
+        "trend_label": "string",
+        "user_impact": "string",
+        "count_last_7d": "Int64",
+        "count_prev_7d": "Int64",
+        "delta_count": "Int64",
+    },
+}
+
+
+@dataclass
+class DashboardPanels:
+    recent: pd.DataFrame
+    sentiment: pd.DataFrame
+    trend: pd.DataFrame
+    negative: pd.DataFrame
+    clusters: pd.DataFrame
+    insights: pd.DataFrame
+
+
+def to_frame(records, schema: Dict[str, str]) -> pd.DataFrame:
+    if isinstance(records, str):
+        records = json.loads(records)
+    df = pd.DataFrame.from_records(records or [], columns=list(schema))
+    for col, dtype in schema.items():
+        if dtype.startswith("datetime"):
+            df[col] = pd.to_datetime(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def fetch_dashboard(conn, brand: str) -> DashboardPanels:
+    """
+    All dashboard panels for one brand, in a single query.
+    """
+    params = {
+        "brand": brand.lower(),
+        "recent_limit": RECENT_LIMIT,
+        "negative_limit": NEGATIVE_LIMIT,
+        "trend_days": TREND_DAYS,
+    }
+    with conn.cursor() as cur:
+        cur.execute(DASHBOARD_SQL, params)
+        cols = [d[0] for d in cur.description]
+        row = dict(zip(cols, cur.fetchone()))
+
+    return DashboardPanels(**{
+        panel: to_frame(row[panel], schema)
+        for panel, schema in PANEL_SCHEMAS.items()
+    })
@@ -0,0 +1,153 @@
+"""
+Review explorer read model.
+
+Searches and filters one brand's reviews, newest first, a page at a time:
+
+- full-text search over mentions_raw.body_tsv (GIN index, migration 0014)
+  with websearch_to_tsquery, so "login -password" and quoted phrases work
+- filters on rating, app version, sentiment label and cluster; a cluster
+  filter drives the query from review_clusters' (brand, cluster_id)
+  index, so a small cluster is not found by walking the whole brand
+- keyset pagination on (created_utc, raw_id): the next page starts strictly
+  after the last row of this one, so deep pages cost the same as the first
+  and rows inserted meanwhile never shift or repeat a page (no OFFSET)
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+PAGE_SIZE = 25
+TS_CONFIG = "english"
+
+# (created_utc, raw_id) of the last row shown
+Cursor = Tuple[datetime, int]
+
+PAGE_SCHEMA: Dict[str, str] = {
+    "created_utc": "datetime64[ns]",
+    "raw_id": "Int64",
+    "rating": "Int64",
+    "version": "string",
+    "sentiment_label": "string",
+    "sentiment_score": "float64",
+    "cluster_id": "Int64",
+    "body": "string",
+}
+
+
+@dataclass(frozen=True)
+class ExplorerFilters:
+    """Empty fields do not filter. Frozen so it can be part of a cache key."""
+    query: str = ""
+    ratings: Tuple[int, ...] = ()
+    versions: Tuple[str, ...] = ()
+    sentiment_labels: Tuple[str, ...] = ()
+    cluster_ids: Tuple[int, ...] = ()
+
+
+@dataclass
+class ReviewPage:
+    rows: pd.DataFrame
+    # Pass back to fetch_review_page for the next page; None on the last page
+    next_cursor: Optional[Cursor]
+
+
+_FROM_MENTIONS = """FROM mentions_raw r
+    LEFT JOIN mentions_ml ml ON ml.raw_id = r.raw_id
+    LEFT JOIN review_clusters rc ON rc.raw_id = r.raw_id"""
+
+# Cluster filter: members from idx_review_clusters_brand_cluster (covering
+# raw_id), then their rows, instead of walking the brand newest-first
+_FROM_CLUSTERS = """FROM review_clusters rc
+    JOIN mentions_raw r ON r.raw_id = rc.raw_id
+    LEFT JOIN mentions_ml ml ON ml.raw_id = r.raw_id"""
+
+
+def build_explorer_query(
+    brand: str,
+    filters: ExplorerFilters,
+    cursor: Optional[Cursor] = None,
+    page_size: int = PAGE_SIZE,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    SQL and parameters for one page. Only the active filters become
+    predicates, so the planner sees a plain keyset range scan (or a GIN
+    bitmap scan for searches) rather than "x = ANY(...) OR nothing" guards.
+    """
+    where = ["r.brand = %(brand)s"]
+    params: Dict[str, Any] = {"brand": brand.lower(), "limit": page_size + 1, "ts_config": TS_CONFIG}
+
+    if filters.query.strip():
+        where.append("r.body_tsv @@ websearch_to_tsquery(%(ts_config)s::regconfig, %(query)s)")
+        params["query"] = filters.query.strip()
+    if filters.ratings:
+        where.append("r.rating = ANY(%(ratings)s)")
+        params["ratings"] = list(filters.ratings)
+    if filters.versions:
+        where.append("r.version = ANY(%(versions)s)")
+        params["versions"] = list(filters.versions)
+    if filters.sentiment_labels:
+        where.append("ml.sentiment_label = ANY(%(sentiment_labels)s)")
+        params["sentiment_labels"] = list(filters.sentiment_labels)
+    if filters.cluster_ids:
+        where.append("rc.brand = %(brand)s AND rc.cluster_id = ANY(%(cluster_ids)s)")
+        params["cluster_ids"] = list(filters.cluster_ids)
+    source = _FROM_CLUSTERS if filters.cluster_ids else _FROM_MENTIONS
+    if cursor is not None:
+        where.append("(r.created_utc, r.raw_id) < (%(cursor_created_utc)s, %(cursor_raw_id)s)")
+        params["cursor_created_utc"], params["cursor_raw_id"] = cursor
+
+    q = f"""
+    SELECT
+        r.created_utc,
+        r.raw_id,
+        r.rating,
+        r.version,
+        ml.sentiment_label,
+        ml.sentiment_score,
+        rc.cluster_id,
+        r.body
+    {source}
+    WHERE {" AND ".join(where)}
+    ORDER BY r.created_utc DESC, r.raw_id DESC
+    LIMIT %(limit)s;
+    """
+    return q, params
+
+
+def to_page_frame(records: List[tuple], columns: List[str]) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(records, columns=columns)
+    for col, dtype in PAGE_SCHEMA.items():
+        if dtype.startswith("datetime"):
+            df[col] = pd.to_datetime(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+    return df[list(PAGE_SCHEMA)]
+
+
+def fetch_review_page(
+    conn,
+    brand: str,
+    filters: ExplorerFilters,
+    cursor: Optional[Cursor] = None,
+    page_size: int = PAGE_SIZE,
+) -> ReviewPage:
+    """
+    One page of matching reviews, newest first, starting after cursor.
+    Reads page_size + 1 rows to learn whether another page exists.
+    """
+    q, params = build_explorer_query(brand, filters, cursor, page_size)
+    with conn.cursor() as cur:
+        cur.execute(q, params)
+        cols = [d[0] for d in cur.description]
+        records = cur.fetchall()
+
+    has_more = len(records) > page_size
+    records = records[:page_size]
+    next_cursor = None
+    if has_more:
+        last = dict(zip(cols, records[-1]))
+        next_cursor = (last["created_utc"], last["raw_id"])
+    return ReviewPage(rows=to_page_frame(records, cols), next_cursor=next_cursor)
@@ -32,8 +32,14 @@ conn = get_db_connection()
 # ------------------------------------------------
 # INGESTION IMPORTS
 # ------------------------------------------------
-from ingestion.load_to_db import insert_mentions
-from ingestion.reviews.google_play import fetch_google_play_reviews
+from ingestion.jobs import IngestionQueue
+from app.read_model import DashboardPanels, fetch_dashboard
+from app.review_explorer import ExplorerFilters, ReviewPage, fetch_review_page
+
+@st.cache_resource
+def get_ingestion_queue():
+    # Shared by every session, so duplicate requests coalesce across users
+    return IngestionQueue(max_workers=2)
 
 # ------------------------------------------------
 # BRAND → APP ID MAPPING
@@ -46,73 +52,73 @@ GOOGLE_PLAY_APPS = {
 }
 
 # ------------------------------------------------
-# CLUSTER HELPERS (DAY 4)
+# DATA VERSION (cache key)
 # ------------------------------------------------
-def fetch_clusters(conn, brand: str):
-    q = """
-    SELECT
-        rc.cluster_id,
-        COUNT(*) AS review_count,
-        AVG(ml.sentiment_score) AS avg_sentiment
-    FROM review_clusters rc
-    JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
-    LEFT JOIN mentions_ml ml ON ml.raw_id = rc.raw_id
-    WHERE mr.brand = %s
-    GROUP BY rc.cluster_id
-    ORDER BY review_count DESC;
-    """
+# Cached panels below are keyed by (brand, version). The version is a tuple of
+# cheap index-backed MAX() lookups, so a rerun costs one round trip until the
+# underlying tables actually change.
+DATA_VERSION_SQL = """
+SELECT
+    (SELECT MAX(raw_id) FROM mentions_raw)                          AS raw_version,
+    (SELECT MAX(processed_at) FROM mentions_ml)                     AS ml_version,
+    (SELECT MAX(clustered_at) FROM review_clusters)                 AS cluster_version,
+    (SELECT MAX(updated_at) FROM cluster_summaries WHERE brand = %s)  AS summaries_version,
+    (SELECT MAX(generated_at) FROM cluster_insights WHERE brand = %s) AS insights_version,
+    (SELECT MAX(updated_at) FROM sentiment_timeseries WHERE brand = %s) AS trend_version;
+"""
+
+CACHE_MAX_ENTRIES = 64
+
+
+def fetch_data_version(conn, brand: str) -> dict:
     with conn.cursor() as cur:
-        cur.execute(q, (brand.lower(),))
-        return cur.fetchall()
+        cur.execute(DATA_VERSION_SQL, (brand.lower(), brand.lower(), brand.lower()))
+        cols = [d[0] for d in cur.description]
+        return dict(zip(cols, cur.fetchone()))
 
 
+# ------------------------------------------------
+# CACHED PANELS
+# ------------------------------------------------
+# Version arguments are unused in the body; they only participate in the
+# st.cache_data key so stale frames are dropped when data changes.
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def load_dashboard(brand: str, version: tuple) -> DashboardPanels:
+    # One round trip for every panel (see app/read_model.py)
+    return fetch_dashboard(get_db_connection(), brand)
+
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES * 4)
+def load_review_page(brand: str, filters: ExplorerFilters, cursor, raw_version, ml_version, cluster_version) -> ReviewPage:
+    # Keyset page (see app/review_explorer.py); filters and cursor are hashable
+    return fetch_review_page(get_db_connection(), brand, filters, cursor)
+
+
+# ------------------------------------------------
+# CLUSTER HELPERS (DAY 4)
+# ------------------------------------------------
 def fetch_cluster_examples(conn, brand: str, cluster_id: int, limit: int = 5):
+    # Representative (centroid-nearest) reviews precomputed by the clustering
+    # job: a primary-key range scan plus one mentions_ml lookup per example
     q = """
     SELECT
-        mr.body,
+        ce.body,
         ml.sentiment_score
-    FROM review_clusters rc
-    JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
-    JOIN mentions_ml ml ON ml.raw_id = mr.raw_id
-    WHERE mr.brand = %s
-      AND rc.cluster_id = %s
-    ORDER BY ml.sentiment_score ASC
+    FROM cluster_exemplars ce
+    LEFT JOIN mentions_ml ml ON ml.raw_id = ce.raw_id
+    WHERE ce.brand = %s
+      AND ce.cluster_id = %s
+    ORDER BY ce.rank
     LIMIT %s;
     """
     with conn.cursor() as cur:
         cur.execute((q), (brand.lower(), cluster_id, limit))
         return cur.fetchall()
 
-# ------------------------------------------------
-# CLUSTER INSIGHTS (DAY 5)
-# ------------------------------------------------
-def fetch_emerging_issues(conn, brand: str):
-    """
-    Pulls latest materialized cluster insights.
-    """
-    q = """
-    SELECT
-        cluster_id,
-        primary_issue,
-        summary,
-        trend_label,
-        user_impact,
-        count_last_7d,
-        count_prev_7d,
-        delta_count
-    FROM cluster_insights
-    WHERE brand = %s
-      AND generated_at = (
-        SELECT MAX(generated_at)
-        FROM cluster_insights
-        WHERE brand = %s
-      )
-    ORDER BY
-        (trend_label = 'growing') DESC,
-        (user_impact = 'high') DESC,
-        delta_count DESC;
-    """
-    return pd.read_sql(q, conn, params=(brand.lower(), brand.lower()))
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES * 4)
+def load_cluster_examples(brand: str, cluster_id: int, cluster_version, summaries_version, ml_version):
+    return fetch_cluster_examples(get_db_connection(), brand, cluster_id)
 
 # ------------------------------------------------
 # UI HEADER
@@ -125,97 +131,155 @@ app_id = GOOGLE_PLAY_APPS[brand]
 st.caption(f"Source: Google Play reviews · App ID: `{app_id}`")
 
 # ------------------------------------------------
-# INGESTION BUTTON
+# INGESTION (background worker, never blocks the page)
 # ------------------------------------------------
-if st.button("Fetch latest Google Play reviews"):
-    with st.spinner("Fetching reviews from Google Play..."):
-        rows, _ = fetch_google_play_reviews(
-            app_id=app_id,
-            brand=brand,
-            limit=30
-        )
-
-    if not rows:
-        st.warning(
-            "Live reviews unavailable right now. "
-            "Showing cached reviews instead."
-        )
+def render_ingestion_status(queue: IngestionQueue, app_id: str):
+    job = queue.latest(app_id)
+    if job is None:
+        return
+
+    if job.active:
+        st.progress(job.progress, text=job.message)
+    elif job.state == "failed":
+        st.error(f"{job.message}: {job.error}")
+    elif job.inserted:
+        st.success(job.message)
     else:
-        insert_mentions(rows)
-        st.success(f"Inserted {len(rows)} new reviews.")
+        st.info(job.message)
+
+    # Once a job finishes, rerun the full page so panels pick up new data
+    seen_key = f"ingest_seen_{job.job_id}"
+    if not job.active and st.session_state.get(seen_key) is False:
+        st.session_state[seen_key] = True
+        st.rerun()
+    elif job.active:
+        st.session_state.setdefault(seen_key, False)
+
+
+ingestion_queue = get_ingestion_queue()
+
+if st.button("Fetch latest Google Play reviews"):
+    ingestion_queue.submit(app_id=app_id, brand=brand, limit=30)
+
+current_job = ingestion_queue.latest(app_id)
+st.fragment(
+    render_ingestion_status,
+    run_every=2 if current_job is not None and current_job.active else None,
+)(ingestion_queue, app_id)
+
+# ------------------------------------------------
+# DATA VERSION (one cheap round trip per rerun)
+# ------------------------------------------------
+version = fetch_data_version(conn, brand)
+panels = load_dashboard(brand, tuple(version.values()))
 
 # ------------------------------------------------
 # RECENT REVIEWS
 # ------------------------------------------------
 st.subheader("Recent Reviews")
 
-df = pd.read_sql(
-    """
-    SELECT
-        created_utc,
-        author,
-        rating,
-        body,
-        version
-    FROM mentions_raw
-    WHERE source = 'google_play'
-      AND brand = %s
-    ORDER BY created_utc DESC
-    LIMIT 20
-    """,
-    conn,
-    params=(brand.lower(),),
-)
+df = panels.recent
 
 st.dataframe(df, use_container_width=True)
 
+# ------------------------------------------------
+# REVIEW EXPLORER (full-text search, keyset pages)
+# ------------------------------------------------
+st.subheader("🔎 Review Explorer")
+
+search_col, rating_col = st.columns([3, 2])
+query = search_col.text_input(
+    "Search reviews",
+    placeholder='e.g. login "face id" -password',
+    key="explorer_query",
+)
+ratings = rating_col.multiselect("Rating", [1, 2, 3, 4, 5], key="explorer_ratings")
+
+version_col, label_col, cluster_col = st.columns(3)
+versions_text = version_col.text_input("App versions", placeholder="e.g. 5.3, 5.4", key="explorer_versions")
+# Options come from panels already loaded for this brand; keys are per brand
+# so a selection never outlives its options
+labels = label_col.multiselect(
+    "Sentiment",
+    panels.sentiment["sentiment_label"].dropna().tolist(),
+    key=f"explorer_labels_{brand}",
+)
+cluster_ids = cluster_col.multiselect(
+    "Cluster",
+    [int(c) for c in panels.clusters["cluster_id"].dropna()],
+    key=f"explorer_clusters_{brand}",
+)
+
+filters = ExplorerFilters(
+    query=query.strip(),
+    ratings=tuple(sorted(ratings)),
+    versions=tuple(v.strip() for v in versions_text.split(",") if v.strip()),
+    sentiment_labels=tuple(sorted(labels)),
+    cluster_ids=tuple(sorted(cluster_ids)),
+)
+
+# Cursor stack: entry i opens page i + 1 (None = newest). Reset when the
+# brand or any filter changes.
+if st.session_state.get("explorer_key") != (brand, filters):
+    st.session_state["explorer_key"] = (brand, filters)
+    st.session_state["explorer_cursors"] = [None]
+cursors = st.session_state["explorer_cursors"]
+
+page = load_review_page(
+    brand, filters, cursors[-1],
+    version["raw_version"], version["ml_version"], version["cluster_version"],
+)
+
+if page.rows.empty:
+    st.caption("No reviews match these filters.")
+else:
+    st.dataframe(page.rows, use_container_width=True, hide_index=True)
+
+newer_col, page_col, older_col = st.columns([1, 2, 1])
+if newer_col.button("← Newer", disabled=len(cursors) == 1):
+    cursors.pop()
+    st.rerun()
+page_col.caption(f"Page {len(cursors)}")
+if older_col.button("Older →", disabled=page.next_cursor is None):
+    cursors.append(page.next_cursor)
+    st.rerun()
+
 # ------------------------------------------------
 # SENTIMENT DISTRIBUTION
 # ------------------------------------------------
 st.subheader("Sentiment Distribution")
 
-sent_df = pd.read_sql(
-    """
-    SELECT
-        m.sentiment_label,
-        COUNT(*) AS count
-    FROM mentions_ml m
-    JOIN mentions_raw r
-        ON r.raw_id = m.raw_id
-    WHERE r.brand = %s
-    GROUP BY m.sentiment_label
-    """,
-    conn,
-    params=(brand.lower(),),
-)
+sent_df = panels.sentiment
 
 if not sent_df.empty:
     st.bar_chart(sent_df.set_index("sentiment_label"))
 else:
     st.caption("No sentiment scores available yet.")
 
+# ------------------------------------------------
+# SENTIMENT TREND (sentiment_timeseries rollup)
+# ------------------------------------------------
+st.subheader("Sentiment Trend")
+
+trend_df = panels.trend
+
+if not trend_df.empty:
+    trend_df = trend_df.set_index("date")
+    st.line_chart(trend_df[["avg_sentiment_score", "avg_toxicity_score"]])
+    st.bar_chart(trend_df[["mention_count"]])
+
+    anomalies = trend_df[trend_df["anomaly_flag"].fillna(False)]
+    for day, row in anomalies.sort_index(ascending=False).iterrows():
+        st.caption(f"⚠️ {day}: {row['anomaly_reason']}")
+else:
+    st.caption("No daily rollup yet. Run scripts/run_timeseries_rollup.py.")
+
 # ------------------------------------------------
 # MOST NEGATIVE REVIEWS
 # ------------------------------------------------
 st.subheader("Most Negative Reviews")
 
-neg_df = pd.read_sql(
-    """
-    SELECT
-        r.created_utc,
-        r.body,
-        m.sentiment_score,
-        m.toxicity_score
-    FROM mentions_raw r
-    JOIN mentions_ml m
-        ON r.raw_id = m.raw_id
-    WHERE r.brand = %s
-    ORDER BY m.sentiment_score ASC
-    LIMIT 5
-    """,
-    conn,
-    params=(brand.lower(),),
-)
+neg_df = panels.negative
 
 if not neg_df.empty:
     st.dataframe(neg_df, use_container_width=True)
@@ -227,15 +291,20 @@ else:
 # ------------------------------------------------
 st.subheader("🧩 Themes & Issues")
 
-clusters = fetch_clusters(conn, brand)
+clusters = panels.clusters
 
-if not clusters:
+if clusters.empty:
     st.caption("Not enough data to surface themes yet.")
 else:
-    for cluster_id, count, avg_sent in clusters:
+    for cluster_id, count, avg_sent, top_terms in clusters.itertuples(index=False):
+        cluster_id = int(cluster_id)
         header = f"Cluster {cluster_id} · {count} reviews"
+        # c-TF-IDF labels from the clustering job; the first few name the theme
+        terms = top_terms.split(", ") if pd.notna(top_terms) and top_terms else []
+        if terms:
+            header = f"Cluster {cluster_id} · {', '.join(terms[:3])} · {count} reviews"
 
-        if avg_sent is not None:
+        if pd.notna(avg_sent):
             if avg_sent < -0.3:
                 sev = "🔴 Negative"
             elif avg_sent < 0.2:
@@ -245,17 +314,28 @@ else:
             header += f" · Avg Sentiment {avg_sent:.2f} ({sev})"
 
         with st.expander(header):
-            examples = fetch_cluster_examples(conn, brand, cluster_id)
-            for body, sent in examples:
-                st.write(f"• {body}")
-                st.caption(f"sentiment: {float(sent):.2f}")
+            if terms:
+                st.caption("Top terms: " + " · ".join(terms))
+
+            # Examples are only queried once the user asks for them
+            if st.toggle("Show example reviews", key=f"examples_{brand}_{cluster_id}"):
+                examples = load_cluster_examples(
+                    brand, cluster_id, version["cluster_version"],
+                    version["summaries_version"], version["ml_version"],
+                )
+                if not examples:
+                    st.caption("No exemplars yet. Run scripts/run_clustering_pipeline.py --exemplars-only.")
+                for body, sent in examples:
+                    st.write(f"• {body}")
+                    if sent is not None:
+                        st.caption(f"sentiment: {float(sent):.2f}")
 
 # ------------------------------------------------
 # 🚨 EMERGING & HIGH-RISK ISSUES (DAY 5)
 # ------------------------------------------------
 st.subheader("🚨 Emerging & High-Risk Issues")
 
-insights_df = fetch_emerging_issues(conn, brand)
+insights_df = panels.insights
 
 if insights_df.empty:
     st.caption("No cluster insights generated yet.")
@@ -0,0 +1,210 @@
+"""
+Offline Google Play backfill throughput: legacy sequential loop vs the
+concurrent engine in ingestion/backfill.py.
+
+google_play_scraper.reviews is monkeypatched with a local fake that sleeps
+--latency-ms per request and serves --depth synthetic reviews per app, so
+nothing touches the network. Rows are written to a THROWAWAY local
+database migrated with db/migrate.py.
+
+    python benchmarks/backfill_throughput.py --latency-ms 300 --rate 20
+
+The engine is run twice to show the second run resuming from the persisted
+continuation tokens rather than refetching the newest pages. Finally the
+incremental poller (ingestion/incremental.py) is run against an unchanged
+app, after new reviews arrive, and after more arrive than one poll pages
+through.
+"""
+
+import os
+import sys
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import google_play_scraper
+from google_play_scraper.features.reviews import _ContinuationToken
+
+import ingestion.reviews.google_play as google_play
+from benchmarks.seed import connect
+from ingestion.backfill import reset_cursors, run_backfill
+from ingestion.incremental import MAX_PAGES, _cache, poll_app
+from ingestion.load_to_db import insert_mentions
+from ingestion.reviews.google_play import fetch_google_play_reviews
+
+BENCH_APPS = {
+    "Bench Chase": "bench.chase",
+    "Bench BofA": "bench.bofa",
+    "Bench Capital One": "bench.capitalone",
+    "Bench Wells Fargo": "bench.wellsfargo",
+}
+
+# Legacy backfill_google_play.py settings
+LEGACY_PAGES = 6
+LEGACY_PAGE_SIZE = 30
+
+
+class FakeReviews:
+    """Stand-in for google_play_scraper.reviews with a fixed per-call latency."""
+
+    def __init__(self, depth: int, latency_s: float):
+        self.depth = depth
+        self.latency_s = latency_s
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._epoch = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        # Unique ids per harness run so the dedup trigger never hides work
+        self._run = int(time.time() * 1000)
+        # Reviews published after the fake was created (newest-first on top)
+        self.arrived = 0
+
+    def __call__(self, app_id, lang="en", country="us", sort=None, count=100,
+                 filter_score_with=None, filter_device_with=None, continuation_token=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s)
+
+        offset = int(continuation_token.token) if continuation_token is not None else 0
+        if continuation_token is not None:
+            count = continuation_token.count
+        total = self.depth + self.arrived
+        end = min(offset + count, total)
+
+        # Position p in the newest-first list is review index p - arrived
+        items = [
+            {
+                "reviewId": f"{self._run}-{i}",
+                "userName": f"user{i % 97}",
+                "content": f"synthetic review {i} for {app_id}",
+                "score": 1 + i % 5,
+                "at": self._epoch - timedelta(minutes=i),
+                "reviewCreatedVersion": "1.0",
+            }
+            for i in (p - self.arrived for p in range(offset, end))
+        ]
+        token = str(end) if end < total else None
+        return items, _ContinuationToken(token, lang, country, 2, count, None, None)
+
+
+def install_fake(fake: FakeReviews):
+    # google_play.py binds `reviews` at import time, so patch both names
+    google_play_scraper.reviews = fake
+    google_play.reviews = fake
+
+
+def run_legacy() -> dict:
+    """The pre-engine loop: brands one after another, one connect per page."""
+    t0 = time.perf_counter()
+    fetched = inserted = 0
+    for brand, app_id in BENCH_APPS.items():
+        token = None
+        for _ in range(LEGACY_PAGES):
+            rows, token = fetch_google_play_reviews(
+                app_id=app_id, brand=brand, limit=LEGACY_PAGE_SIZE, continuation_token=token
+            )
+            if not rows:
+                break
+            inserted += insert_mentions(rows)
+            fetched += len(rows)
+    return {"fetched": fetched, "inserted": inserted, "secs": time.perf_counter() - t0}
+
+
+def run_polls(conn, page_size: int):
+    """
+    Unchanged app, then 450 new reviews, then unchanged again; then more
+    new reviews than one poll's MAX_PAGES, left as a gap and resumed.
+    """
+    brand, app_id = next(iter(BENCH_APPS.items()))
+    fake = FakeReviews(depth=5000, latency_s=0)
+    install_fake(fake)
+
+    far_behind = (MAX_PAGES + 10) * page_size
+    steps = (
+        ("first poll", 0), ("unchanged", 0), ("+450 new", 450), ("unchanged", 0),
+        (f"+{far_behind} new", far_behind), ("resume gap", 0), ("unchanged", 0),
+    )
+    for label, arrive in steps:
+        fake.arrived += arrive
+        calls = fake.calls
+        stats = poll_app(conn, app_id, brand, page_size=page_size)
+        print(
+            f"[INFO] poll {label:<13} calls={fake.calls - calls} fetched={stats['fetched']} "
+            f"inserted={stats['inserted']} stopped={stats['stopped']} gap={stats['gap']}"
+        )
+
+
+def cleanup(conn):
+    _cache.clear()
+    with conn.cursor() as cur:
+        reset_cursors(cur, BENCH_APPS.values())
+        cur.execute("DELETE FROM ingestion_high_water WHERE app_id LIKE 'bench.%%';")
+        cur.execute("DELETE FROM mentions_raw WHERE source_context LIKE 'bench.%%';")
+        cur.execute("DELETE FROM mentions_source_keys WHERE source_id LIKE 'bench.%%';")
+    conn.commit()
+
+
+def report(name: str, stats: dict, calls: int):
+    rps = stats["fetched"] / stats["secs"] if stats["secs"] else 0.0
+    print(
+        f"{name:<16} {calls:>6} {stats['fetched']:>8} {stats['inserted']:>8} "
+        f"{stats['secs']:>8.2f} {rps:>10.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Google Play backfill throughput")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Fake per-request latency")
+    parser.add_argument("--depth", type=int, default=20000, help="Reviews available per app")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=20.0, help="Token-bucket requests/sec")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        cleanup(conn)
+        print(f"{'path':<16} {'calls':>6} {'fetched':>8} {'inserted':>8} {'secs':>8} {'reviews/s':>10}")
+
+        fake = FakeReviews(args.depth, args.latency_ms / 1000)
+        install_fake(fake)
+        report("legacy", run_legacy(), fake.calls)
+        cleanup(conn)
+
+        for name in ("engine", "engine (resume)"):
+            fake = FakeReviews(args.depth, args.latency_ms / 1000)
+            install_fake(fake)
+            stats = run_backfill(
+                conn,
+                BENCH_APPS,
+                pages=args.pages,
+                page_size=args.page_size,
+                workers=args.workers,
+                rate=args.rate,
+                burst=args.workers,
+                fetch=fetch_google_play_reviews,
+            )
+            report(name, stats, fake.calls)
+
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT app_id, token, pages_fetched FROM ingestion_cursors WHERE app_id LIKE 'bench.%%' ORDER BY app_id;"
+            )
+            for app_id, token, pages in cur.fetchall():
+                print(f"[INFO] cursor {app_id}: next_offset={token} pages_fetched={pages}")
+        conn.rollback()
+
+        cleanup(conn)
+        run_polls(conn, page_size=100)
+    finally:
+        cleanup(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+COPY-based reader vs cursor.fetchall() for large reads.
+
+Rows come from generate_series on the server, so no tables are touched and
+any local database works. Each method runs in a fresh subprocess so its
+peak RSS is measured in isolation.
+
+    python benchmarks/copy_reader.py --rows 1000000 --embeddings 100000
+
+- tabular:    (raw_id, brand, rating, score, body) -> NumPy columns
+              fetchall + np.array  vs  read_arrow (CSV COPY -> Arrow)
+- embeddings: (raw_id, 384-dim float32 bytea) -> (n, 384) matrix
+              fetchall + np.frombuffer  vs  read_fixed_binary (binary COPY)
+"""
+
+import os
+import sys
+import argparse
+import json
+import resource
+import subprocess
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.seed import connect
+from db.copy_reader import read_arrow, read_fixed_binary
+
+DIM = 384
+
+TABULAR_SQL = """
+    SELECT g AS raw_id,
+           'brand_' || (g %% 4) AS brand,
+           1 + g %% 5 AS rating,
+           ((g %% 2000) / 1000.0 - 1)::float8 AS score,
+           -- Every 10th body is multi-line with a quoted comma, like real reviews
+           CASE WHEN g %% 10 = 0
+                THEN md5(g::text) || E'\\n' || 'second line, "quoted"'
+                ELSE md5(g::text)
+           END AS body
+    FROM generate_series(1, %(n)s) g
+"""
+
+EMBEDDING_SQL = """
+    SELECT g AS raw_id,
+           decode(repeat(lpad(to_hex(g %% 256), 2, '0'), %(bytes)s), 'hex') AS embedding
+    FROM generate_series(1, %(n)s) g
+"""
+
+
+def tabular_fetchall(conn, n):
+    with conn.cursor() as cur:
+        cur.execute(TABULAR_SQL, {"n": n})
+        rows = cur.fetchall()
+    raw_id, brand, rating, score, body = zip(*rows)
+    return {
+        "raw_id": np.array(raw_id, dtype=np.int64),
+        "brand": np.array(brand, dtype=object),
+        "rating": np.array(rating, dtype=np.int64),
+        "score": np.array(score, dtype=np.float64),
+        "body": np.array(body, dtype=object),
+    }
+
+
+def tabular_copy(conn, n):
+    table = read_arrow(conn, TABULAR_SQL, {"n": n})
+    return {
+        "raw_id": table.column("raw_id").to_numpy(),
+        "brand": table.column("brand"),
+        "rating": table.column("rating").to_numpy(),
+        "score": table.column("score").to_numpy(),
+        "body": table.column("body"),
+    }
+
+
+def embeddings_fetchall(conn, n):
+    with conn.cursor() as cur:
+        cur.execute(EMBEDDING_SQL, {"n": n, "bytes": DIM * 4})
+        rows = cur.fetchall()
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    X = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+    return {"raw_id": ids, "X": X}
+
+
+def embeddings_copy(conn, n):
+    cols = read_fixed_binary(
+        conn, EMBEDDING_SQL, {"n": n, "bytes": DIM * 4},
+        [("raw_id", ">i4"), ("embedding", f"V{DIM * 4}")],
+    )
+    return {"raw_id": cols["raw_id"], "X": cols["embedding"].view(np.float32).reshape(-1, DIM)}
+
+
+METHODS = {
+    "tabular_fetchall": tabular_fetchall,
+    "tabular_copy": tabular_copy,
+    "embeddings_fetchall": embeddings_fetchall,
+    "embeddings_copy": embeddings_copy,
+}
+
+
+def run_one(method: str, n: int):
+    conn = connect()
+    base_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    out = METHODS[method](conn, n)
+    secs = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.close()
+    rows = len(out["raw_id"])
+    if rows != n:
+        raise RuntimeError(f"{method} returned {rows} rows, expected {n}")
+    print(json.dumps({"method": method, "rows": rows, "secs": secs, "peak_mb": (peak_kb - base_kb) / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="COPY reader vs fetchall")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Tabular rows")
+    parser.add_argument("--embeddings", type=int, default=100_000, help="Embedding rows")
+    parser.add_argument("--method", choices=list(METHODS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.method:
+        n = args.embeddings if args.method.startswith("embeddings") else args.rows
+        run_one(args.method, n)
+        return
+
+    print(f"{'method':<22} {'rows':>9} {'secs':>8} {'peak MB':>9}")
+    for method in METHODS:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--method", method,
+             "--rows", str(args.rows), "--embeddings", str(args.embeddings)],
+            capture_output=True, text=True, check=True,
+        )
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{r['method']:<22} {r['rows']:>9} {r['secs']:>8.2f} {r['peak_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Seeded synthetic review corpus for benchmarks.
+
+Unlike seed.py (server-side generate_series over eight fixed bodies), this
+builds mention dicts in Python that look like real app-store traffic:
+
+- review length: log-normal word count (most reviews a sentence or two,
+  a long tail of multi-paragraph rants), a few empty bodies
+- ratings: J-shaped, mostly 5s and 1s, correlated with the text tone
+- duplicates: a share of reviews repeat an earlier body verbatim
+  ("great app", copy-pasted complaints)
+- toxic phrases from analytics/toxicity.py mixed into negative reviews
+- several brands, timestamps spread over the last `days`
+
+The same seed always yields the same corpus.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+import numpy as np
+
+from analytics.toxicity import TOXIC_KEYWORDS
+
+BENCH_SOURCE_CONTEXT = "bench_suite"
+DEFAULT_BRANDS = ["chase", "bank of america", "capital one", "wells fargo"]
+
+_POSITIVE = [
+    "great app", "love the new design", "works perfectly", "easy to use",
+    "customer service was helpful and quick", "deposits show up instantly",
+    "best banking app i have used", "zelle is fast", "clean interface",
+]
+_NEGATIVE = [
+    "app keeps crashing after the latest update", "cannot log in",
+    "charged me twice", "transfer stuck for three days", "fingerprint login stopped working",
+    "support never called back", "the update deleted my saved payees",
+    "keeps logging me out", "checks will not deposit",
+]
+_NEUTRAL = [
+    "it is fine", "does what it needs to", "would like a dark mode",
+    "please add budgeting tools", "ok for basic stuff", "the layout changed again",
+]
+_FILLER = [
+    "i have been a customer for years", "on my android phone", "since last week",
+    "every single time", "tried reinstalling", "my wife has the same problem",
+    "at least it used to", "not sure why", "honestly", "for what it is worth",
+]
+
+# Rating distribution per tone (1..5)
+_RATING_P = {
+    "positive": [0.01, 0.01, 0.05, 0.18, 0.75],
+    "negative": [0.70, 0.15, 0.08, 0.04, 0.03],
+    "neutral": [0.08, 0.12, 0.45, 0.25, 0.10],
+}
+
+
+def _body(rng: np.random.Generator, tone: str, toxic_rate: float) -> str:
+    n_words = int(rng.lognormal(mean=2.6, sigma=0.9))  # median ~13 words
+    if n_words == 0 or rng.random() < 0.01:
+        return ""
+
+    pool = {"positive": _POSITIVE, "negative": _NEGATIVE, "neutral": _NEUTRAL}[tone]
+    parts = []
+    words = 0
+    while words < n_words:
+        phrase = pool[rng.integers(len(pool))] if rng.random() < 0.6 else _FILLER[rng.integers(len(_FILLER))]
+        parts.append(phrase)
+        words += phrase.count(" ") + 1
+
+    if tone == "negative" and rng.random() < toxic_rate:
+        for _ in range(1 + rng.poisson(0.7)):
+            parts.insert(int(rng.integers(len(parts) + 1)), TOXIC_KEYWORDS[rng.integers(len(TOXIC_KEYWORDS))])
+
+    text = ". ".join(parts)
+    return text[0].upper() + text[1:] + ("!" if tone == "negative" else ".")
+
+
+def generate_corpus(n: int, seed: int = 42, brands: Optional[List[str]] = None,
+                    days: int = 90, duplicate_rate: float = 0.08,
+                    toxic_rate: float = 0.35, run_tag: str = "bench") -> List[dict]:
+    """
+    n mention dicts ready for insert_mentions / insert_mentions_bulk.
+    source_ids are f"{run_tag}_{seed}_{i}"; pass a unique run_tag to insert
+    the same corpus twice.
+    """
+    rng = np.random.default_rng(seed)
+    brands = brands or DEFAULT_BRANDS
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    tones = rng.choice(["positive", "negative", "neutral"], size=n, p=[0.5, 0.35, 0.15])
+    offsets = rng.uniform(0, days * 86400, size=n)
+    brand_idx = rng.integers(len(brands), size=n)
+
+    rows: List[dict] = []
+    for i in range(n):
+        tone = str(tones[i])
+        if rows and rng.random() < duplicate_rate:
+            body = rows[int(rng.integers(len(rows)))]["body"]
+        else:
+            body = _body(rng, tone, toxic_rate)
+
+        rows.append({
+            "source": "google_play",
+            "source_id": f"{run_tag}_{seed}_{i}",
+            "brand": brands[brand_idx[i]],
+            "created_utc": now - timedelta(seconds=float(offsets[i])),
+            "author": f"user_{rng.integers(n)}",
+            "title": "",
+            "body": body,
+            "url": "",
+            "source_context": BENCH_SOURCE_CONTEXT,
+            "rating": int(rng.choice(5, p=_RATING_P[tone]) + 1),
+            "version": f"5.{rng.integers(10)}",
+        })
+    return rows
+
+
+def synthetic_embeddings(n: int, dim: int = 384, k: int = 8, seed: int = 42) -> np.ndarray:
+    """Unit vectors around k random centroids, like sentence embeddings of k topics."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(k, dim))
+    X = centroids[rng.integers(k, size=n)] + rng.normal(scale=0.6, size=(n, dim))
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return X.astype(np.float32)
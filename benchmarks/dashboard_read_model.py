@@ -0,0 +1,149 @@
+"""
+Dashboard read path: legacy per-panel queries vs the one-round-trip read model.
+
+Usage (against a throwaway local Postgres migrated with db/migrate.py):
+
+    python benchmarks/dashboard_read_model.py --seed 200000 --rtt-ms 40
+
+Local timings are measured; the WAN column adds --rtt-ms per round trip to
+estimate latency to a remote database such as Supabase.
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app.read_model import fetch_dashboard
+from benchmarks.seed import BENCH_BRANDS, connect, seed_database
+
+# Legacy dashboard queries, as issued by app/streamlit_app.py before the
+# read model: one per panel plus one example query per cluster expander.
+LEGACY_PANEL_QUERIES = [
+    """
+    SELECT created_utc, author, rating, body, version
+    FROM mentions_raw
+    WHERE source = 'google_play' AND brand = %(brand)s
+    ORDER BY created_utc DESC
+    LIMIT 20
+    """,
+    """
+    SELECT m.sentiment_label, COUNT(*) AS count
+    FROM mentions_ml m
+    JOIN mentions_raw r ON r.raw_id = m.raw_id
+    WHERE r.brand = %(brand)s
+    GROUP BY m.sentiment_label
+    """,
+    """
+    SELECT date, mention_count, avg_sentiment_score, avg_toxicity_score
+    FROM sentiment_timeseries
+    WHERE brand = %(brand)s AND date >= CURRENT_DATE - 90
+    ORDER BY date
+    """,
+    """
+    SELECT r.created_utc, r.body, m.sentiment_score, m.toxicity_score
+    FROM mentions_raw r
+    JOIN mentions_ml m ON r.raw_id = m.raw_id
+    WHERE r.brand = %(brand)s
+    ORDER BY m.sentiment_score ASC
+    LIMIT 5
+    """,
+    """
+    SELECT rc.cluster_id, COUNT(*) AS review_count, AVG(ml.sentiment_score)
+    FROM review_clusters rc
+    JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
+    LEFT JOIN mentions_ml ml ON ml.raw_id = rc.raw_id
+    WHERE mr.brand = %(brand)s
+    GROUP BY rc.cluster_id
+    ORDER BY review_count DESC
+    """,
+    """
+    SELECT cluster_id, primary_issue, summary, trend_label, user_impact,
+           count_last_7d, count_prev_7d, delta_count
+    FROM cluster_insights
+    WHERE brand = %(brand)s
+      AND generated_at = (
+        SELECT MAX(generated_at) FROM cluster_insights WHERE brand = %(brand)s
+      )
+    """,
+]
+
+LEGACY_EXAMPLES_QUERY = """
+SELECT mr.body, ml.sentiment_score
+FROM review_clusters rc
+JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
+JOIN mentions_ml ml ON ml.raw_id = mr.raw_id
+WHERE mr.brand = %(brand)s AND rc.cluster_id = %(cluster_id)s
+ORDER BY ml.sentiment_score ASC
+LIMIT 5
+"""
+
+
+def run_legacy(conn, brand: str) -> int:
+    """Returns the number of round trips issued."""
+    trips = 0
+    clusters = []
+    with conn.cursor() as cur:
+        for q in LEGACY_PANEL_QUERIES:
+            cur.execute(q, {"brand": brand})
+            rows = cur.fetchall()
+            trips += 1
+            if "review_count" in q:
+                clusters = [r[0] for r in rows]
+        for cid in clusters:
+            cur.execute(LEGACY_EXAMPLES_QUERY, {"brand": brand, "cluster_id": cid})
+            cur.fetchall()
+            trips += 1
+    return trips
+
+
+def run_read_model(conn, brand: str) -> int:
+    fetch_dashboard(conn, brand)
+    return 1
+
+
+def time_path(fn, conn, iterations: int):
+    timings = []
+    trips = 0
+    for i in range(iterations):
+        brand = BENCH_BRANDS[i % len(BENCH_BRANDS)]
+        t0 = time.perf_counter()
+        trips = fn(conn, brand)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed", type=int, default=0, help="Seed N synthetic reviews first")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=40.0, help="Assumed WAN round-trip time")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.seed:
+            print(f"[INFO] Seeding {args.seed} synthetic reviews ...")
+            seed_database(conn, args.seed)
+
+        # Warm caches once so both paths are measured hot
+        run_legacy(conn, BENCH_BRANDS[0])
+        run_read_model(conn, BENCH_BRANDS[0])
+        conn.commit()
+
+        print(f"{'path':<12} {'trips':>5} {'local p50 ms':>13} {'est. WAN ms':>12}")
+        for name, fn in (("legacy", run_legacy), ("read_model", run_read_model)):
+            p50, trips = time_path(fn, conn, args.iterations)
+            wan = p50 + trips * args.rtt_ms
+            print(f"{name:<12} {trips:>5} {p50:>13.1f} {wan:>12.1f}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Offline Reddit backfill: the paginated PullPush source and the shared bulk
+loader, run against a local fake HTTP server instead of api.pullpush.io.
+
+The fake serves /reddit/search/submission with q / size / before / after /
+sort semantics and --depth synthetic posts per brand. Every third post
+shares its created_utc second with its neighbours, so pages regularly end
+in the middle of a second and the `before` boundary handling is exercised.
+Rows are written to a THROWAWAY local database migrated with db/migrate.py.
+
+    python benchmarks/reddit_backfill_offline.py --depth 3000 --pages 20
+
+The first run stops at --pages per brand; the second resumes from the saved
+cursors and must reach the end of history with no duplicates.
+"""
+
+import os
+import sys
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.seed import connect
+from ingestion.backfill import REDDIT_SOURCE, reset_cursors, run_reddit_backfill
+
+BENCH_BRANDS = ["Bench Reddit Chase", "Bench Reddit BofA", "Bench Reddit Capital One"]
+
+# 2026-01-01T00:00:00Z, newest synthetic post
+EPOCH = 1767225600
+
+
+class FakePullPush:
+    def __init__(self, depth: int, latency_s: float):
+        self.latency_s = latency_s
+        self.calls = 0
+        self._lock = threading.Lock()
+        run = int(time.time() * 1000)
+        self.run = run
+        # Newest first; three posts per second
+        self.posts = {
+            brand.lower(): [
+                {
+                    "id": f"bench{run}_{b}_{i}",
+                    "created_utc": EPOCH - i // 3,
+                    "author": f"user{i % 97}",
+                    "title": f"post {i} about {brand}",
+                    "selftext": f"synthetic body {i}",
+                    "subreddit": f"sub{i % 5}",
+                    "permalink": f"/r/sub{i % 5}/comments/{i}/",
+                }
+                for i in range(depth)
+            ]
+            for b, brand in enumerate(BENCH_BRANDS)
+        }
+
+    def search(self, params: dict) -> list:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency_s)
+
+        posts = self.posts.get(params.get("q", "").lower(), [])
+        before = int(params["before"]) if "before" in params else None
+        after = int(params["after"]) if "after" in params else None
+        size = min(int(params.get("size", 25)), 100)
+
+        out = [
+            p for p in posts
+            if (before is None or p["created_utc"] < before)
+            and (after is None or p["created_utc"] > after)
+        ]
+        return out[:size]
+
+
+def serve(fake: FakePullPush) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/reddit/search/submission":
+                self.send_error(404)
+                return
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            body = json.dumps({"data": fake.search(params)}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def cleanup(conn):
+    brands = [b.lower() for b in BENCH_BRANDS]
+    with conn.cursor() as cur:
+        reset_cursors(cur, brands, source=REDDIT_SOURCE)
+        cur.execute("DELETE FROM mentions_raw WHERE source = 'reddit' AND brand = ANY(%s);", (brands,))
+        cur.execute("DELETE FROM mentions_source_keys WHERE source = 'reddit' AND source_id LIKE 'bench%%';")
+    conn.commit()
+
+
+def verify(conn, fake: FakePullPush, depth: int):
+    brands = [b.lower() for b in BENCH_BRANDS]
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT brand, COUNT(*), COUNT(DISTINCT source_id),
+                   COUNT(*) FILTER (WHERE subreddit IS NULL OR subreddit = '')
+            FROM mentions_raw
+            WHERE source = 'reddit' AND brand = ANY(%s)
+            GROUP BY brand
+            ORDER BY brand;
+            """,
+            (brands,),
+        )
+        rows = cur.fetchall()
+        cur.execute(
+            """
+            SELECT app_id, token, exhausted, pages_fetched, reviews_fetched
+            FROM ingestion_cursors
+            WHERE source = %s AND app_id = ANY(%s)
+            ORDER BY app_id;
+            """,
+            (REDDIT_SOURCE, brands),
+        )
+        cursors = cur.fetchall()
+    conn.rollback()
+
+    ok = len(rows) == len(brands)
+    for brand, total, distinct, no_sub in rows:
+        good = total == depth and distinct == total and no_sub == 0
+        ok = ok and good
+        print(f"[INFO] {brand}: stored={total} distinct={distinct} missing_subreddit={no_sub} {'OK' if good else 'MISMATCH'}")
+    for app_id, token, exhausted, pages, fetched in cursors:
+        print(f"[INFO] cursor {app_id}: before={token} exhausted={exhausted} pages={pages} fetched={fetched}")
+        ok = ok and exhausted
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline paginated Reddit backfill")
+    parser.add_argument("--depth", type=int, default=3000, help="Posts available per brand")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per brand per run")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake per-request latency")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=50.0, help="Token-bucket requests/sec")
+    args = parser.parse_args()
+
+    fake = FakePullPush(args.depth, args.latency_ms / 1000)
+    server = serve(fake)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/reddit/search/submission"
+
+    conn = connect()
+    try:
+        cleanup(conn)
+        for name in ("first run", "resume", "resume (done)"):
+            calls = fake.calls
+            stats = run_reddit_backfill(
+                conn,
+                BENCH_BRANDS,
+                pages=args.pages,
+                page_size=args.page_size,
+                workers=args.workers,
+                rate=args.rate,
+                burst=args.workers,
+                base_url=base_url,
+            )
+            print(
+                f"[INFO] {name:<14} calls={fake.calls - calls} pages={stats['pages']} "
+                f"fetched={stats['fetched']} inserted={stats['inserted']} secs={stats['secs']:.2f}"
+            )
+
+        ok = verify(conn, fake, args.depth)
+        print("[INFO] Reddit offline backfill " + ("PASSED" if ok else "FAILED"))
+    finally:
+        cleanup(conn)
+        conn.close()
+        server.shutdown()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
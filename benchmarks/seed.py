@@ -0,0 +1,197 @@
+"""
+Seeds a THROWAWAY local database with synthetic reviews and derived rows.
+The database must already be migrated (python db/migrate.py).
+
+Everything is generated server-side with generate_series, so seeding a few
+hundred thousand rows takes seconds. Never point this at Supabase.
+
+Benchmarks connect through connect() below, which only accepts a bench
+database: BENCH_DSN if set, else the PG* settings when PGDATABASE has
+"bench" in its name. A BENCH_DSN is also copied into the PG* variables so
+pipeline code that opens its own connections (and its worker processes)
+lands on the same database.
+"""
+
+import os
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extensions import parse_dsn
+
+from db.pipeline_state import advance_watermark
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+load_dotenv(os.path.join(ROOT, ".env"))
+
+BENCH_BRANDS = ["chase", "bank of america", "capital one", "wells fargo"]
+
+# float32 MiniLM vectors (384 dims)
+EMBEDDING_BYTES = 384 * 4
+
+BODIES = [
+    "app keeps crashing after the latest update",
+    "great app, love the new design",
+    "cannot log in, worst bank ever, this is a scam",
+    "fine",
+    "they charged me twice and refused a refund, fraud",
+    "zelle transfer stuck for three days",
+    "customer service was helpful and quick",
+    "fingerprint login stopped working on my phone",
+]
+
+
+# parse_dsn key -> libpq environment variable read by the pipeline scripts
+_DSN_ENV = {"host": "PGHOST", "port": "PGPORT", "dbname": "PGDATABASE", "user": "PGUSER", "password": "PGPASSWORD"}
+
+
+def use_bench_database():
+    """
+    Points the PG* environment at the bench database, or raises if there
+    is none: benchmarks move watermarks and rewrite derived tables.
+    """
+    dsn = os.getenv("BENCH_DSN")
+    if dsn:
+        params = parse_dsn(dsn)
+        for key, var in _DSN_ENV.items():
+            if key in params:
+                os.environ[var] = params[key]
+            else:
+                os.environ.pop(var, None)
+    database = os.getenv("PGDATABASE") or ""
+    if "bench" not in database.lower():
+        raise RuntimeError(
+            f"refusing to benchmark against database {database!r}: set BENCH_DSN, "
+            "or PGDATABASE to a throwaway database with 'bench' in its name"
+        )
+
+
+def connect():
+    use_bench_database()
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+    )
+
+
+def seed_database(conn, n_reviews: int, days: int = 180, n_clusters: int = 8):
+    """
+    Inserts n_reviews google_play reviews spread over `days` across
+    BENCH_BRANDS, plus mentions_ml, review_embeddings (zero vectors),
+    review_clusters, sentiment_timeseries and one generation of
+    cluster_insights. Every seeded row counts as processed, so the sentiment,
+    embedding and clustering watermarks move past them.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO mentions_raw (
+                source, source_id, brand, created_utc, author, title, body,
+                url, source_context, rating, version
+            )
+            SELECT
+                'google_play',
+                'bench_' || g,
+                (%(brands)s::text[])[1 + g %% cardinality(%(brands)s::text[])],
+                NOW() - (random() * %(days)s) * INTERVAL '1 day',
+                'user_' || g,
+                '',
+                (%(bodies)s::text[])[1 + (g * 7) %% cardinality(%(bodies)s::text[])],
+                '',
+                'bench',
+                1 + (g %% 5),
+                '5.' || (g %% 9)
+            FROM generate_series(1, %(n)s) g;
+            """,
+            {"n": n_reviews, "days": days, "brands": BENCH_BRANDS, "bodies": BODIES},
+        )
+        cur.execute(
+            """
+            INSERT INTO mentions_ml (
+                raw_id, brand, sentiment_label, sentiment_score, toxicity_score, escalation_score
+            )
+            SELECT
+                raw_id,
+                brand,
+                CASE WHEN s > 0.2 THEN 'positive' WHEN s < -0.2 THEN 'negative' ELSE 'neutral' END,
+                s,
+                round(random()::numeric, 3),
+                0
+            FROM (
+                SELECT raw_id, brand, round((random() * 2 - 1)::numeric, 3) AS s
+                FROM mentions_raw
+                WHERE source_context = 'bench'
+                  AND NOT ml_processed
+            ) x
+            ON CONFLICT (raw_id) DO NOTHING;
+
+            UPDATE mentions_raw
+            SET ml_processed = TRUE
+            WHERE source_context = 'bench'
+              AND NOT ml_processed;
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO review_embeddings (raw_id, brand, embedding, embedding_model)
+            SELECT raw_id, brand, decode(repeat('00', %(bytes)s), 'hex'), 'bench'
+            FROM mentions_raw
+            WHERE source_context = 'bench'
+            ON CONFLICT (raw_id) DO NOTHING;
+            """,
+            {"bytes": EMBEDDING_BYTES},
+        )
+        cur.execute(
+            """
+            INSERT INTO review_clusters (raw_id, brand, cluster_id)
+            SELECT raw_id, brand, raw_id %% %(k)s
+            FROM mentions_raw
+            WHERE source_context = 'bench'
+            ON CONFLICT (raw_id) DO NOTHING;
+            """,
+            {"k": n_clusters},
+        )
+        cur.execute(
+            """
+            INSERT INTO sentiment_timeseries (
+                brand, date, mention_count, avg_sentiment_score, avg_toxicity_score
+            )
+            SELECT r.brand, r.created_utc::date, COUNT(*),
+                   AVG(m.sentiment_score), AVG(m.toxicity_score)
+            FROM mentions_raw r
+            LEFT JOIN mentions_ml m ON m.raw_id = r.raw_id
+            GROUP BY r.brand, r.created_utc::date
+            ON CONFLICT (brand, date) DO NOTHING;
+            """
+        )
+        cur.execute(
+            """
+            INSERT INTO cluster_insights (
+                brand, cluster_id, summary, primary_issue, user_impact,
+                window_start, window_end, count_last_7d, count_prev_7d,
+                delta_count, delta_pct, trend_label
+            )
+            SELECT b, c, 'Synthetic summary', 'synthetic issue', 'medium',
+                   CURRENT_DATE - 7, CURRENT_DATE, 10, 8, 2, 25.0, 'stable'
+            FROM unnest(%(brands)s::text[]) b, generate_series(0, %(k)s - 1) c;
+            """,
+            {"brands": BENCH_BRANDS, "k": n_clusters},
+        )
+        cur.execute("SELECT COALESCE(MAX(raw_id), 0) FROM mentions_raw WHERE source_context = 'bench';")
+        top = cur.fetchone()[0]
+        for stage in ["sentiment", "embedding"] + [f"clustering:{b}" for b in BENCH_BRANDS]:
+            advance_watermark(cur, stage, top)
+    conn.commit()
+
+    # Sets the visibility map as autovacuum would on a live database, so
+    # plans and timings reflect index-only scans. VACUUM needs autocommit.
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE;")
+    finally:
+        conn.autocommit = autocommit
@@ -0,0 +1,130 @@
+"""
+Scaling efficiency of the multi-process sentiment scorer.
+
+    python benchmarks/sentiment_scaling.py                      # 1/2/4/8 workers
+    python benchmarks/sentiment_scaling.py --rows 50000 --workers 1 4 16
+
+Loads a synthetic corpus (benchmarks/corpus.py) into a THROWAWAY local
+database, then for each worker count marks it unscored, rewinds the
+sentiment watermark to just below it and times
+run_sentiment_pipeline.main(workers=n). Reports rows/s, speedup over one
+worker and efficiency (speedup / workers), and writes them as JSON.
+
+Any other unscored rows in the database get scored too and distort the
+numbers: run against a database whose sentiment backlog is empty.
+"""
+
+import os
+import sys
+import argparse
+import json
+import time
+from typing import List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.corpus import BENCH_SOURCE_CONTEXT, generate_corpus
+from benchmarks.seed import connect
+
+SCALING_BRANDS = ["scaling alpha", "scaling beta"]
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "sentiment_scaling.json")
+
+
+def load_rows(conn, n: int, seed: int) -> List[int]:
+    from ingestion.load_to_db import insert_mentions_bulk
+
+    with conn.cursor() as cur:
+        insert_mentions_bulk(cur, generate_corpus(n, seed=seed, brands=SCALING_BRANDS, run_tag="scaling"))
+        cur.execute(
+            "SELECT raw_id FROM mentions_raw WHERE source_context = %s AND brand = ANY(%s) ORDER BY raw_id;",
+            (BENCH_SOURCE_CONTEXT, SCALING_BRANDS),
+        )
+        ids = [r[0] for r in cur.fetchall()]
+    conn.commit()
+    return ids
+
+
+def reset(conn, ids: List[int]):
+    """Unscores the corpus and puts the watermark just below it."""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM mentions_ml WHERE raw_id = ANY(%s);", (ids,))
+        cur.execute("DELETE FROM pipeline_retries WHERE stage = 'sentiment' AND raw_id = ANY(%s);", (ids,))
+        cur.execute("UPDATE mentions_raw SET ml_processed = FALSE WHERE raw_id = ANY(%s);", (ids,))
+        cur.execute(
+            """
+            INSERT INTO pipeline_state (stage, watermark_id, updated_at)
+            VALUES ('sentiment', %s, NOW())
+            ON CONFLICT (stage) DO UPDATE
+            SET watermark_id = EXCLUDED.watermark_id, updated_at = NOW();
+            """,
+            (ids[0] - 1,),
+        )
+    conn.commit()
+
+
+def cleanup(conn, ids: List[int], watermark: Optional[int]):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM mentions_ml WHERE raw_id = ANY(%s);", (ids,))
+        cur.execute("DELETE FROM pipeline_retries WHERE stage = 'sentiment' AND raw_id = ANY(%s);", (ids,))
+        cur.execute("DELETE FROM mentions_raw WHERE raw_id = ANY(%s);", (ids,))
+        cur.execute("DELETE FROM mentions_source_keys WHERE source = 'google_play' AND source_id LIKE 'scaling%%';")
+        cur.execute(
+            "UPDATE pipeline_state SET watermark_id = GREATEST(COALESCE(watermark_id, 0), %s) WHERE stage = 'sentiment';",
+            (watermark or 0,),
+        )
+    conn.commit()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sentiment scoring throughput at 1..N worker processes")
+    parser.add_argument("--rows", type=int, default=20_000, help="Corpus size (default: %(default)s)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=RESULTS_PATH, help="JSON results (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        from scripts import run_sentiment_pipeline
+    except Exception as e:
+        print(f"[WARN] Sentiment model unavailable, nothing to measure: {e}")
+        return 0
+
+    conn = connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT watermark_id FROM pipeline_state WHERE stage = 'sentiment';")
+        row = cur.fetchone()
+    watermark = row[0] if row else None
+
+    ids = load_rows(conn, args.rows, args.seed)
+    print(f"[INFO] Corpus loaded | rows={len(ids)} cores={os.cpu_count()}")
+
+    results = []
+    try:
+        for workers in args.workers:
+            reset(conn, ids)
+            t0 = time.perf_counter()
+            scored = run_sentiment_pipeline.main(workers=workers)
+            secs = time.perf_counter() - t0
+            results.append({"workers": workers, "rows": scored, "secs": round(secs, 2), "rows_per_s": round(scored / secs, 1)})
+    finally:
+        cleanup(conn, ids, watermark)
+        conn.close()
+
+    base = next((r["rows_per_s"] for r in results if r["workers"] == 1), results[0]["rows_per_s"] if results else 0)
+    print(f"\n{'workers':>7} {'rows/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for r in results:
+        r["speedup"] = round(r["rows_per_s"] / base, 2) if base else None
+        r["efficiency"] = round(r["speedup"] / r["workers"], 2) if base else None
+        print(f"{r['workers']:>7} {r['rows_per_s']:>10.1f} {r['speedup']:>8.2f} {r['efficiency']:>10.2f}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump({"rows": len(ids), "cores": os.cpu_count(), "results": results}, f, indent=2)
+    print(f"[INFO] Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
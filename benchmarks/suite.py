@@ -0,0 +1,470 @@
+"""
+End-to-end benchmark suite on the synthetic corpus (benchmarks/corpus.py).
+
+    python benchmarks/suite.py                        # run, write JSON, compare to baseline
+    python benchmarks/suite.py --only toxicity insert
+    python benchmarks/suite.py --update-baseline      # accept current numbers
+    python benchmarks/suite.py --no-db                # CPU-only benchmarks
+
+Benchmarks:
+  toxicity     toxicity_score over the corpus
+  sentiment    transformer_sentiment (skipped if transformers is unavailable)
+  embedding    MiniLM encoding (skipped if sentence-transformers is unavailable)
+  insert       insert_mentions (row at a time) and insert_mentions_bulk
+  clustering   run_clustering_pipeline.main on synthetic embeddings
+  ctfidf       c-TF-IDF top terms for every (brand, cluster), one pass
+  dashboard    fetch_dashboard (one-round-trip read model), p50 latency
+  explorer     review explorer: first page, 20th keyset page, full-text search, small cluster, p50 latency
+
+DB benchmarks write to a THROWAWAY local database migrated with
+db/migrate.py and delete their rows afterwards. They refuse to run unless
+BENCH_DSN is set or PGDATABASE has "bench" in its name (benchmarks/seed.py).
+
+Results go to --out as JSON. Each metric is compared with --baseline:
+a metric regresses when it is worse than the baseline by more than its
+threshold (per-metric "thresholds" in the baseline file, else
+--threshold). Any regression makes the exit status 1.
+"""
+
+import os
+import sys
+import argparse
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from analytics.toxicity import escalation_flag, toxicity_score
+from benchmarks.corpus import BENCH_SOURCE_CONTEXT, generate_corpus, synthetic_embeddings
+from benchmarks.seed import connect
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+RESULTS_PATH = os.path.join(ROOT, "benchmarks", "results", "latest.json")
+DEFAULT_THRESHOLD = 0.25
+
+SUITE_BRANDS = ["suite alpha", "suite beta", "suite gamma"]
+
+HIGHER = "higher"
+LOWER = "lower"
+
+
+class Skip(Exception):
+    """Benchmark cannot run in this environment (reason in the message)."""
+
+
+def metric(value: float, unit: str, better: str = HIGHER) -> dict:
+    return {"value": round(float(value), 3), "unit": unit, "better": better}
+
+
+def timed(fn: Callable, *args, **kwargs):
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t0
+
+
+# ------------------------------------------------------------
+# BENCHMARKS
+# ------------------------------------------------------------
+def bench_toxicity(ctx) -> Dict[str, dict]:
+    bodies = [r["body"] for r in ctx["corpus"]]
+
+    def run():
+        for body in bodies:
+            tox = toxicity_score(body)
+            escalation_flag(-0.6, tox, body)
+
+    _, secs = timed(run)
+    return {"toxicity.rows_per_s": metric(len(bodies) / secs, "rows/s")}
+
+
+def bench_sentiment(ctx) -> Dict[str, dict]:
+    try:
+        from analytics.sentiment import transformer_sentiment
+    except Exception as e:
+        raise Skip(f"transformer model unavailable: {e}")
+
+    bodies = [r["body"] for r in ctx["corpus"][: ctx["model_rows"]]]
+    transformer_sentiment(bodies[0])  # warm-up
+    _, secs = timed(lambda: [transformer_sentiment(b) for b in bodies])
+    return {"sentiment.rows_per_s": metric(len(bodies) / secs, "rows/s")}
+
+
+def bench_embedding(ctx) -> Dict[str, dict]:
+    try:
+        from sentence_transformers import SentenceTransformer
+        from scripts.run_embedding_pipeline import EMBEDDING_MODEL_NAME
+        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    except Exception as e:
+        raise Skip(f"MiniLM unavailable: {e}")
+
+    texts = [r["body"] or " " for r in ctx["corpus"][: ctx["model_rows"]]]
+    model.encode(texts[:32], show_progress_bar=False)  # warm-up
+    _, secs = timed(model.encode, texts, batch_size=32, show_progress_bar=False, convert_to_numpy=True)
+    return {"embedding.rows_per_s": metric(len(texts) / secs, "rows/s")}
+
+
+def bench_insert(ctx) -> Dict[str, dict]:
+    from ingestion.load_to_db import insert_mentions, insert_mentions_bulk
+
+    conn = ctx["conn"]
+    n = min(ctx["insert_rows"], len(ctx["corpus"]))
+    per_row = generate_corpus(n, seed=ctx["seed"], brands=SUITE_BRANDS, run_tag="suite_row")
+    bulk = generate_corpus(n, seed=ctx["seed"], brands=SUITE_BRANDS, run_tag="suite_bulk")
+
+    inserted, secs_row = timed(insert_mentions, per_row, conn)
+
+    def run_bulk():
+        with conn.cursor() as cur:
+            count = insert_mentions_bulk(cur, bulk)
+        conn.commit()
+        return count
+
+    inserted_bulk, secs_bulk = timed(run_bulk)
+    if inserted != n or inserted_bulk != n:
+        raise RuntimeError(f"insert benchmark inserted {inserted}/{inserted_bulk} of {n} rows")
+
+    return {
+        "insert.row_at_a_time_rows_per_s": metric(n / secs_row, "rows/s"),
+        "insert.bulk_rows_per_s": metric(n / secs_bulk, "rows/s"),
+    }
+
+
+def bench_clustering(ctx) -> Dict[str, dict]:
+    from psycopg2.extras import execute_values
+    from scripts import run_clustering_pipeline
+
+    conn = ctx["conn"]
+    ensure_suite_rows(ctx)
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT raw_id, brand FROM mentions_raw
+            WHERE source_context = %s AND brand = ANY(%s)
+            ORDER BY raw_id;
+            """,
+            (BENCH_SOURCE_CONTEXT, SUITE_BRANDS),
+        )
+        rows = cur.fetchall()
+        X = synthetic_embeddings(len(rows), dim=run_clustering_pipeline.EMBEDDING_DIM, seed=ctx["seed"])
+        execute_values(
+            cur,
+            """
+            INSERT INTO review_embeddings (raw_id, brand, embedding, embedding_model)
+            VALUES %s
+            ON CONFLICT (raw_id) DO NOTHING;
+            """,
+            [(rid, brand, X[i].tobytes(), "bench") for i, (rid, brand) in enumerate(rows)],
+            page_size=5000,
+        )
+    conn.commit()
+
+    # Top terms cover every clustered review, not just this run's: timed by bench_ctfidf
+    clustered, secs = timed(run_clustering_pipeline.main, conn, refresh_terms=False, brands=SUITE_BRANDS)
+    if not clustered:
+        raise RuntimeError("clustering benchmark clustered no rows")
+    return {"clustering.rows_per_s": metric(clustered / secs, "rows/s")}
+
+
+def bench_ctfidf(ctx) -> Dict[str, dict]:
+    import numpy as np
+    from analytics.clustering import cluster_top_terms
+    from ingestion.preprocess import preprocess_texts
+
+    texts = preprocess_texts([r["body"] for r in ctx["corpus"]])["normalized_text"].tolist()
+    brands = [r["brand"] for r in ctx["corpus"]]
+    cluster_ids = np.random.default_rng(ctx["seed"]).integers(0, 8, len(texts))
+    _, secs = timed(cluster_top_terms, texts, brands, cluster_ids)
+    return {"ctfidf.rows_per_s": metric(len(texts) / secs, "rows/s")}
+
+
+def bench_dashboard(ctx) -> Dict[str, dict]:
+    from app.read_model import fetch_dashboard
+
+    conn = ctx["conn"]
+    ensure_suite_rows(ctx)
+    for brand in SUITE_BRANDS:
+        fetch_dashboard(conn, brand)  # warm
+    timings = []
+    for i in range(ctx["iterations"]):
+        _, secs = timed(fetch_dashboard, conn, SUITE_BRANDS[i % len(SUITE_BRANDS)])
+        timings.append(secs * 1000)
+    conn.rollback()
+    return {"dashboard.p50_ms": metric(statistics.median(timings), "ms", LOWER)}
+
+
+def bench_explorer(ctx) -> Dict[str, dict]:
+    from app.review_explorer import ExplorerFilters, fetch_review_page
+
+    conn = ctx["conn"]
+    ensure_suite_rows(ctx)
+    search = ExplorerFilters(query="login -fingerprint", ratings=(1, 2))
+    with conn.cursor() as cur:
+        # Stand-in assignments unless the clustering benchmark already ran:
+        # 1 review in 50 in cluster 1, too few to find by walking the keyset
+        cur.execute(
+            """
+            INSERT INTO review_clusters (raw_id, brand, cluster_id, clustering_model)
+            SELECT raw_id, brand, (raw_id %% 50 = 0)::int, 'bench'
+            FROM mentions_raw
+            WHERE source_context = %s AND brand = ANY(%s)
+            ON CONFLICT (raw_id) DO NOTHING;
+            """,
+            (BENCH_SOURCE_CONTEXT, SUITE_BRANDS),
+        )
+    conn.commit()
+    # Visibility map set as autovacuum would, so the member lookup can be
+    # index-only (benchmarks/seed.py). VACUUM needs autocommit.
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE review_clusters;")
+    finally:
+        conn.autocommit = False
+    with conn.cursor() as cur:
+        # The smallest cluster per brand is the slow case
+        cur.execute(
+            """
+            SELECT DISTINCT ON (brand) brand, cluster_id
+            FROM review_clusters
+            WHERE brand = ANY(%s)
+            GROUP BY brand, cluster_id
+            ORDER BY brand, COUNT(*), cluster_id;
+            """,
+            (SUITE_BRANDS,),
+        )
+        small = {b: ExplorerFilters(cluster_ids=(c,)) for b, c in cur.fetchall()}
+    conn.commit()
+
+    def deep_page(brand):
+        # Walk 20 pages by cursor; only the last fetch is what a user waits for
+        page = fetch_review_page(conn, brand, ExplorerFilters())
+        for _ in range(19):
+            if page.next_cursor is None:
+                break
+            page = fetch_review_page(conn, brand, ExplorerFilters(), page.next_cursor)
+        return page.next_cursor
+
+    cursors = {brand: deep_page(brand) for brand in SUITE_BRANDS}  # also warms
+    paths = {
+        "first_page": lambda b: fetch_review_page(conn, b, ExplorerFilters()),
+        "deep_page": lambda b: fetch_review_page(conn, b, ExplorerFilters(), cursors[b]),
+        "search": lambda b: fetch_review_page(conn, b, search),
+        "cluster": lambda b: fetch_review_page(conn, b, small[b]),
+    }
+    out = {}
+    for name, fn in paths.items():
+        timings = []
+        for i in range(ctx["iterations"]):
+            _, secs = timed(fn, SUITE_BRANDS[i % len(SUITE_BRANDS)])
+            timings.append(secs * 1000)
+        out[f"explorer.{name}_p50_ms"] = metric(statistics.median(timings), "ms", LOWER)
+    conn.rollback()
+    return out
+
+
+BENCHMARKS = {
+    "toxicity": (bench_toxicity, False),
+    "sentiment": (bench_sentiment, False),
+    "embedding": (bench_embedding, False),
+    "insert": (bench_insert, True),
+    "clustering": (bench_clustering, True),
+    "ctfidf": (bench_ctfidf, False),
+    "dashboard": (bench_dashboard, True),
+    "explorer": (bench_explorer, True),
+}
+
+
+# ------------------------------------------------------------
+# DB FIXTURES
+# ------------------------------------------------------------
+def ensure_suite_rows(ctx):
+    """The suite corpus in mentions_raw with sentiment, once per run."""
+    if ctx.get("suite_rows_loaded"):
+        return
+    from ingestion.load_to_db import insert_mentions_bulk
+
+    conn = ctx["conn"]
+    rows = generate_corpus(len(ctx["corpus"]), seed=ctx["seed"], brands=SUITE_BRANDS, run_tag="suite")
+    with conn.cursor() as cur:
+        insert_mentions_bulk(cur, rows)
+        # Rule-based stand-in for the sentiment stage so the read path has data
+        cur.execute(
+            """
+            INSERT INTO mentions_ml (raw_id, brand, sentiment_label, sentiment_score, toxicity_score, escalation_score)
+            SELECT raw_id, brand,
+                   CASE WHEN rating >= 4 THEN 'positive' WHEN rating <= 2 THEN 'negative' ELSE 'neutral' END,
+                   (rating - 3) / 2.0, 0, 0
+            FROM mentions_raw
+            WHERE source_context = %s AND brand = ANY(%s)
+            ON CONFLICT (raw_id) DO NOTHING;
+            """,
+            (BENCH_SOURCE_CONTEXT, SUITE_BRANDS),
+        )
+        cur.execute("ANALYZE mentions_raw; ANALYZE mentions_ml;")
+    conn.commit()
+    ctx["suite_rows_loaded"] = True
+
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT raw_id FROM mentions_raw WHERE source_context = %s AND brand = ANY(%s);",
+            (BENCH_SOURCE_CONTEXT, SUITE_BRANDS),
+        )
+        ids = [r[0] for r in cur.fetchall()]
+        for table in ("review_clusters", "review_embeddings", "mentions_ml"):
+            cur.execute(f"DELETE FROM {table} WHERE raw_id = ANY(%s);", (ids,))
+        for table in ("pipeline_skips", "pipeline_retries"):
+            cur.execute(
+                f"DELETE FROM {table} WHERE stage = ANY(%s);",
+                ([f"clustering:{b}" for b in SUITE_BRANDS],),
+            )
+        cur.execute(
+            "DELETE FROM pipeline_state WHERE stage = ANY(%s);",
+            ([f"clustering:{b}" for b in SUITE_BRANDS],),
+        )
+        cur.execute("DELETE FROM cluster_summaries WHERE brand = ANY(%s);", (SUITE_BRANDS,))
+        cur.execute("DELETE FROM cluster_exemplars WHERE brand = ANY(%s);", (SUITE_BRANDS,))
+        cur.execute("DELETE FROM cluster_daily_counts WHERE brand = ANY(%s);", (SUITE_BRANDS,))
+        cur.execute(
+            "DELETE FROM mentions_raw WHERE source_context = %s AND brand = ANY(%s);",
+            (BENCH_SOURCE_CONTEXT, SUITE_BRANDS),
+        )
+        cur.execute(
+            "DELETE FROM mentions_source_keys WHERE source = 'google_play' AND source_id LIKE 'suite%%';"
+        )
+    conn.commit()
+
+
+# ------------------------------------------------------------
+# BASELINE
+# ------------------------------------------------------------
+def compare(results: Dict[str, dict], baseline: dict, default_threshold: float) -> List[str]:
+    regressions = []
+    thresholds = baseline.get("thresholds", {})
+    for name, base in baseline.get("metrics", {}).items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        t = thresholds.get(name, default_threshold)
+        if base["better"] == HIGHER:
+            worse = cur["value"] < base["value"] * (1 - t)
+        else:
+            worse = cur["value"] > base["value"] * (1 + t)
+        change = (cur["value"] - base["value"]) / base["value"] * 100 if base["value"] else 0.0
+        status = "REGRESSED" if worse else "ok"
+        print(
+            f"{name:<34} {base['value']:>12.1f} {cur['value']:>12.1f} "
+            f"{change:>+8.1f}%  (±{t * 100:.0f}%) {status}"
+        )
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def write_json(path: str, data: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run only these benchmarks")
+    parser.add_argument("--no-db", action="store_true", help="Skip benchmarks that need Postgres")
+    parser.add_argument("--rows", type=int, default=20000, help="Corpus size")
+    parser.add_argument("--model-rows", type=int, default=500, help="Rows for model benchmarks")
+    parser.add_argument("--insert-rows", type=int, default=5000, help="Rows per insert path")
+    parser.add_argument("--iterations", type=int, default=30, help="Dashboard and explorer iterations")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=RESULTS_PATH, help="Results JSON (default: %(default)s)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative regression when the baseline sets none (default: %(default)s)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    args = parser.parse_args(argv)
+
+    ctx = {
+        "corpus": generate_corpus(args.rows, seed=args.seed),
+        "seed": args.seed,
+        "model_rows": args.model_rows,
+        "insert_rows": args.insert_rows,
+        "iterations": args.iterations,
+        "conn": None,
+    }
+
+    names = args.only or list(BENCHMARKS)
+    needs_db = not args.no_db and any(BENCHMARKS[n][1] for n in names)
+    if needs_db:
+        ctx["conn"] = connect()
+        cleanup(ctx["conn"])
+
+    results: Dict[str, dict] = {}
+    skipped: Dict[str, str] = {}
+    try:
+        for name in names:
+            fn, uses_db = BENCHMARKS[name]
+            if uses_db and ctx["conn"] is None:
+                skipped[name] = "--no-db"
+                continue
+            try:
+                metrics = fn(ctx)
+            except Skip as e:
+                skipped[name] = str(e)
+                print(f"[INFO] {name}: skipped ({e})")
+                continue
+            results.update(metrics)
+            for m, v in metrics.items():
+                print(f"[INFO] {m} = {v['value']} {v['unit']}")
+    finally:
+        if ctx["conn"] is not None:
+            cleanup(ctx["conn"])
+            ctx["conn"].close()
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "params": {"rows": args.rows, "model_rows": args.model_rows, "insert_rows": args.insert_rows, "seed": args.seed},
+        "metrics": results,
+        "skipped": skipped,
+    }
+    write_json(args.out, report)
+    print(f"[INFO] Results written to {args.out}")
+
+    if args.update_baseline:
+        previous = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f)
+        write_json(args.baseline, {
+            "generated_at": report["generated_at"],
+            "host": report["host"],
+            "metrics": {**previous.get("metrics", {}), **results},
+            "thresholds": previous.get("thresholds", {}),
+        })
+        print(f"[INFO] Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("[INFO] No baseline yet; run with --update-baseline to create one")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"{'metric':<34} {'baseline':>12} {'current':>12} {'change':>9}")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"[WARN] {len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+EXPLAIN snapshots for the serving queries.
+
+Runs EXPLAIN (FORMAT JSON) for each query in SERVING_QUERIES against a local,
+migrated and seeded Postgres, reduces every plan to its access paths
+(node type + index/relation, partitions collapsed to their parent) and
+compares them with db/plan_snapshots.json. A query that silently falls back
+to a sequential scan after a schema change fails the check.
+
+Independently of the snapshots, any Seq Scan over a relation with at least
+SEQ_SCAN_MAX_ROWS rows (pg_class.reltuples, per partition) fails, so a bad
+plan can never be accepted into the snapshot file. Seed enough rows for
+the planner to prefer the intended indexes (--seed 200000 or more); small
+partitions may still be scanned sequentially.
+
+Usage (throwaway database only):
+    python db/migrate.py
+    python db/check_query_plans.py --seed 200000
+    python db/check_query_plans.py --update   # accept current plans
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from db.migrate import connect
+from db.pipeline_state import get_watermark
+
+SNAPSHOT_PATH = os.path.join(ROOT, "db", "plan_snapshots.json")
+
+# Partitions of mentions_raw show up as mentions_raw_y2026m01 etc.
+_PARTITION_RE = re.compile(r"^(mentions_raw)_(y\d{4}m\d{2}|default)")
+
+SAMPLE_BRAND = "chase"
+
+# A sequential scan over a relation this large is always a regression
+SEQ_SCAN_MAX_ROWS = 10_000
+
+SERVING_QUERIES: Dict[str, str] = {
+    "dashboard_recent": """
+        SELECT created_utc, author, rating, body, version
+        FROM mentions_raw
+        WHERE source = 'google_play' AND brand = %(brand)s
+        ORDER BY created_utc DESC
+        LIMIT 20
+    """,
+    "dashboard_sentiment_distribution": """
+        SELECT sentiment_label, COUNT(*)
+        FROM mentions_ml
+        WHERE brand = %(brand)s
+        GROUP BY sentiment_label
+    """,
+    "dashboard_most_negative": """
+        SELECT raw_id, sentiment_score, toxicity_score
+        FROM mentions_ml
+        WHERE brand = %(brand)s AND sentiment_score IS NOT NULL
+        ORDER BY sentiment_score ASC
+        LIMIT 5
+    """,
+    "dashboard_clusters": """
+        SELECT rc.cluster_id, COUNT(*), AVG(ml.sentiment_score)
+        FROM review_clusters rc
+        LEFT JOIN mentions_ml ml ON ml.raw_id = rc.raw_id AND ml.brand = rc.brand
+        WHERE rc.brand = %(brand)s
+        GROUP BY rc.cluster_id
+    """,
+    "sentiment_find_unprocessed": """
+        SELECT raw_id, created_utc, brand, body, rating, normalized_text, content_hash
+        FROM mentions_raw mr
+        WHERE mr.raw_id > %(sentiment_watermark)s
+          AND NOT mr.ml_processed
+          AND NOT EXISTS (
+              SELECT 1 FROM pipeline_retries pr
+              WHERE pr.stage = 'sentiment' AND pr.raw_id = mr.raw_id
+          )
+        ORDER BY mr.raw_id
+        LIMIT 256
+    """,
+    "embedding_find_new": """
+        SELECT mr.raw_id, mr.brand, mr.body, mr.normalized_text, mr.token_count, mr.content_hash
+        FROM mentions_raw mr
+        WHERE mr.raw_id > %(embedding_watermark)s
+          AND NOT EXISTS (
+              SELECT 1 FROM review_embeddings re WHERE re.raw_id = mr.raw_id
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM pipeline_retries pr
+              WHERE pr.stage = 'embedding' AND pr.raw_id = mr.raw_id
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM pipeline_skips ps
+              WHERE ps.stage = 'embedding' AND ps.raw_id = mr.raw_id
+          )
+        ORDER BY mr.raw_id
+        LIMIT 2000
+    """,
+    "rollup_latest_processed": """
+        SELECT MAX(processed_at) FROM mentions_ml
+    """,
+}
+
+
+def _collapse(name: str) -> str:
+    return _PARTITION_RE.sub(r"\1_*", name)
+
+
+def access_paths(plan: dict) -> List[str]:
+    """
+    Flattens a JSON plan into sorted unique "Node Type [index] on relation"
+    strings for every scan node.
+    """
+    out = set()
+
+    def walk(node):
+        ntype = node.get("Node Type", "")
+        if "Scan" in ntype and ntype not in ("Subquery Scan", "CTE Scan", "Function Scan"):
+            parts = [ntype]
+            if node.get("Index Name"):
+                parts.append(f"using {_collapse(node['Index Name'])}")
+            if node.get("Relation Name"):
+                parts.append(f"on {_collapse(node['Relation Name'])}")
+            out.add(" ".join(parts))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan["Plan"])
+    return sorted(out)
+
+
+def seq_scanned(plan: dict) -> List[str]:
+    """Relation names (partitions not collapsed) read by a Seq Scan."""
+    out = set()
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name"):
+            out.add(node["Relation Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan["Plan"])
+    return sorted(out)
+
+
+def explain_all(conn) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """
+    Returns (access paths per query, large relations each query seq-scans).
+    Work-discovery queries are planned with the current watermarks, as the
+    stages pass them.
+    """
+    plans = {}
+    large_seq = {}
+    with conn.cursor() as cur:
+        params = {
+            "brand": SAMPLE_BRAND,
+            "sentiment_watermark": get_watermark(cur, "sentiment"),
+            "embedding_watermark": get_watermark(cur, "embedding"),
+        }
+        for name, q in SERVING_QUERIES.items():
+            cur.execute("EXPLAIN (FORMAT JSON) " + q, params)
+            plan = cur.fetchone()[0][0]
+            plans[name] = access_paths(plan)
+            rels = seq_scanned(plan)
+            if rels:
+                cur.execute(
+                    "SELECT relname FROM pg_class WHERE relname = ANY(%s) AND reltuples >= %s ORDER BY relname;",
+                    (rels, SEQ_SCAN_MAX_ROWS),
+                )
+                large = [r[0] for r in cur.fetchall()]
+                if large:
+                    large_seq[name] = large
+    conn.rollback()
+    return plans, large_seq
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check serving-query plans against snapshots")
+    parser.add_argument("--update", action="store_true", help="Rewrite the snapshot file")
+    parser.add_argument("--seed", type=int, default=0, help="Seed N synthetic reviews first")
+    args = parser.parse_args()
+
+    if args.seed:
+        # Seeding writes synthetic rows: bench databases only
+        from benchmarks.seed import use_bench_database
+        use_bench_database()
+
+    conn = connect()
+    try:
+        if args.seed:
+            from benchmarks.seed import seed_database
+            seed_database(conn, args.seed)
+
+        current, large_seq = explain_all(conn)
+    finally:
+        conn.close()
+
+    if large_seq:
+        for name, rels in sorted(large_seq.items()):
+            print(f"[FAIL] {name}: Seq Scan on large relation(s) {', '.join(rels)}")
+        print("[FAIL] Snapshots not compared or written; fix the plans (or seed more rows) first")
+        sys.exit(1)
+
+    if args.update or not os.path.exists(SNAPSHOT_PATH):
+        with open(SNAPSHOT_PATH, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"[INFO] Wrote {len(current)} plan snapshots to {SNAPSHOT_PATH}")
+        return
+
+    with open(SNAPSHOT_PATH, encoding="utf-8") as f:
+        expected = json.load(f)
+
+    failures = 0
+    for name in sorted(set(expected) | set(current)):
+        if name not in expected:
+            print(f"[NEW]  {name}: no snapshot yet (run with --update to accept)")
+            print(f"       actual:   {current[name]}")
+            continue
+        if expected.get(name) == current.get(name):
+            print(f"[OK]   {name}")
+            continue
+        failures += 1
+        print(f"[FAIL] {name}")
+        print(f"       expected: {expected.get(name)}")
+        print(f"       actual:   {current.get(name)}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
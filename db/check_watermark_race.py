@@ -0,0 +1,152 @@
+"""
+Checks that a watermark never passes a row committed out of raw_id order.
+
+Replays the stage loop of run_sentiment_pipeline / run_embedding_pipeline
+(db/pipeline_state.py: read_cap before each read, advance to
+min(last id read, cap)) against a real Postgres with two writers:
+
+    slow writer   INSERT row L ............................ COMMIT
+    fast writer      INSERT row H > L, COMMIT
+    stage                         read_cap, read (sees H), | score, advance
+
+Row L commits while the batch is being scored. The watermark must stay
+below L, and the next run must read L.
+
+It also checks the timestamp watermarks on mentions_ml.processed_at
+(processed_at_cap): a row stamped by a transaction that was open when the
+cap was taken must lie above the cap, so the next run reads it.
+
+Usage (bench database only, see benchmarks/seed.py):
+    python db/migrate.py
+    python db/check_watermark_race.py
+"""
+
+import os
+import sys
+from typing import List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.seed import connect
+from db.pipeline_state import advance_watermark, capture_horizon, get_watermark, processed_at_cap, read_cap
+
+STAGE = "check:watermark_race"
+SOURCE_CONTEXT = "watermark_race_check"
+
+
+def insert_row(cur, tag: str) -> int:
+    cur.execute(
+        """
+        INSERT INTO mentions_raw (source, source_id, brand, created_utc, body, source_context)
+        VALUES ('google_play', %s, 'watermark race', NOW(), 'watermark race check', %s)
+        RETURNING raw_id;
+        """,
+        (f"watermark_race_{tag}", SOURCE_CONTEXT),
+    )
+    return cur.fetchone()[0]
+
+
+def fetch_new(cur, after: int) -> List[int]:
+    cur.execute(
+        "SELECT raw_id FROM mentions_raw WHERE raw_id > %s AND source_context = %s ORDER BY raw_id;",
+        (after, SOURCE_CONTEXT),
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM mentions_raw WHERE source_context = %s;", (SOURCE_CONTEXT,))
+        cur.execute("DELETE FROM mentions_source_keys WHERE source_id LIKE 'watermark_race_%%';")
+        cur.execute("DELETE FROM pipeline_state WHERE stage = %s;", (STAGE,))
+    conn.commit()
+
+
+def check_processed_at(failures: List[str]):
+    """A slow scorer's processed_at (its transaction start) stays above the cap."""
+    stage_conn, slow = connect(), connect()
+    try:
+        with slow.cursor() as scur:
+            scur.execute("SELECT NOW()::timestamp;")     # opens the transaction, stamps processed_at
+            stamped = scur.fetchone()[0]
+        with stage_conn.cursor() as cur:
+            cap = processed_at_cap(cur)
+        stage_conn.rollback()
+        if cap >= stamped:
+            failures.append(f"processed_at cap {cap} is not below open writer's stamp {stamped}")
+        slow.commit()
+        with stage_conn.cursor() as cur:
+            cap = processed_at_cap(cur)
+        stage_conn.rollback()
+        if cap < stamped:
+            failures.append(f"processed_at cap {cap} stayed below {stamped} after the writer committed")
+    finally:
+        for c in (slow, stage_conn):
+            c.rollback()
+            c.close()
+
+
+def main() -> int:
+    stage_conn, slow, fast = connect(), connect(), connect()
+    cur = stage_conn.cursor()
+    failures = []
+    try:
+        cleanup(stage_conn)
+
+        low = insert_row(slow.cursor(), "low")        # left open
+        with fast.cursor() as fcur:
+            high = insert_row(fcur, "high")
+        fast.commit()
+
+        advance_watermark(cur, STAGE, low - 1)
+        stage_conn.commit()
+
+        # Run 1: the slow writer is still open when the cap is taken
+        watermark = get_watermark(cur, STAGE)
+        horizon = capture_horizon(cur)
+        cap, horizon = read_cap(cur, horizon, watermark)
+        rows = fetch_new(cur, watermark)
+        slow.commit()                                 # commits while the batch is scored
+        watermark = max(watermark, min(rows[-1], cap))
+        advance_watermark(cur, STAGE, watermark)
+        stage_conn.commit()
+
+        if low in rows:
+            failures.append(f"run 1 read row {low} before its commit")
+        if high not in rows:
+            failures.append(f"run 1 did not read committed row {high}")
+        if watermark >= low:
+            failures.append(f"watermark advanced to {watermark}, past uncommitted row {low}")
+
+        # Run 2: starts from the watermark and must pick up the late row
+        watermark = get_watermark(cur, STAGE)
+        horizon = capture_horizon(cur)
+        cap, horizon = read_cap(cur, horizon, watermark, wait=5.0)
+        rows = fetch_new(cur, watermark)
+        stage_conn.rollback()
+        if low not in rows:
+            failures.append(f"run 2 never read late row {low}")
+        if cap < high:
+            failures.append(f"cap {cap} did not reach {high} once every writer had finished")
+    finally:
+        for c in (slow, fast):
+            c.rollback()
+            c.close()
+        cleanup(stage_conn)
+        cur.close()
+        stage_conn.close()
+
+    check_processed_at(failures)
+    for f in failures:
+        print(f"[FAIL] {f}")
+    if failures:
+        return 1
+    print(f"[OK]   late row {low} held the watermark back and was read by the next run")
+    print("[OK]   processed_at cap stayed below an open writer's transaction start")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
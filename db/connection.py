@@ -0,0 +1,91 @@
+"""
+Shared, pooled Postgres connections for long-lived processes.
+
+One-off scripts keep their own connect(); the pipeline runner and other
+multi-stage processes borrow from a single pool instead so stages don't pay
+a fresh connect (TLS + auth to Supabase) each.
+
+psycopg2's pool raises PoolError as soon as every connection is out, so
+borrowers queue on a semaphore sized to the pool instead: a stage holding
+one connection can start more workers than there are connections left and
+they simply wait their turn.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from psycopg2 import extensions
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+from observability.instrument import InstrumentedConnection
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+load_dotenv(os.path.join(ROOT, ".env"))
+
+POOL_MIN_CONN = 1
+POOL_MAX_CONN = int(os.getenv("PG_POOL_MAX", "4"))
+# How long a borrower waits for a free connection before giving up
+POOL_WAIT_SECS = float(os.getenv("PG_POOL_WAIT_SECS", "600"))
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ThreadedConnectionPool:
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None:
+            _pool_slots = threading.BoundedSemaphore(POOL_MAX_CONN)
+            _pool = ThreadedConnectionPool(
+                POOL_MIN_CONN,
+                POOL_MAX_CONN,
+                host=os.getenv("PGHOST"),
+                port=os.getenv("PGPORT"),
+                database=os.getenv("PGDATABASE"),
+                user=os.getenv("PGUSER"),
+                password=os.getenv("PGPASSWORD"),
+                connection_factory=InstrumentedConnection,
+            )
+        return _pool
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrows a connection for the duration of the block, waiting up to
+    POOL_WAIT_SECS for one to be returned if all are in use. Anything left
+    uncommitted is rolled back before the connection goes back to the pool.
+    """
+    pool = get_pool()
+    slots = _pool_slots
+    if not slots.acquire(timeout=POOL_WAIT_SECS):
+        raise PoolError(f"no pooled connection free after {POOL_WAIT_SECS:.0f}s")
+    try:
+        conn = pool.getconn()
+    except Exception:
+        slots.release()
+        raise
+    try:
+        yield conn
+    finally:
+        try:
+            if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    conn.close()
+            pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            slots.release()
+
+
+def close_pool():
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _pool_slots = None
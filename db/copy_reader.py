@@ -0,0 +1,189 @@
+"""
+Bulk reads via COPY (query) TO STDOUT, parsed straight into columns.
+
+cur.fetchall() builds one Python tuple per row and one object per value;
+for large reads that dominates both time and memory. Two readers avoid it:
+
+- copy_arrow_batches / read_arrow: CSV COPY streamed through a pipe into
+  pyarrow's C++ CSV reader, yielding Arrow record batches of bounded size.
+  Any column types; bytea is not supported (it arrives hex-encoded).
+- read_fixed_binary: binary COPY for rows whose every field is fixed width
+  (ints, floats, bools, fixed-size bytea such as embeddings). Each chunk is
+  reinterpreted with one NumPy structured dtype, no per-row Python at all.
+
+Both take a psycopg2 connection and leave its transaction open (COPY runs
+inside it), like any other read.
+"""
+
+import os
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+BLOCK_SIZE = 8 << 20          # bytes per Arrow CSV block (~ one record batch)
+BINARY_CHUNK_ROWS = 65_536    # rows reinterpreted per NumPy chunk
+
+_PG_SIGNATURE = b"PGCOPY\n\xff\r\n\x00"
+
+
+# ------------------------------------------------------------
+# CSV -> ARROW
+# ------------------------------------------------------------
+def copy_arrow_batches(conn, query: str, params=None,
+                       column_types: Optional[Dict[str, pa.DataType]] = None,
+                       block_size: int = BLOCK_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Streams the result of query as Arrow record batches. column_types pins
+    types that CSV inference would get wrong (e.g. all-NULL blocks, ids
+    that must stay int64); other columns are inferred.
+    """
+    with conn.cursor() as cur:
+        sql = cur.mogrify(query, params).decode("utf-8").strip().rstrip(";")
+        copy_sql = f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+
+        read_fd, write_fd = os.pipe()
+        errors: List[BaseException] = []
+
+        def produce():
+            with os.fdopen(write_fd, "wb") as sink:
+                try:
+                    cur.copy_expert(copy_sql, sink)
+                except BaseException as e:
+                    errors.append(e)
+
+        producer = threading.Thread(target=produce, name="copy-reader", daemon=True)
+        producer.start()
+
+        with os.fdopen(read_fd, "rb") as source:
+            try:
+                reader = pacsv.open_csv(
+                    source,
+                    read_options=pacsv.ReadOptions(block_size=block_size),
+                    # Postgres quotes values with embedded newlines (review bodies)
+                    parse_options=pacsv.ParseOptions(newlines_in_values=True),
+                    convert_options=pacsv.ConvertOptions(
+                        column_types=column_types or {},
+                        strings_can_be_null=True,
+                    ),
+                )
+                empty = True
+                for batch in reader:
+                    empty = False
+                    yield batch
+                if empty:
+                    # Header only: still report the columns
+                    yield pa.RecordBatch.from_pylist([], schema=reader.schema)
+            except pa.ArrowInvalid:
+                # A failed COPY closes the pipe early; surface the SQL error.
+                # Drain first: a producer blocked on a full pipe never exits.
+                _drain(source)
+                producer.join()
+                if errors:
+                    raise errors[0] from None
+                raise
+            finally:
+                # Drain so the producer can finish if the consumer stopped early
+                _drain(source)
+                producer.join()
+
+        if errors:
+            raise errors[0]
+
+
+def _drain(source):
+    while source.read(1 << 16):
+        pass
+
+
+def read_arrow(conn, query: str, params=None,
+               column_types: Optional[Dict[str, pa.DataType]] = None) -> pa.Table:
+    return pa.Table.from_batches(list(copy_arrow_batches(conn, query, params, column_types)))
+
+
+# ------------------------------------------------------------
+# FIXED-WIDTH BINARY -> NUMPY
+# ------------------------------------------------------------
+class _FixedRowSink:
+    """File-like target for copy_expert that parses whole rows as they arrive."""
+
+    def __init__(self, row_dtype: np.dtype, chunk_rows: int):
+        self.row_dtype = row_dtype
+        self.chunk_bytes = row_dtype.itemsize * chunk_rows
+        self.buf = bytearray()
+        self.header_done = False
+        self.chunks: List[np.ndarray] = []
+
+    def write(self, data):
+        self.buf += data
+        if not self.header_done:
+            if len(self.buf) < 19:
+                return len(data)
+            if bytes(self.buf[:11]) != _PG_SIGNATURE:
+                raise ValueError("Not a PostgreSQL binary COPY stream")
+            ext_len = int.from_bytes(self.buf[15:19], "big")
+            if len(self.buf) < 19 + ext_len:
+                return len(data)
+            del self.buf[: 19 + ext_len]
+            self.header_done = True
+        if len(self.buf) >= self.chunk_bytes:
+            self._parse(len(self.buf) // self.row_dtype.itemsize)
+        return len(data)
+
+    def _parse(self, n_rows: int):
+        if n_rows <= 0:
+            return
+        size = n_rows * self.row_dtype.itemsize
+        self.chunks.append(np.frombuffer(self.buf, dtype=self.row_dtype, count=n_rows).copy())
+        del self.buf[:size]
+
+    def finish(self) -> List[np.ndarray]:
+        # Trailer is a 2-byte -1 field count
+        if len(self.buf) < 2 or bytes(self.buf[-2:]) != b"\xff\xff":
+            raise ValueError("Truncated binary COPY stream")
+        body = len(self.buf) - 2
+        if body % self.row_dtype.itemsize:
+            raise ValueError("Row with a NULL or non-fixed-width field in binary COPY")
+        self._parse(body // self.row_dtype.itemsize)
+        return self.chunks or [np.empty(0, dtype=self.row_dtype)]
+
+
+def read_fixed_binary(conn, query: str, params, fields: Sequence[Tuple[str, str]],
+                      chunk_rows: int = BINARY_CHUNK_ROWS) -> Dict[str, np.ndarray]:
+    """
+    fields: [(name, numpy dtype)] matching the query's columns, big-endian
+    as PostgreSQL sends them, e.g. [("raw_id", ">i4"), ("ok", "?"),
+    ("embedding", "V1536")]. No field may be NULL and every value must have
+    exactly that width (use COALESCE / CASE in the query to guarantee it).
+
+    Returns {name: ndarray} in native byte order; void fields come back as
+    raw bytes arrays (view them with .view(np.float32) etc.).
+    """
+    layout = [("_nfields", ">i2")]
+    for name, dtype in fields:
+        layout += [(f"_len_{name}", ">i4"), (name, dtype)]
+    row_dtype = np.dtype(layout)
+
+    with conn.cursor() as cur:
+        sql = cur.mogrify(query, params).decode("utf-8").strip().rstrip(";")
+        sink = _FixedRowSink(row_dtype, chunk_rows)
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT binary)", sink)
+    chunks = sink.finish()
+
+    for rows in chunks:
+        if np.any(rows["_nfields"] != len(fields)):
+            raise ValueError("Unexpected field count in binary COPY")
+        for name, dtype in fields:
+            if np.any(rows[f"_len_{name}"] != np.dtype(dtype).itemsize):
+                raise ValueError(f"Field {name!r} is NULL or not {np.dtype(dtype).itemsize} bytes wide")
+
+    # Column by column, so only one field is duplicated at a time
+    out = {}
+    for name, dtype in fields:
+        col = np.concatenate([rows[name] for rows in chunks])
+        if col.dtype.kind != "V":
+            col = col.astype(col.dtype.newbyteorder("="))
+        out[name] = col
+    return out
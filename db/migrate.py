@@ -0,0 +1,186 @@
+"""
+Versioned schema migrations.
+
+Applies db/migrations/NNNN_name.sql files in order, each in its own
+transaction, recording them in schema_migrations. Every migration is written
+to be idempotent, and the runner refuses to continue if an already-applied
+file has been edited (checksum mismatch).
+
+Usage:
+    python db/migrate.py            # apply pending migrations
+    python db/migrate.py --status   # list applied / pending
+"""
+
+import os
+import re
+import sys
+import hashlib
+import argparse
+from typing import List, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+load_dotenv(os.path.join(ROOT, ".env"))
+
+MIGRATIONS_DIR = os.path.join(ROOT, "db", "migrations")
+_FILE_RE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+
+# Serializes concurrent runners (arbitrary constant)
+ADVISORY_LOCK_ID = 4_172_031
+
+# Monthly mentions_raw partitions are kept this far ahead of today
+PARTITION_MONTHS_AHEAD = 12
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+    )
+
+
+def discover_migrations(path: str = MIGRATIONS_DIR) -> List[Tuple[int, str, str, str]]:
+    """
+    Returns [(version, name, sql, checksum)] sorted by version.
+    """
+    out = []
+    for fname in sorted(os.listdir(path)):
+        m = _FILE_RE.match(fname)
+        if not m:
+            continue
+        with open(os.path.join(path, fname), encoding="utf-8") as f:
+            sql = f.read()
+        checksum = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+        out.append((int(m.group(1)), m.group(2), sql, checksum))
+
+    versions = [v for v, *_ in out]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {path}")
+    return out
+
+
+def ensure_migrations_table(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INT PRIMARY KEY,
+            name        TEXT NOT NULL,
+            checksum    TEXT NOT NULL,
+            applied_at  TIMESTAMP DEFAULT NOW()
+        );
+        """
+    )
+
+
+def fetch_applied(cur) -> dict:
+    cur.execute("SELECT version, checksum FROM schema_migrations;")
+    return dict(cur.fetchall())
+
+
+def maintain_partitions(cur):
+    cur.execute("SELECT to_regproc('ensure_mentions_raw_partitions') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute(
+        """
+        SELECT ensure_mentions_raw_partitions(
+            CURRENT_DATE,
+            (CURRENT_DATE + make_interval(months => %s))::date
+        );
+        """,
+        (PARTITION_MONTHS_AHEAD,),
+    )
+    return cur.fetchone()[0]
+
+
+def run_migrations(conn) -> List[int]:
+    """
+    Applies pending migrations. Returns the versions applied in this call.
+    """
+    migrations = discover_migrations()
+    applied_now = []
+
+    with conn.cursor() as cur:
+        ensure_migrations_table(cur)
+        conn.commit()
+
+        for version, name, sql, checksum in migrations:
+            # One transaction per migration; the advisory lock is released
+            # at commit/rollback.
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (ADVISORY_LOCK_ID,))
+            applied = fetch_applied(cur)
+
+            if version in applied:
+                if applied[version] != checksum:
+                    conn.rollback()
+                    raise RuntimeError(
+                        f"Migration {version:04d}_{name} was edited after being applied "
+                        "(checksum mismatch). Add a new migration instead."
+                    )
+                conn.rollback()
+                continue
+
+            try:
+                cur.execute(sql)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s);",
+                    (version, name, checksum),
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            applied_now.append(version)
+            print(f"[INFO] Applied migration {version:04d}_{name}")
+
+        created = maintain_partitions(cur)
+        conn.commit()
+        if created:
+            print(f"[INFO] Created {created} mentions_raw partitions")
+
+    return applied_now
+
+
+def print_status(conn):
+    with conn.cursor() as cur:
+        ensure_migrations_table(cur)
+        applied = fetch_applied(cur)
+    conn.commit()
+
+    for version, name, _, checksum in discover_migrations():
+        if version not in applied:
+            state = "pending"
+        elif applied[version] != checksum:
+            state = "EDITED"
+        else:
+            state = "applied"
+        print(f"{version:04d}_{name:<40} {state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--status", action="store_true", help="List migrations and exit")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        if args.status:
+            print_status(conn)
+            return
+        applied = run_migrations(conn)
+        print(f"[INFO] Migrations complete | applied={len(applied)}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+-- 0001: baseline schema (formerly db/schema.sql)
+
 -- mentions_raw
 CREATE TABLE IF NOT EXISTS mentions_raw (
     raw_id          SERIAL PRIMARY KEY,
@@ -26,7 +28,7 @@ CREATE TABLE IF NOT EXISTS mentions_ml (
     sentiment_label        TEXT,
     sentiment_score        NUMERIC(5,3),
     toxicity_score         NUMERIC(5,3),
-    escalation_score       NUMERIC(5,3)
+    escalation_score       NUMERIC(5,3),
     processed_at           TIMESTAMP DEFAULT NOW()
 );
 
@@ -65,6 +67,7 @@ CREATE TABLE IF NOT EXISTS review_clusters (
     raw_id INT PRIMARY KEY REFERENCES mentions_raw(raw_id),
     cluster_id INT,
     clustering_run_id TEXT,
+    clustering_model TEXT,
     clustered_at TIMESTAMP DEFAULT NOW()
 );
 
@@ -108,6 +111,13 @@ ADD COLUMN IF NOT EXISTS version TEXT;
 ALTER TABLE mentions_raw
 ADD COLUMN IF NOT EXISTS source_context TEXT;
 
+-- Databases created from the old hand-run schema.sql may lack these
+ALTER TABLE mentions_ml
+ADD COLUMN IF NOT EXISTS processed_at TIMESTAMP DEFAULT NOW();
+
+ALTER TABLE review_clusters
+ADD COLUMN IF NOT EXISTS clustering_model TEXT;
+
 
 -- Index on processed_at in mentions_ml
 CREATE INDEX IF NOT EXISTS idx_mentions_ml_processed
@@ -124,8 +134,24 @@ CREATE INDEX IF NOT EXISTS idx_review_clusters_model
 ON review_clusters(clustering_model);
 
 -- Indexes for cluster_insights
-CREATE INDEX idx_cluster_insights_latest
+CREATE INDEX IF NOT EXISTS idx_cluster_insights_latest
 ON cluster_insights (brand, cluster_id, generated_at DESC);
 
-CREATE INDEX idx_cluster_insights_time
-ON cluster_insights (generated_at);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_cluster_insights_time
+ON cluster_insights (generated_at);
+
+-- Rollup bookkeeping for sentiment_timeseries
+ALTER TABLE sentiment_timeseries
+ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+
+-- pipeline_state: per-stage watermarks for incremental batch jobs
+CREATE TABLE IF NOT EXISTS pipeline_state (
+    stage          TEXT PRIMARY KEY,
+    watermark_ts   TIMESTAMP,
+    watermark_id   BIGINT,
+    updated_at     TIMESTAMP DEFAULT NOW()
+);
+
+-- Serves the dashboard's data-version lookup (MAX(clustered_at))
+CREATE INDEX IF NOT EXISTS idx_review_clusters_clustered_at
+ON review_clusters(clustered_at);
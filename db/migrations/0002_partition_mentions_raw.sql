@@ -0,0 +1,132 @@
+-- 0002: monthly range partitioning of mentions_raw on created_utc
+--
+-- Postgres requires every unique constraint on a partitioned table to include
+-- the partition key, so:
+--   * the primary key becomes (raw_id, created_utc); raw_id stays unique
+--     because it still comes from the same sequence
+--   * (source, source_id) dedup moves to mentions_source_keys, enforced by a
+--     BEFORE INSERT trigger that silently drops duplicates (the same effect
+--     as the old ON CONFLICT (source, source_id) DO NOTHING)
+--   * foreign keys from mentions_ml / review_embeddings / review_clusters to
+--     mentions_raw(raw_id) are dropped; the pipelines only ever write raw_ids
+--     they just read from mentions_raw
+
+-- Creates monthly partitions covering [from_month, to_month]
+CREATE OR REPLACE FUNCTION ensure_mentions_raw_partitions(from_month DATE, to_month DATE)
+RETURNS INT AS $$
+DECLARE
+    m       DATE := date_trunc('month', from_month)::date;
+    created INT := 0;
+    part    TEXT;
+BEGIN
+    WHILE m <= date_trunc('month', to_month)::date LOOP
+        part := format('mentions_raw_y%sm%s', to_char(m, 'YYYY'), to_char(m, 'MM'));
+        IF to_regclass(part) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF mentions_raw FOR VALUES FROM (%L) TO (%L)',
+                part, m, (m + INTERVAL '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        m := (m + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TABLE IF NOT EXISTS mentions_source_keys (
+    source       TEXT NOT NULL,
+    source_id    TEXT NOT NULL,
+    raw_id       INT NOT NULL,
+    created_utc  TIMESTAMP NOT NULL,
+    PRIMARY KEY (source, source_id)
+);
+
+CREATE OR REPLACE FUNCTION mentions_raw_dedup()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO mentions_source_keys (source, source_id, raw_id, created_utc)
+    VALUES (NEW.source, NEW.source_id, NEW.raw_id, NEW.created_utc)
+    ON CONFLICT (source, source_id) DO NOTHING;
+
+    IF NOT FOUND THEN
+        RETURN NULL;  -- duplicate: skip the row
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DO $$
+DECLARE
+    first_month DATE;
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM pg_partitioned_table pt
+        JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = 'mentions_raw'
+    ) THEN
+        RETURN;  -- already partitioned
+    END IF;
+
+    ALTER TABLE mentions_ml       DROP CONSTRAINT IF EXISTS mentions_ml_raw_id_fkey;
+    ALTER TABLE review_embeddings DROP CONSTRAINT IF EXISTS review_embeddings_raw_id_fkey;
+    ALTER TABLE review_clusters   DROP CONSTRAINT IF EXISTS review_clusters_raw_id_fkey;
+
+    ALTER TABLE mentions_raw RENAME TO mentions_raw_unpartitioned;
+
+    CREATE TABLE mentions_raw (
+        raw_id          INT NOT NULL DEFAULT nextval('mentions_raw_raw_id_seq'),
+        source          TEXT NOT NULL,
+        source_id       TEXT NOT NULL,
+        brand           TEXT NOT NULL,
+        created_utc     TIMESTAMP NOT NULL,
+        author          TEXT,
+        title           TEXT,
+        body            TEXT,
+        url             TEXT,
+        subreddit       TEXT,
+        source_context  TEXT,
+        rating          INT,
+        version         TEXT,
+        collected_at    TIMESTAMP DEFAULT NOW(),
+        PRIMARY KEY (raw_id, created_utc)
+    ) PARTITION BY RANGE (created_utc);
+
+    -- Keep the sequence alive when the old table is dropped
+    ALTER SEQUENCE mentions_raw_raw_id_seq OWNED BY mentions_raw.raw_id;
+
+    -- Rows outside any monthly partition (e.g. very old backfills) land here
+    CREATE TABLE mentions_raw_default PARTITION OF mentions_raw DEFAULT;
+
+    SELECT COALESCE(MIN(created_utc)::date, CURRENT_DATE)
+    INTO first_month
+    FROM mentions_raw_unpartitioned;
+
+    PERFORM ensure_mentions_raw_partitions(first_month, (CURRENT_DATE + INTERVAL '12 months')::date);
+
+    INSERT INTO mentions_source_keys (source, source_id, raw_id, created_utc)
+    SELECT source, source_id, raw_id, created_utc
+    FROM mentions_raw_unpartitioned
+    ON CONFLICT (source, source_id) DO NOTHING;
+
+    INSERT INTO mentions_raw (
+        raw_id, source, source_id, brand, created_utc, author, title, body,
+        url, subreddit, source_context, rating, version, collected_at
+    )
+    SELECT
+        raw_id, source, source_id, brand, created_utc, author, title, body,
+        url, subreddit, source_context, rating, version, collected_at
+    FROM mentions_raw_unpartitioned;
+
+    DROP TABLE mentions_raw_unpartitioned;
+
+    CREATE TRIGGER mentions_raw_dedup
+    BEFORE INSERT ON mentions_raw
+    FOR EACH ROW EXECUTE FUNCTION mentions_raw_dedup();
+
+    CREATE INDEX idx_mentions_brand_time ON mentions_raw (brand, created_utc);
+    CREATE INDEX idx_mentions_raw_created ON mentions_raw (created_utc);
+END $$;
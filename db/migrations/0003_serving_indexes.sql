@@ -0,0 +1,66 @@
+-- 0003: serving indexes for the dashboard and pipeline queries
+--
+-- Brand only lived on mentions_raw, so "most negative for brand" and the
+-- sentiment distribution had to join and sort all of mentions_ml. brand is
+-- now denormalized onto mentions_ml and review_clusters (written by the
+-- sentiment and clustering jobs) so those panels are index range scans.
+
+ALTER TABLE mentions_ml
+ADD COLUMN IF NOT EXISTS brand TEXT;
+
+ALTER TABLE review_clusters
+ADD COLUMN IF NOT EXISTS brand TEXT;
+
+UPDATE mentions_ml m
+SET brand = r.brand
+FROM mentions_raw r
+WHERE r.raw_id = m.raw_id
+  AND m.brand IS NULL;
+
+UPDATE review_clusters rc
+SET brand = r.brand
+FROM mentions_raw r
+WHERE r.raw_id = rc.raw_id
+  AND rc.brand IS NULL;
+
+-- Most negative reviews for a brand: ORDER BY sentiment_score LIMIT n
+CREATE INDEX IF NOT EXISTS idx_mentions_ml_brand_sentiment
+ON mentions_ml (brand, sentiment_score)
+INCLUDE (raw_id, toxicity_score);
+
+-- Sentiment distribution for a brand (index-only)
+CREATE INDEX IF NOT EXISTS idx_mentions_ml_brand_label
+ON mentions_ml (brand, sentiment_label);
+
+-- Clusters for a brand and their members (index-only)
+CREATE INDEX IF NOT EXISTS idx_review_clusters_brand_cluster
+ON review_clusters (brand, cluster_id)
+INCLUDE (raw_id);
+
+-- Recent reviews for a brand/source: newest first, covering the join key
+CREATE INDEX IF NOT EXISTS idx_mentions_raw_brand_source_time
+ON mentions_raw (brand, source, created_utc DESC)
+INCLUDE (raw_id, rating);
+
+-- The old non-brand cluster index is superseded
+DROP INDEX IF EXISTS idx_review_clusters_cluster;
+
+
+-- Unprocessed rows: a partial index that only holds raw_ids the sentiment
+-- stage has not scored yet, so finding work never scans processed history.
+ALTER TABLE mentions_raw
+ADD COLUMN IF NOT EXISTS ml_processed BOOLEAN NOT NULL DEFAULT FALSE;
+
+UPDATE mentions_raw r
+SET ml_processed = TRUE
+FROM mentions_ml m
+WHERE m.raw_id = r.raw_id
+  AND NOT r.ml_processed;
+
+CREATE INDEX IF NOT EXISTS idx_mentions_raw_unprocessed
+ON mentions_raw (raw_id)
+WHERE NOT ml_processed;
+
+ANALYZE mentions_raw;
+ANALYZE mentions_ml;
+ANALYZE review_clusters;
@@ -0,0 +1,77 @@
+-- 0004: watermark-based work discovery
+--
+-- Stages read raw_id > pipeline_state.watermark_id instead of anti-joining
+-- their output tables. Failed rows go to pipeline_retries (dead after
+-- MAX_ATTEMPTS, see db/pipeline_state.py).
+--
+-- Stage names: 'sentiment', 'embedding', 'clustering:<brand>'
+
+CREATE TABLE IF NOT EXISTS pipeline_retries (
+    stage            TEXT NOT NULL,
+    raw_id           INT NOT NULL,
+    attempts         INT NOT NULL DEFAULT 0,
+    last_error       TEXT,
+    next_attempt_at  TIMESTAMP NOT NULL DEFAULT NOW(),
+    dead_at          TIMESTAMP,
+    first_failed_at  TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (stage, raw_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_retries_due
+ON pipeline_retries (stage, next_attempt_at)
+WHERE dead_at IS NULL;
+
+
+-- Clustering discovers work per brand, so embeddings carry brand too
+ALTER TABLE review_embeddings
+ADD COLUMN IF NOT EXISTS brand TEXT;
+
+UPDATE review_embeddings re
+SET brand = r.brand
+FROM mentions_raw r
+WHERE r.raw_id = re.raw_id
+  AND re.brand IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_review_embeddings_brand_raw
+ON review_embeddings (brand, raw_id);
+
+
+-- Initial watermarks: everything below the first unprocessed raw_id is done.
+-- These are one-off scans; afterwards no stage anti-joins again.
+INSERT INTO pipeline_state (stage, watermark_id)
+SELECT
+    'sentiment',
+    COALESCE(
+        (SELECT MIN(raw_id) FROM mentions_raw WHERE NOT ml_processed) - 1,
+        (SELECT MAX(raw_id) FROM mentions_raw),
+        0
+    )
+ON CONFLICT (stage) DO NOTHING;
+
+INSERT INTO pipeline_state (stage, watermark_id)
+SELECT
+    'embedding',
+    COALESCE(
+        (
+            SELECT MIN(mr.raw_id)
+            FROM mentions_raw mr
+            LEFT JOIN review_embeddings re ON re.raw_id = mr.raw_id
+            WHERE re.raw_id IS NULL
+        ) - 1,
+        (SELECT MAX(raw_id) FROM mentions_raw),
+        0
+    )
+ON CONFLICT (stage) DO NOTHING;
+
+INSERT INTO pipeline_state (stage, watermark_id)
+SELECT
+    'clustering:' || re.brand,
+    COALESCE(
+        MIN(re.raw_id) FILTER (WHERE rc.raw_id IS NULL) - 1,
+        MAX(re.raw_id)
+    )
+FROM review_embeddings re
+LEFT JOIN review_clusters rc ON rc.raw_id = re.raw_id
+WHERE re.brand IS NOT NULL
+GROUP BY re.brand
+ON CONFLICT (stage) DO NOTHING;
@@ -0,0 +1,14 @@
+-- 0005: skip ledger
+--
+-- Rows a stage can never process (empty text, undecodable vectors) are
+-- recorded here once and excluded from work discovery, so they are not
+-- re-read on every run. model_version lets a new model revisit them.
+
+CREATE TABLE IF NOT EXISTS pipeline_skips (
+    stage          TEXT NOT NULL,
+    raw_id         INT NOT NULL,
+    reason         TEXT NOT NULL,
+    model_version  TEXT NOT NULL,
+    skipped_at     TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (stage, raw_id)
+);
@@ -0,0 +1,20 @@
+-- 0006: pipeline run log
+--
+-- One row per stage per scripts/run_pipeline.py invocation. status is one of
+-- ok / skipped / failed / upstream_failed; rows_out is the stage's own work
+-- count (rows scored, embedded, clustered, ...).
+
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    id           BIGSERIAL PRIMARY KEY,
+    run_id       UUID NOT NULL,
+    stage        TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    rows_out     INT,
+    started_at   TIMESTAMP NOT NULL,
+    finished_at  TIMESTAMP NOT NULL,
+    duration_ms  INT NOT NULL,
+    error        TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_stage_finished
+ON pipeline_runs (stage, finished_at DESC);
@@ -0,0 +1,16 @@
+-- 0007: resumable backfill cursors
+--
+-- One row per (source, app). token is the source's opaque continuation token
+-- for the next page of older reviews; it is written in the same transaction
+-- as the rows of the page it follows, so a resumed run never skips a page.
+
+CREATE TABLE IF NOT EXISTS ingestion_cursors (
+    source           TEXT NOT NULL,
+    app_id           TEXT NOT NULL,
+    token            TEXT,
+    exhausted        BOOLEAN NOT NULL DEFAULT FALSE,
+    pages_fetched    INT NOT NULL DEFAULT 0,
+    reviews_fetched  INT NOT NULL DEFAULT 0,
+    updated_at       TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (source, app_id)
+);
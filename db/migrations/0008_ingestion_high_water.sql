@@ -0,0 +1,16 @@
+-- 0008: incremental ingestion state
+--
+-- Newest review seen per (source, app) and a serialized Bloom filter of the
+-- app's stored source_ids (ingestion/bloom.py). Polls paginate newest-first
+-- and stop at the first page that reaches the high-water mark.
+-- newest_created_utc is naive UTC, like mentions_raw.created_utc.
+
+CREATE TABLE IF NOT EXISTS ingestion_high_water (
+    source              TEXT NOT NULL,
+    app_id              TEXT NOT NULL,
+    newest_created_utc  TIMESTAMP,
+    newest_source_id    TEXT,
+    bloom               BYTEA,
+    updated_at          TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (source, app_id)
+);
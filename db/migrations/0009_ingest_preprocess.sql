@@ -0,0 +1,24 @@
+-- 0009: ingest-time preprocessing columns
+--
+-- Written once at insert by ingestion/preprocess.py so the sentiment and
+-- embedding stages read normalized text instead of re-normalizing body.
+-- content_hash is the signed 64-bit prefix of md5(normalized_text); stages
+-- use it to score/embed each distinct text once per batch.
+--
+-- Existing rows stay NULL until scripts/backfill_preprocess.py fills them;
+-- readers fall back to normalize_text(body) meanwhile.
+
+ALTER TABLE mentions_raw
+ADD COLUMN IF NOT EXISTS normalized_text TEXT,
+ADD COLUMN IF NOT EXISTS content_hash BIGINT,
+ADD COLUMN IF NOT EXISTS token_count INT,
+ADD COLUMN IF NOT EXISTS lang TEXT;
+
+-- Duplicate-text lookups
+CREATE INDEX IF NOT EXISTS idx_mentions_raw_content_hash
+ON mentions_raw (content_hash);
+
+-- Backfill work queue; empties once every row is preprocessed
+CREATE INDEX IF NOT EXISTS idx_mentions_raw_unpreprocessed
+ON mentions_raw (raw_id)
+WHERE content_hash IS NULL;
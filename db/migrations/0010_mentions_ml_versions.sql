@@ -0,0 +1,21 @@
+-- 0010: model / config versions on mentions_ml
+--
+-- Every score records the sentiment model and the scoring config version
+-- that produced it. The config version is a hash of the fusion weights,
+-- label thresholds and toxicity rules (scripts/run_sentiment_pipeline.py);
+-- scoring_configs keeps what each version meant.
+--
+-- Rows scored before this migration stay NULL, i.e. "unknown version",
+-- and are picked up by run_sentiment_pipeline.py --recompute like any
+-- other stale row.
+
+ALTER TABLE mentions_ml
+ADD COLUMN IF NOT EXISTS sentiment_model TEXT,
+ADD COLUMN IF NOT EXISTS scoring_config TEXT;
+
+CREATE TABLE IF NOT EXISTS scoring_configs (
+    config_version  TEXT PRIMARY KEY,
+    sentiment_model TEXT NOT NULL,
+    config          JSONB NOT NULL,
+    first_seen_at   TIMESTAMP DEFAULT NOW()
+);
@@ -0,0 +1,24 @@
+-- 0011: centroid-nearest exemplars per cluster
+--
+-- Written by scripts/run_clustering_pipeline.py in the same pass that
+-- assigns labels: for each (brand, cluster) the reviews closest to the
+-- cluster centroid, rank 1 = closest. body is copied so readers (cluster
+-- insights prompt, dashboard expanders) get representative examples from
+-- one primary-key range scan, with no join or sort against mentions_raw.
+-- cluster_summaries.example_post_ids lists the same raw_ids in rank order.
+--
+-- Clusters built before this migration have no exemplars until their
+-- brand is clustered again or run_clustering_pipeline.py --exemplars-only
+-- rebuilds them from the stored embeddings.
+
+CREATE TABLE IF NOT EXISTS cluster_exemplars (
+    brand             TEXT NOT NULL,
+    cluster_id        INT NOT NULL,
+    rank              SMALLINT NOT NULL,
+    raw_id            INT NOT NULL,
+    distance          REAL NOT NULL,
+    body              TEXT NOT NULL,
+    clustering_model  TEXT,
+    computed_at       TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (brand, cluster_id, rank)
+);
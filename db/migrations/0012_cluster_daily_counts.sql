@@ -0,0 +1,37 @@
+-- 0012: daily per-cluster review counts
+--
+-- One row per (brand, cluster, day of created_utc). The clustering job adds
+-- to it in the same statement that inserts review_clusters rows, so only
+-- newly clustered reviews are counted. Window comparisons for trend
+-- detection (7d vs previous 7d, 28d, arbitrary dates) become range scans
+-- over this small table instead of joins of review_clusters and mentions_raw.
+--
+-- sentiment_sum is the sum of mentions_ml.sentiment_score at clustering
+-- time (unscored reviews count as 0). After a sentiment recompute,
+-- run_clustering_pipeline.py --rebuild-daily-counts refreshes it.
+
+CREATE TABLE IF NOT EXISTS cluster_daily_counts (
+    brand          TEXT NOT NULL,
+    cluster_id     INT NOT NULL,
+    day            DATE NOT NULL,
+    count          INT NOT NULL DEFAULT 0,
+    sentiment_sum  NUMERIC(14,3) NOT NULL DEFAULT 0,
+    PRIMARY KEY (brand, cluster_id, day)
+);
+
+-- Window scans across every brand and cluster
+CREATE INDEX IF NOT EXISTS idx_cluster_daily_counts_day
+ON cluster_daily_counts (day);
+
+-- Backfill from what is already clustered
+INSERT INTO cluster_daily_counts (brand, cluster_id, day, count, sentiment_sum)
+SELECT rc.brand, rc.cluster_id, mr.created_utc::date, COUNT(*), COALESCE(SUM(ml.sentiment_score), 0)
+FROM review_clusters rc
+JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
+LEFT JOIN mentions_ml ml ON ml.raw_id = rc.raw_id
+WHERE rc.brand IS NOT NULL
+  AND rc.cluster_id IS NOT NULL
+GROUP BY rc.brand, rc.cluster_id, mr.created_utc::date
+ON CONFLICT (brand, cluster_id, day) DO NOTHING;
+
+ANALYZE cluster_daily_counts;
@@ -0,0 +1,22 @@
+-- 0013: content-addressed cluster insights and historical windows
+--
+-- content_hash fingerprints the LLM input of one insight (brand, cluster,
+-- size/sentiment/trend descriptors, exemplar quotes, model). The insights
+-- job reuses the stored summary of any (brand, cluster, content_hash) it
+-- has seen before, so only clusters whose content changed reach the LLM,
+-- and a window is never inserted twice with the same content.
+--
+-- run_cluster_insights.py --backfill-from writes many weekly windows in one
+-- run, all with the same generated_at. The dashboard therefore reads the
+-- newest window_end first, then the newest generation within it.
+
+ALTER TABLE cluster_insights
+ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- Summary reuse and duplicate-window checks (the hash covers brand and cluster)
+CREATE INDEX IF NOT EXISTS idx_cluster_insights_content
+ON cluster_insights (content_hash, window_end);
+
+-- Latest window per brand for the dashboard read model
+CREATE INDEX IF NOT EXISTS idx_cluster_insights_window
+ON cluster_insights (brand, window_end DESC, generated_at DESC);
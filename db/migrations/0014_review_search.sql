@@ -0,0 +1,25 @@
+-- 0014: full-text search and keyset pagination for the review explorer
+--
+-- body_tsv is a stored generated column, so every insert path (row at a
+-- time, bulk COPY, backfills) keeps it current with no application code.
+-- Adding it rewrites mentions_raw once; run this off-peak on large tables.
+--
+-- The explorer (app/review_explorer.py) pages newest first by
+-- (created_utc, raw_id) with a row comparison against the last row seen,
+-- so each page is an index range scan that starts where the previous one
+-- ended, instead of an OFFSET that re-reads every earlier page.
+
+ALTER TABLE mentions_raw
+ADD COLUMN IF NOT EXISTS body_tsv tsvector
+GENERATED ALWAYS AS (to_tsvector('english', COALESCE(body, ''))) STORED;
+
+-- websearch_to_tsquery matches
+CREATE INDEX IF NOT EXISTS idx_mentions_raw_body_tsv
+ON mentions_raw USING GIN (body_tsv);
+
+-- Keyset pages for a brand; rating and version filters are checked in the index
+CREATE INDEX IF NOT EXISTS idx_mentions_raw_brand_keyset
+ON mentions_raw (brand, created_utc DESC, raw_id DESC)
+INCLUDE (rating, version);
+
+ANALYZE mentions_raw;
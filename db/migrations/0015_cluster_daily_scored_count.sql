@@ -0,0 +1,45 @@
+-- 0015: scored-row count in cluster_daily_counts
+--
+-- The clustering job often rolls up reviews before the sentiment stage has
+-- scored them (clustering depends only on embedding). Counting those rows
+-- with sentiment 0 dragged avg_sentiment toward 0, so average sentiment is
+-- now sentiment_sum / scored_count. count stays the review volume used for
+-- window trends.
+--
+-- run_cluster_insights.py refreshes scored_count and sentiment_sum for every
+-- (brand, day) whose mentions_ml rows were written or rescored since its
+-- last run (watermark on processed_at, stage 'cluster_daily_counts').
+
+ALTER TABLE cluster_daily_counts
+ADD COLUMN IF NOT EXISTS scored_count INT NOT NULL DEFAULT 0;
+
+-- Recompute from scratch: existing sums may include unscored rows as 0
+UPDATE cluster_daily_counts cdc
+SET count = agg.n,
+    scored_count = agg.scored,
+    sentiment_sum = agg.sentiment_sum
+FROM (
+    SELECT rc.brand, rc.cluster_id, mr.created_utc::date AS day,
+           COUNT(*) AS n,
+           COUNT(ml.sentiment_score) AS scored,
+           COALESCE(SUM(ml.sentiment_score), 0) AS sentiment_sum
+    FROM review_clusters rc
+    JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
+    LEFT JOIN mentions_ml ml ON ml.raw_id = rc.raw_id
+    WHERE rc.brand IS NOT NULL
+      AND rc.cluster_id IS NOT NULL
+    GROUP BY rc.brand, rc.cluster_id, mr.created_utc::date
+) agg
+WHERE cdc.brand = agg.brand
+  AND cdc.cluster_id = agg.cluster_id
+  AND cdc.day = agg.day;
+
+-- Everything scored so far is now folded in
+INSERT INTO pipeline_state (stage, watermark_ts, updated_at)
+SELECT 'cluster_daily_counts', MAX(processed_at), NOW()
+FROM mentions_ml
+ON CONFLICT (stage) DO UPDATE
+SET watermark_ts = EXCLUDED.watermark_ts,
+    updated_at = NOW();
+
+ANALYZE cluster_daily_counts;
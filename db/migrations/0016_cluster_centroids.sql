@@ -0,0 +1,23 @@
+-- 0016: stored cluster centroids per brand
+--
+-- KMeans used to be fitted on each run's new rows alone, so cluster k of
+-- one run had nothing to do with cluster k of the next, while exemplars,
+-- top terms and daily counts all accumulate under (brand, cluster_id).
+-- Each brand's centroids are now kept here: new reviews are assigned to the
+-- nearest stored centroid and folded into its running mean (member_count
+-- members behind it). KMeans only runs for a brand's first batch and on an
+-- explicit run_clustering_pipeline.py --refit, which relabels every member.
+--
+-- centroid is float32[EMBEDDING_DIM] bytes (ndarray.tobytes()), the mean
+-- of the L2-normalized member embeddings. Brands clustered before this
+-- migration get their centroids from their current members on first use.
+
+CREATE TABLE IF NOT EXISTS cluster_centroids (
+    brand             TEXT NOT NULL,
+    cluster_id        INT NOT NULL,
+    centroid          BYTEA NOT NULL,
+    member_count      INT NOT NULL,
+    clustering_model  TEXT NOT NULL,
+    updated_at        TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (brand, cluster_id)
+);
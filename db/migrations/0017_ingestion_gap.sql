@@ -0,0 +1,14 @@
+-- 0017: resumable gap below an unfinished poll
+--
+-- A poll stops after MAX_PAGES. If that happens before it reaches the
+-- high-water mark, the reviews between its last page and the mark were
+-- never fetched, and the mark cannot move. gap_token is the continuation
+-- token after the last fetched page, and gap_newest_* is the newest review
+-- above the gap (everything between it and gap_token has been fetched).
+-- Later polls resume from gap_token until they reach the mark, then move
+-- the mark to gap_newest_*. NULL gap_token = no gap.
+
+ALTER TABLE ingestion_high_water
+ADD COLUMN IF NOT EXISTS gap_token TEXT,
+ADD COLUMN IF NOT EXISTS gap_newest_created_utc TIMESTAMP,
+ADD COLUMN IF NOT EXISTS gap_newest_source_id TEXT;
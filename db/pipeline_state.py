@@ -0,0 +1,280 @@
+"""
+Per-stage watermarks and retry / dead-letter bookkeeping.
+
+Batch stages discover work as `raw_id > watermark` instead of anti-joining
+against their output table. The watermark is advanced in the same
+transaction as the stage's output write, so a crash either keeps both or
+neither.
+
+raw_ids come from a sequence but commit out of order: a transaction can take
+its ids early and commit long after later ids are visible. A watermark
+therefore never moves past ids that could still appear. A stage captures a
+Horizon (the sequence's last value, then the snapshot's xmax) and, right
+before each read of new work, checks pg_snapshot_xmin (read_cap): once
+every transaction running at the capture has ended, every raw_id up to the
+horizon is committed and visible to the read that follows, so it becomes
+the cap and a new horizon is captured. A watermark advances to at most
+min(last id read, cap). The cap must be taken before the read: a row
+committed while a batch is being scored was not in it. Rows above the cap
+that a run already processed are simply re-read next run and skipped by
+the stage's own per-row check (ml_processed, NOT EXISTS on its output
+table).
+
+Rows that fail are parked in pipeline_retries and retried with
+backoff until MAX_ATTEMPTS, after which they stay there as dead letters.
+Rows a stage can never process are recorded once in pipeline_skips and
+excluded from discovery for the model version that skipped them.
+"""
+
+import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+RAW_ID_SEQUENCE = "mentions_raw_raw_id_seq"
+
+# How long the first read of a run waits for older writers to finish
+HORIZON_WAIT_SECS = 5.0
+
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF_MINUTES = 15  # doubled per attempt
+
+
+# ------------------------------------------------------------
+# WATERMARKS
+# ------------------------------------------------------------
+def get_watermark(cur, stage: str) -> int:
+    cur.execute(
+        "SELECT watermark_id FROM pipeline_state WHERE stage = %s;",
+        (stage,),
+    )
+    row = cur.fetchone()
+    return int(row[0]) if row and row[0] is not None else 0
+
+
+def advance_watermark(cur, stage: str, raw_id: int):
+    """
+    Moves the watermark forward to raw_id (never backwards). Call inside the
+    transaction that writes the stage's output.
+    """
+    cur.execute(
+        """
+        INSERT INTO pipeline_state (stage, watermark_id, updated_at)
+        VALUES (%s, %s, NOW())
+        ON CONFLICT (stage) DO UPDATE
+        SET watermark_id = GREATEST(COALESCE(pipeline_state.watermark_id, 0), EXCLUDED.watermark_id),
+            updated_at = NOW();
+        """,
+        (stage, raw_id),
+    )
+
+
+def get_watermark_ts(cur, stage: str):
+    cur.execute(
+        "SELECT watermark_ts FROM pipeline_state WHERE stage = %s;",
+        (stage,),
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def processed_at_cap(cur):
+    """
+    Latest mentions_ml.processed_at a timestamp watermark may move to; call
+    before the read it bounds. processed_at is the writer's transaction
+    start (NOW()) but only visible at commit, so rows stamped at or after
+    the start of a transaction still open can appear later, however long
+    it runs. Every row stamped before the oldest open transaction began (or
+    before now, with none open) is committed and visible to the next read.
+    Writers must be visible in pg_stat_activity: same role, or
+    pg_read_all_stats.
+    """
+    cur.execute(
+        """
+        SELECT (LEAST(MIN(xact_start), clock_timestamp()) - INTERVAL '1 microsecond')::timestamp
+        FROM pg_stat_activity
+        WHERE backend_type = 'client backend'
+          AND pid <> pg_backend_pid();
+        """
+    )
+    return cur.fetchone()[0]
+
+
+def set_watermark_ts(cur, stage: str, watermark_ts):
+    cur.execute(
+        """
+        INSERT INTO pipeline_state (stage, watermark_ts, updated_at)
+        VALUES (%s, %s, NOW())
+        ON CONFLICT (stage) DO UPDATE
+        SET watermark_ts = EXCLUDED.watermark_ts,
+            updated_at = NOW();
+        """,
+        (stage, watermark_ts),
+    )
+
+
+class Horizon(NamedTuple):
+    raw_id: int  # every raw_id <= this had been handed out at capture
+    xmax: int    # first xid not yet assigned at capture
+
+
+def capture_horizon(cur) -> Horizon:
+    """
+    Call before reading work. The sequence is read before the snapshot, so
+    any transaction holding one of those ids was running, or already done,
+    when the snapshot was taken.
+    """
+    cur.execute("SELECT COALESCE(pg_sequence_last_value(%s::regclass), 0);", (RAW_ID_SEQUENCE,))
+    raw_id = int(cur.fetchone()[0])
+    cur.execute("SELECT pg_snapshot_xmax(pg_current_snapshot())::text::bigint;")
+    return Horizon(raw_id, int(cur.fetchone()[0]))
+
+
+def read_cap(cur, horizon: Horizon, cap: int, wait: float = 0.0) -> Tuple[int, Horizon]:
+    """
+    Call immediately before reading new work, in the transaction that reads
+    it (READ COMMITTED: the read's snapshot is taken after this check).
+    Returns (cap, horizon) for the read: if every transaction running at the
+    horizon's capture has ended, the cap moves up to horizon.raw_id and a
+    fresh horizon is captured for the next read; otherwise both are
+    returned unchanged. Polls for up to `wait` seconds, so a run with a
+    single batch still makes progress while short writes are in flight.
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        cur.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint;")
+        if int(cur.fetchone()[0]) >= horizon.xmax:
+            return max(cap, horizon.raw_id), capture_horizon(cur)
+        if time.monotonic() >= deadline:
+            return cap, horizon
+        time.sleep(0.1)
+
+
+# ------------------------------------------------------------
+# RETRIES / DEAD LETTERS
+# ------------------------------------------------------------
+def record_failures(cur, stage: str, raw_ids: Iterable[int], error: str):
+    """
+    Parks failed raw_ids for a later attempt with exponential backoff.
+    After MAX_ATTEMPTS the row is marked dead and no longer retried.
+    """
+    ids = list(raw_ids)
+    if not ids:
+        return
+    cur.execute(
+        """
+        INSERT INTO pipeline_retries (stage, raw_id, attempts, last_error, next_attempt_at)
+        SELECT %(stage)s, rid, 1, %(error)s,
+               NOW() + make_interval(mins => %(backoff)s)
+        FROM unnest(%(ids)s::int[]) AS rid
+        ON CONFLICT (stage, raw_id) DO UPDATE
+        SET attempts = pipeline_retries.attempts + 1,
+            last_error = EXCLUDED.last_error,
+            next_attempt_at = NOW() + make_interval(
+                mins => %(backoff)s * (2 ^ pipeline_retries.attempts)::int
+            ),
+            dead_at = CASE
+                WHEN pipeline_retries.attempts + 1 >= %(max_attempts)s THEN NOW()
+                ELSE NULL
+            END;
+        """,
+        {
+            "stage": stage,
+            "ids": ids,
+            "error": (error or "")[:2000],
+            "backoff": RETRY_BACKOFF_MINUTES,
+            "max_attempts": MAX_ATTEMPTS,
+        },
+    )
+
+
+def enqueue(cur, stage: str, raw_ids: Iterable[int]):
+    """
+    Queues raw_ids for a stage regardless of its watermark (attempts = 0).
+    Used when an upstream retry produces output below a downstream watermark.
+    """
+    ids = list(raw_ids)
+    if not ids:
+        return
+    cur.execute(
+        """
+        INSERT INTO pipeline_retries (stage, raw_id, attempts, next_attempt_at)
+        SELECT %s, rid, 0, NOW()
+        FROM unnest(%s::int[]) AS rid
+        ON CONFLICT (stage, raw_id) DO UPDATE
+        SET next_attempt_at = LEAST(pipeline_retries.next_attempt_at, NOW())
+        WHERE pipeline_retries.dead_at IS NULL;
+        """,
+        (stage, ids),
+    )
+
+
+def fetch_due_retries(cur, stage: str, limit: int) -> List[int]:
+    cur.execute(
+        """
+        SELECT raw_id
+        FROM pipeline_retries
+        WHERE stage = %s
+          AND dead_at IS NULL
+          AND next_attempt_at <= NOW()
+        ORDER BY raw_id
+        LIMIT %s;
+        """,
+        (stage, limit),
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def clear_retries(cur, stage: str, raw_ids: Iterable[int]):
+    ids = list(raw_ids)
+    if not ids:
+        return
+    cur.execute(
+        "DELETE FROM pipeline_retries WHERE stage = %s AND raw_id = ANY(%s::int[]);",
+        (stage, ids),
+    )
+
+
+def count_dead_letters(cur, stage: Optional[str] = None) -> int:
+    cur.execute(
+        """
+        SELECT COUNT(*)
+        FROM pipeline_retries
+        WHERE dead_at IS NOT NULL
+          AND (%s::text IS NULL OR stage = %s::text);
+        """,
+        (stage, stage),
+    )
+    return cur.fetchone()[0]
+
+
+# ------------------------------------------------------------
+# SKIP LEDGER
+# ------------------------------------------------------------
+def record_skips(cur, stage: str, raw_ids: Iterable[int], reason: str, model_version: str):
+    ids = list(raw_ids)
+    if not ids:
+        return
+    cur.execute(
+        """
+        INSERT INTO pipeline_skips (stage, raw_id, reason, model_version)
+        SELECT %s, rid, %s, %s
+        FROM unnest(%s::int[]) AS rid
+        ON CONFLICT (stage, raw_id) DO UPDATE
+        SET reason = EXCLUDED.reason,
+            model_version = EXCLUDED.model_version,
+            skipped_at = NOW();
+        """,
+        (stage, reason, model_version, ids),
+    )
+
+
+def count_skips(cur, stage: str) -> int:
+    """Counts skips for stage, including per-brand sub-stages ('clustering:*')."""
+    cur.execute(
+        """
+        SELECT COUNT(*)
+        FROM pipeline_skips
+        WHERE stage = %s OR stage LIKE %s || ':%%';
+        """,
+        (stage, stage),
+    )
+    return cur.fetchone()[0]
@@ -0,0 +1,423 @@
+"""
+Concurrent, resumable backfill for Google Play and Reddit.
+
+Apps are fetched concurrently on a thread pool. Every request first takes a
+token from a per-host TokenBucket, so adding workers never exceeds the
+host's request budget. Fetched pages go to a single BulkWriter thread that
+inserts them with multi-row INSERTs and, in the same transaction, persists
+each app's continuation token in ingestion_cursors. A later run resumes deep
+history exactly after the last committed page.
+
+Reddit (PullPush) uses the same writer and cursor table, keyed by brand,
+with the `before` timestamp of the oldest stored post as its token.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ingestion.load_to_db import insert_mentions_bulk
+from ingestion.reddit_client import (
+    BASE_URL as REDDIT_BASE_URL,
+    PAGE_SIZE as REDDIT_PAGE_SIZE,
+    PULLPUSH_HOST,
+    iter_reddit_batches,
+    make_session,
+)
+from ingestion.reviews.google_play import (
+    GOOGLE_PLAY_HOST,
+    fetch_google_play_reviews,
+    token_from_str,
+    token_to_str,
+)
+from observability.instrument import bind
+
+SOURCE = "google_play"
+REDDIT_SOURCE = "reddit"
+
+DEFAULT_PAGES = 10
+DEFAULT_PAGE_SIZE = 200
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_PER_SEC = 2.0  # requests/sec to the host, shared by all workers
+DEFAULT_BURST = 4
+
+WRITER_FLUSH_ROWS = 2000
+WRITER_FLUSH_SECS = 2.0
+
+
+# ------------------------------------------------------------
+# RATE LIMITING
+# ------------------------------------------------------------
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/sec, at most `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def host_bucket(host: str, rate: float = DEFAULT_RATE_PER_SEC, burst: float = DEFAULT_BURST) -> TokenBucket:
+    """One bucket per host per process, so concurrent backfills share a budget."""
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None or bucket.rate != rate or bucket.capacity != burst:
+            bucket = _buckets[host] = TokenBucket(rate, burst)
+        return bucket
+
+
+# ------------------------------------------------------------
+# CURSORS
+# ------------------------------------------------------------
+@dataclass
+class CursorUpdate:
+    app_id: str
+    token: Optional[str]
+    exhausted: bool
+    pages: int = 1
+    reviews: int = 0
+    source: str = SOURCE
+
+
+def load_cursors(cur, app_ids: Iterable[str], source: str = SOURCE) -> Dict[str, Tuple[Optional[str], bool]]:
+    cur.execute(
+        """
+        SELECT app_id, token, exhausted
+        FROM ingestion_cursors
+        WHERE source = %s AND app_id = ANY(%s);
+        """,
+        (source, list(app_ids)),
+    )
+    return {app_id: (token, exhausted) for app_id, token, exhausted in cur.fetchall()}
+
+
+def save_cursors(cur, updates: Iterable[CursorUpdate]):
+    for u in updates:
+        cur.execute(
+            """
+            INSERT INTO ingestion_cursors (
+                source, app_id, token, exhausted, pages_fetched, reviews_fetched, updated_at
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, NOW())
+            ON CONFLICT (source, app_id) DO UPDATE
+            SET token = EXCLUDED.token,
+                exhausted = EXCLUDED.exhausted,
+                pages_fetched = ingestion_cursors.pages_fetched + EXCLUDED.pages_fetched,
+                reviews_fetched = ingestion_cursors.reviews_fetched + EXCLUDED.reviews_fetched,
+                updated_at = NOW();
+            """,
+            (u.source, u.app_id, u.token, u.exhausted, u.pages, u.reviews),
+        )
+
+
+def reset_cursors(cur, app_ids: Iterable[str], source: str = SOURCE):
+    cur.execute(
+        "DELETE FROM ingestion_cursors WHERE source = %s AND app_id = ANY(%s);",
+        (source, list(app_ids)),
+    )
+
+
+# ------------------------------------------------------------
+# BULK WRITER
+# ------------------------------------------------------------
+_STOP = object()
+
+
+class BulkWriter:
+    """
+    Single consumer thread owning one connection. Pages are buffered and
+    flushed as one transaction (rows + cursor updates) every
+    WRITER_FLUSH_ROWS rows or WRITER_FLUSH_SECS seconds.
+    """
+
+    def __init__(self, conn, persist_cursors: bool = True,
+                 flush_rows: int = WRITER_FLUSH_ROWS, flush_secs: float = WRITER_FLUSH_SECS):
+        self.conn = conn
+        self.persist_cursors = persist_cursors
+        self.flush_rows = flush_rows
+        self.flush_secs = flush_secs
+        self.inserted = 0
+        self.flushes = 0
+        self.error: Optional[BaseException] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=64)
+        self._thread = threading.Thread(target=bind(self._run), name="backfill-writer", daemon=True)
+
+    def start(self) -> "BulkWriter":
+        self._thread.start()
+        return self
+
+    def put(self, rows: List[dict], update: CursorUpdate):
+        if self.error is not None:
+            raise RuntimeError("Bulk writer failed") from self.error
+        self._queue.put((rows, update))
+
+    def close(self) -> int:
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self.error is not None:
+            raise RuntimeError("Bulk writer failed") from self.error
+        return self.inserted
+
+    def _run(self):
+        rows: List[dict] = []
+        updates: Dict[Tuple[str, str], CursorUpdate] = {}
+        deadline = time.monotonic() + self.flush_secs
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                item = None
+
+            if item is not None and item is not _STOP:
+                page_rows, u = item
+                rows.extend(page_rows)
+                prev = updates.get((u.source, u.app_id))
+                if prev is not None:
+                    u.pages += prev.pages
+                    u.reviews += prev.reviews
+                updates[(u.source, u.app_id)] = u
+
+            due = item is _STOP or len(rows) >= self.flush_rows or time.monotonic() >= deadline
+            if due and (rows or updates) and self.error is None:
+                self._flush(rows, updates.values())
+            if due:
+                rows, updates = [], {}
+                deadline = time.monotonic() + self.flush_secs
+            if item is _STOP:
+                return
+
+    def _flush(self, rows: List[dict], updates: Iterable[CursorUpdate]):
+        try:
+            with self.conn.cursor() as cur:
+                inserted = insert_mentions_bulk(cur, rows)
+                if self.persist_cursors:
+                    save_cursors(cur, updates)
+            self.conn.commit()
+            self.inserted += inserted
+            self.flushes += 1
+        except Exception as e:
+            self.conn.rollback()
+            self.error = e
+            print(f"[WARN] Backfill writer failed; later pages are dropped. Error={e}")
+
+
+# ------------------------------------------------------------
+# FETCH LOOP
+# ------------------------------------------------------------
+@dataclass
+class AppResult:
+    brand: str
+    app_id: str
+    pages: int = 0
+    fetched: int = 0
+    stopped: str = "page_limit"
+
+
+def backfill_app(brand: str, app_id: str, start_token: Optional[str], pages: int,
+                 page_size: int, bucket: TokenBucket, writer: BulkWriter,
+                 fetch: Callable = fetch_google_play_reviews) -> AppResult:
+    result = AppResult(brand, app_id)
+    token = token_from_str(start_token, page_size)
+
+    for _ in range(pages):
+        bucket.acquire()
+        rows, next_token = fetch(
+            app_id=app_id,
+            brand=brand,
+            limit=page_size,
+            continuation_token=token,
+        )
+
+        if next_token is None:
+            # Request failed: keep the last committed token and retry next run
+            result.stopped = "error"
+            break
+
+        next_str = token_to_str(next_token)
+        if not rows and next_str is None:
+            # Could be the end or a swallowed error; don't mark exhausted
+            result.stopped = "empty"
+            break
+
+        exhausted = next_str is None
+        writer.put(rows, CursorUpdate(app_id, next_str, exhausted, 1, len(rows)))
+        result.pages += 1
+        result.fetched += len(rows)
+
+        if exhausted:
+            result.stopped = "exhausted"
+            break
+        token = next_token
+
+    return result
+
+
+def run_backfill(conn, apps: Dict[str, str], pages: int = DEFAULT_PAGES,
+                 page_size: int = DEFAULT_PAGE_SIZE, workers: int = DEFAULT_WORKERS,
+                 rate: float = DEFAULT_RATE_PER_SEC, burst: float = DEFAULT_BURST,
+                 resume: bool = True, fetch: Callable = fetch_google_play_reviews) -> dict:
+    """
+    apps: {brand: app_id}. With resume=True each app continues from its
+    persisted cursor (exhausted apps are skipped) and the cursor is advanced;
+    with resume=False it fetches from the newest review and leaves cursors
+    untouched. conn is used only by the writer thread.
+    """
+    if resume:
+        with conn.cursor() as cur:
+            cursors = load_cursors(cur, apps.values())
+        conn.rollback()
+    else:
+        cursors = {}
+
+    todo = []
+    for brand, app_id in apps.items():
+        token, exhausted = cursors.get(app_id, (None, False))
+        if exhausted:
+            print(f"[INFO] {brand}: history already exhausted, skipping")
+            continue
+        todo.append((brand, app_id, token))
+
+    bucket = host_bucket(GOOGLE_PLAY_HOST, rate, burst)
+    writer = BulkWriter(conn, persist_cursors=resume).start()
+    t0 = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as pool:
+            futures = [
+                pool.submit(bind(backfill_app), brand, app_id, token, pages, page_size, bucket, writer, fetch)
+                for brand, app_id, token in todo
+            ]
+            results = [f.result() for f in futures]
+    finally:
+        inserted = writer.close()
+
+    for r in results:
+        print(f"[DONE] {r.brand}: pages={r.pages} fetched={r.fetched} stopped={r.stopped}")
+
+    return {
+        "apps": len(results),
+        "pages": sum(r.pages for r in results),
+        "fetched": sum(r.fetched for r in results),
+        "inserted": inserted,
+        "secs": time.perf_counter() - t0,
+    }
+
+
+# ------------------------------------------------------------
+# REDDIT
+# ------------------------------------------------------------
+_sessions = threading.local()
+
+
+def _thread_session():
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = make_session()
+    return session
+
+
+def backfill_brand_reddit(brand: str, start_before: Optional[str], pages: int,
+                          page_size: int, bucket: TokenBucket, writer: BulkWriter,
+                          base_url: str = REDDIT_BASE_URL) -> AppResult:
+    """Walks one brand's posts backward in time from the saved `before` cursor."""
+    key = brand.lower()
+    result = AppResult(brand, key)
+    before = int(start_before) if start_before else None
+
+    try:
+        for rows, before in iter_reddit_batches(
+            brand,
+            before=before,
+            page_size=page_size,
+            max_pages=pages,
+            session=_thread_session(),
+            base_url=base_url,
+            before_request=bucket.acquire,
+        ):
+            writer.put(rows, CursorUpdate(key, str(before), False, 1, len(rows), REDDIT_SOURCE))
+            result.pages += 1
+            result.fetched += len(rows)
+    except Exception as e:
+        # Keep the last committed cursor; the next run retries from there
+        print(f"[WARN] Reddit backfill failed for brand='{brand}': {e}")
+        result.stopped = "error"
+        return result
+
+    if result.pages < pages:
+        # The generator only stops early on an empty page: end of history
+        result.stopped = "exhausted"
+        token = str(before) if before is not None else None
+        writer.put([], CursorUpdate(key, token, True, 0, 0, REDDIT_SOURCE))
+    return result
+
+
+def run_reddit_backfill(conn, brands: Iterable[str], pages: int = DEFAULT_PAGES,
+                        page_size: int = REDDIT_PAGE_SIZE, workers: int = DEFAULT_WORKERS,
+                        rate: float = DEFAULT_RATE_PER_SEC, burst: float = DEFAULT_BURST,
+                        resume: bool = True, base_url: str = REDDIT_BASE_URL) -> dict:
+    """
+    Same contract as run_backfill, for Reddit: cursors are keyed by the
+    lowercased brand and hold the `before` epoch of the next page.
+    """
+    brands = list(brands)
+    if resume:
+        with conn.cursor() as cur:
+            cursors = load_cursors(cur, [b.lower() for b in brands], source=REDDIT_SOURCE)
+        conn.rollback()
+    else:
+        cursors = {}
+
+    todo = []
+    for brand in brands:
+        token, exhausted = cursors.get(brand.lower(), (None, False))
+        if exhausted:
+            print(f"[INFO] {brand}: Reddit history already exhausted, skipping")
+            continue
+        todo.append((brand, token))
+
+    bucket = host_bucket(PULLPUSH_HOST, rate, burst)
+    writer = BulkWriter(conn, persist_cursors=resume).start()
+    t0 = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reddit") as pool:
+            futures = [
+                pool.submit(bind(backfill_brand_reddit), brand, token, pages, page_size, bucket, writer, base_url)
+                for brand, token in todo
+            ]
+            results = [f.result() for f in futures]
+    finally:
+        inserted = writer.close()
+
+    for r in results:
+        print(f"[DONE] {r.brand}: pages={r.pages} fetched={r.fetched} stopped={r.stopped}")
+
+    return {
+        "brands": len(results),
+        "pages": sum(r.pages for r in results),
+        "fetched": sum(r.fetched for r in results),
+        "inserted": inserted,
+        "secs": time.perf_counter() - t0,
+    }
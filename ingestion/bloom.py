@@ -0,0 +1,56 @@
+"""
+Small Bloom filter for "have we already stored this source_id?" checks.
+
+A miss is definite (the id was never added), so misses skip the database.
+A hit may be a false positive (about `error_rate` of the time once
+`capacity` ids have been added), so callers verify hits before dropping a
+row. Serialises to bytes for storage in ingestion_high_water.bloom.
+"""
+
+import hashlib
+import math
+import struct
+from typing import Iterable
+
+_HEADER = struct.Struct("<IIQ")  # num_bits, num_hashes, count
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.01):
+        num_bits = int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_bits = max(num_bits, 8)
+        self.num_hashes = max(int(round(self.num_bits / capacity * math.log(2))), 1)
+        self.count = 0
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        # Kirsch–Mitzenmacher: k positions from two 64-bit hashes
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        num_bits, num_hashes, count = _HEADER.unpack_from(data)
+        bf = cls.__new__(cls)
+        bf.num_bits = num_bits
+        bf.num_hashes = num_hashes
+        bf.count = count
+        bf.bits = bytearray(data[_HEADER.size:])
+        return bf
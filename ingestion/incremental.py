@@ -0,0 +1,387 @@
+"""
+Incremental Google Play polling that stops at the high-water mark.
+
+Reviews come newest-first, so a poll pages forward only until a page
+reaches the newest review we already stored (ingestion_high_water). Rows
+from that page are then filtered before touching mentions_raw:
+
+- older than the high-water mark, or the high-water review itself: dropped
+- not in the app's Bloom filter: definitely new, inserted
+- in the Bloom filter: probably seen; verified with one batched lookup on
+  mentions_source_keys, so a false positive never loses a review
+
+Polling an unchanged app costs one page fetch and no database writes.
+
+A poll that runs out of pages (MAX_PAGES) before reaching the mark leaves
+a gap: the continuation token after its last page is saved with the
+newest review above it, and the next polls resume from that token before
+paging from the top, until the gap reaches the mark (migration 0017).
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from db.connection import pooled_connection
+from ingestion.backfill import DEFAULT_BURST, DEFAULT_RATE_PER_SEC, TokenBucket, host_bucket
+from ingestion.bloom import BloomFilter
+from ingestion.load_to_db import insert_mentions_bulk
+from ingestion.reviews.google_play import (
+    GOOGLE_PLAY_HOST,
+    fetch_google_play_reviews,
+    token_from_str,
+    token_to_str,
+)
+from observability.instrument import bind
+
+SOURCE = "google_play"
+
+BLOOM_CAPACITY = 200_000
+BLOOM_ERROR_RATE = 0.01
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGES = 50         # safety cap when far behind the high-water mark
+FIRST_POLL_PAGES = 1   # no high-water mark yet: deep history is the backfill's job
+
+
+@dataclass
+class HighWater:
+    app_id: str
+    newest_created_utc: Optional[datetime]
+    newest_source_id: Optional[str]
+    bloom: BloomFilter
+    updated_at: Optional[datetime] = None
+    # Unfetched reviews between the mark and an earlier poll's last page
+    gap_token: Optional[str] = None
+    gap_newest_created_utc: Optional[datetime] = None
+    gap_newest_source_id: Optional[str] = None
+
+
+# Blooms are re-read only when another process has saved a newer one
+_cache: Dict[str, HighWater] = {}
+_cache_lock = threading.Lock()
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    # mentions_raw.created_utc is TIMESTAMP (naive UTC)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+# ------------------------------------------------------------
+# STATE
+# ------------------------------------------------------------
+def _seed_high_water(cur, app_id: str, brand: str) -> HighWater:
+    """One-off for apps ingested before ingestion_high_water existed."""
+    cur.execute(
+        """
+        SELECT created_utc, source_id
+        FROM mentions_raw
+        WHERE brand = %s AND source = %s AND source_context = %s
+        ORDER BY created_utc DESC
+        LIMIT 1;
+        """,
+        (brand.lower(), SOURCE, app_id),
+    )
+    row = cur.fetchone()
+
+    bloom = BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+    cur.execute(
+        """
+        SELECT source_id
+        FROM mentions_source_keys
+        WHERE source = %s
+          AND left(source_id, length(%s) + 1) = %s || '_';
+        """,
+        (SOURCE, app_id, app_id),
+    )
+    bloom.update(r[0] for r in cur.fetchall())
+
+    return HighWater(app_id, row[0] if row else None, row[1] if row else None, bloom)
+
+
+def load_high_water(cur, app_id: str, brand: str) -> HighWater:
+    cur.execute(
+        """
+        SELECT newest_created_utc, newest_source_id, updated_at,
+               gap_token, gap_newest_created_utc, gap_newest_source_id
+        FROM ingestion_high_water
+        WHERE source = %s AND app_id = %s;
+        """,
+        (SOURCE, app_id),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return _seed_high_water(cur, app_id, brand)
+
+    with _cache_lock:
+        cached = _cache.get(app_id)
+    if cached is not None and cached.updated_at == row[2]:
+        return cached
+
+    cur.execute(
+        "SELECT bloom FROM ingestion_high_water WHERE source = %s AND app_id = %s;",
+        (SOURCE, app_id),
+    )
+    data = cur.fetchone()[0]
+    bloom = BloomFilter.from_bytes(bytes(data)) if data else BloomFilter(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+
+    hw = HighWater(app_id, row[0], row[1], bloom, row[2], row[3], row[4], row[5])
+    with _cache_lock:
+        _cache[app_id] = hw
+    return hw
+
+
+def save_high_water(cur, hw: HighWater):
+    cur.execute(
+        """
+        INSERT INTO ingestion_high_water (
+            source, app_id, newest_created_utc, newest_source_id, bloom, updated_at,
+            gap_token, gap_newest_created_utc, gap_newest_source_id
+        )
+        VALUES (%s, %s, %s, %s, %s, clock_timestamp(), %s, %s, %s)
+        ON CONFLICT (source, app_id) DO UPDATE
+        SET newest_created_utc = GREATEST(ingestion_high_water.newest_created_utc, EXCLUDED.newest_created_utc),
+            newest_source_id = CASE
+                WHEN ingestion_high_water.newest_created_utc > EXCLUDED.newest_created_utc
+                THEN ingestion_high_water.newest_source_id
+                ELSE EXCLUDED.newest_source_id
+            END,
+            bloom = EXCLUDED.bloom,
+            updated_at = EXCLUDED.updated_at,
+            gap_token = EXCLUDED.gap_token,
+            gap_newest_created_utc = EXCLUDED.gap_newest_created_utc,
+            gap_newest_source_id = EXCLUDED.gap_newest_source_id
+        RETURNING updated_at;
+        """,
+        (
+            SOURCE, hw.app_id, hw.newest_created_utc, hw.newest_source_id, hw.bloom.to_bytes(),
+            hw.gap_token, hw.gap_newest_created_utc, hw.gap_newest_source_id,
+        ),
+    )
+    hw.updated_at = cur.fetchone()[0]
+    with _cache_lock:
+        _cache[hw.app_id] = hw
+
+
+def filter_known(cur, rows: List[dict], hw: HighWater) -> List[dict]:
+    """Rows not yet stored. Only Bloom hits cost a (single) lookup."""
+    new_rows, maybe_seen = [], []
+    for r in rows:
+        (maybe_seen if r["source_id"] in hw.bloom else new_rows).append(r)
+
+    if maybe_seen:
+        cur.execute(
+            """
+            SELECT source_id
+            FROM mentions_source_keys
+            WHERE source = %s AND source_id = ANY(%s);
+            """,
+            (SOURCE, [r["source_id"] for r in maybe_seen]),
+        )
+        stored = {r[0] for r in cur.fetchall()}
+        new_rows.extend(r for r in maybe_seen if r["source_id"] not in stored)
+
+    return new_rows
+
+
+# ------------------------------------------------------------
+# POLLING
+# ------------------------------------------------------------
+class PageRun(NamedTuple):
+    rows: List[dict]         # fetched rows above the stop mark
+    newest: Optional[dict]   # newest row fetched
+    pages: int
+    fetched: int
+    token: object            # continuation after the last page fetched
+    stopped: str             # high_water / exhausted / page_limit / error
+
+
+def _page_down(app_id: str, brand: str, page_size: int, token, pages: int,
+               stop: Tuple[Optional[datetime], Optional[str]],
+               bucket: Optional[TokenBucket], fetch: Callable) -> PageRun:
+    """
+    Pages newest-first from token (None = the top) until a page reaches the
+    stop mark (created_utc, source_id), the app runs out, or pages run out.
+    """
+    stop_ts, stop_id = stop
+    keep_rows: List[dict] = []
+    newest = None
+    done = fetched = 0
+    stopped = "page_limit"
+
+    for _ in range(pages):
+        if bucket is not None:
+            bucket.acquire()
+        rows, next_token = fetch(app_id=app_id, brand=brand, limit=page_size, continuation_token=token)
+        if next_token is None:
+            stopped = "error"
+            break
+        token = next_token
+
+        done += 1
+        fetched += len(rows)
+        if rows and newest is None:
+            newest = max(rows, key=lambda r: r["created_utc"])
+
+        if stop_ts is None:
+            keep, crossed = rows, False
+        else:
+            keep = [
+                r for r in rows
+                if _naive_utc(r["created_utc"]) >= stop_ts and r["source_id"] != stop_id
+            ]
+            crossed = any(
+                _naive_utc(r["created_utc"]) < stop_ts or r["source_id"] == stop_id
+                for r in rows
+            )
+        keep_rows.extend(keep)
+
+        if crossed:
+            stopped = "high_water"
+            break
+        if not rows or token_to_str(token) is None:
+            stopped = "exhausted"
+            break
+
+    return PageRun(keep_rows, newest, done, fetched, token, stopped)
+
+
+def _reached(run: Optional[PageRun]) -> bool:
+    return run is not None and run.stopped in ("high_water", "exhausted")
+
+
+def _newest(run: Optional[PageRun]) -> Tuple[Optional[datetime], Optional[str]]:
+    if run is None or run.newest is None:
+        return None, None
+    return _naive_utc(run.newest["created_utc"]), run.newest["source_id"]
+
+
+def advance_high_water(hw: HighWater, gap: Optional[PageRun], top: Optional[PageRun]):
+    """
+    Moves the mark only over ranges fetched end to end; an unfinished top
+    run opens a gap (or, above an open gap, is simply redone next poll).
+    """
+    if gap is not None:
+        if _reached(gap):
+            hw.newest_created_utc, hw.newest_source_id = hw.gap_newest_created_utc, hw.gap_newest_source_id
+            hw.gap_token = hw.gap_newest_created_utc = hw.gap_newest_source_id = None
+        elif gap.stopped == "page_limit":
+            hw.gap_token = token_to_str(gap.token)
+
+    newest_ts, newest_id = _newest(top)
+    if newest_ts is None:
+        return
+    if hw.newest_created_utc is None:
+        # First poll: deep history is the backfill's job, never a gap
+        hw.newest_created_utc, hw.newest_source_id = newest_ts, newest_id
+    elif hw.gap_token is not None:
+        # Everything between the gap's top and newest has been fetched now
+        if _reached(top) and newest_ts > hw.gap_newest_created_utc:
+            hw.gap_newest_created_utc, hw.gap_newest_source_id = newest_ts, newest_id
+    elif _reached(top):
+        if newest_ts > hw.newest_created_utc:
+            hw.newest_created_utc, hw.newest_source_id = newest_ts, newest_id
+    elif top.stopped == "page_limit" and token_to_str(top.token) is not None:
+        hw.gap_token = token_to_str(top.token)
+        hw.gap_newest_created_utc, hw.gap_newest_source_id = newest_ts, newest_id
+
+
+def poll_app(conn, app_id: str, brand: str, page_size: int = DEFAULT_PAGE_SIZE,
+             max_pages: int = MAX_PAGES, bucket: Optional[TokenBucket] = None,
+             fetch: Callable = fetch_google_play_reviews) -> dict:
+    """
+    Fetches reviews newer than the app's high-water mark and inserts the
+    ones not stored yet, first resuming a gap left by an earlier poll.
+    Returns pages / fetched / inserted / stopped / gap (one still open).
+    """
+    with conn.cursor() as cur:
+        hw = load_high_water(cur, app_id, brand)
+    conn.rollback()  # don't sit idle in a transaction during network calls
+
+    mark = (hw.newest_created_utc, hw.newest_source_id)
+    gap_top = (hw.gap_newest_created_utc, hw.gap_newest_source_id)
+    page_limit = max_pages if mark[0] is not None else FIRST_POLL_PAGES
+
+    runs: List[PageRun] = []
+    gap = None
+    if hw.gap_token is not None:
+        gap = _page_down(app_id, brand, page_size, token_from_str(hw.gap_token, page_size),
+                         page_limit, mark, bucket, fetch)
+        runs.append(gap)
+
+    # From the top down to the mark, or to the top of a gap still open
+    top = None
+    pages_left = page_limit - sum(r.pages for r in runs)
+    if pages_left > 0 and (gap is None or gap.stopped != "error"):
+        top = _page_down(app_id, brand, page_size, None, pages_left,
+                         gap_top if hw.gap_token is not None else mark, bucket, fetch)
+        runs.append(top)
+
+    fresh = [r for run in runs for r in run.rows]
+    pages = sum(r.pages for r in runs)
+    fetched = sum(r.fetched for r in runs)
+    stopped = runs[-1].stopped
+
+    inserted = 0
+    try:
+        with conn.cursor() as cur:
+            new_rows = filter_known(cur, fresh, hw) if fresh else []
+            if new_rows:
+                inserted = insert_mentions_bulk(cur, new_rows)
+                hw.bloom.update(r["source_id"] for r in new_rows)
+
+            before = (hw.newest_created_utc, hw.gap_token, hw.gap_newest_created_utc)
+            advance_high_water(hw, gap, top)
+            moved = (hw.newest_created_utc, hw.gap_token, hw.gap_newest_created_utc) != before
+
+            # hw.updated_at is None right after seeding: persist the seed once
+            if new_rows or moved or hw.updated_at is None:
+                save_high_water(cur, hw)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        with _cache_lock:
+            _cache.pop(app_id, None)  # in-memory mark may be ahead of the DB
+        raise
+
+    return {
+        "pages": pages,
+        "fetched": fetched,
+        "inserted": inserted,
+        "stopped": stopped,
+        "gap": hw.gap_token is not None,
+    }
+
+
+def run_incremental(apps: Dict[str, str], page_size: int = DEFAULT_PAGE_SIZE,
+                    max_pages: int = MAX_PAGES, workers: int = 4,
+                    rate: float = DEFAULT_RATE_PER_SEC, burst: float = DEFAULT_BURST) -> dict:
+    """
+    Polls every app concurrently; each worker borrows a pooled connection
+    (waiting for one if the caller's stage already holds part of the pool).
+    """
+    bucket = host_bucket(GOOGLE_PLAY_HOST, rate, burst)
+
+    def poll(brand: str, app_id: str) -> dict:
+        with pooled_connection() as conn:
+            stats = poll_app(conn, app_id, brand, page_size, max_pages, bucket)
+        print(
+            f"[DONE] {brand}: pages={stats['pages']} fetched={stats['fetched']} "
+            f"inserted={stats['inserted']} stopped={stats['stopped']}"
+            f"{' gap=open' if stats['gap'] else ''}"
+        )
+        return stats
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="poll") as pool:
+        results = list(pool.map(bind(lambda kv: poll(*kv)), apps.items()))
+
+    return {
+        "apps": len(results),
+        "pages": sum(r["pages"] for r in results),
+        "fetched": sum(r["fetched"] for r in results),
+        "inserted": sum(r["inserted"] for r in results),
+    }
@@ -0,0 +1,119 @@
+"""
+Background ingestion jobs.
+
+The dashboard must never block on a network fetch. Ingestion requests are
+submitted to a small thread pool; callers poll job status instead of waiting.
+Requests for an app that already has a queued or running job are coalesced
+into that job, so repeated clicks (or several users) cost one fetch.
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from db.connection import pooled_connection
+from ingestion.incremental import poll_app
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+
+@dataclass
+class IngestionJob:
+    job_id: int
+    app_id: str
+    brand: str
+    limit: int
+    state: str = QUEUED
+    progress: float = 0.0
+    message: str = "Queued"
+    fetched: int = 0
+    inserted: int = 0
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+
+class IngestionQueue:
+    def __init__(self, max_workers: int = 2):
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="ingestion",
+        )
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._latest: Dict[str, IngestionJob] = {}
+
+    def submit(self, app_id: str, brand: str, limit: int = 30) -> IngestionJob:
+        """
+        Enqueue a Google Play fetch for app_id, or return the job already in
+        flight for it.
+        """
+        with self._lock:
+            job = self._latest.get(app_id)
+            if job is not None and job.active:
+                return job
+
+            job = IngestionJob(job_id=next(self._ids), app_id=app_id, brand=brand, limit=limit)
+            self._latest[app_id] = job
+
+        self._pool.submit(self._run, job)
+        return job
+
+    def latest(self, app_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._latest.get(app_id)
+
+    def _update(self, job: IngestionJob, **changes):
+        with self._lock:
+            for k, v in changes.items():
+                setattr(job, k, v)
+
+    def _run(self, job: IngestionJob):
+        self._update(job, state=RUNNING, progress=0.1, message="Fetching reviews from Google Play")
+        try:
+            # Pages only until the app's high-water mark; known rows are
+            # dropped before they reach the database
+            with pooled_connection() as conn:
+                stats = poll_app(conn, job.app_id, job.brand, page_size=job.limit)
+
+            if stats["stopped"] == "error" and not stats["fetched"]:
+                self._update(
+                    job,
+                    state=DONE,
+                    progress=1.0,
+                    message="Live reviews unavailable right now",
+                    finished_at=time.time(),
+                )
+                return
+
+            self._update(
+                job,
+                state=DONE,
+                progress=1.0,
+                fetched=stats["fetched"],
+                inserted=stats["inserted"],
+                message=f"Fetched {stats['fetched']} reviews, {stats['inserted']} new",
+                finished_at=time.time(),
+            )
+
+        except Exception as e:
+            self._update(
+                job,
+                state=FAILED,
+                error=str(e),
+                message="Ingestion failed",
+                finished_at=time.time(),
+            )
+            print(f"[WARN] Background ingestion failed for {job.app_id}: {e}")
@@ -1,59 +1,90 @@
 import psycopg2
 import os
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
+from ingestion.preprocess import preprocess_rows
+
 load_dotenv()
 
-def insert_mentions(rows):
+MENTION_COLUMNS = (
+    "source",
+    "source_id",
+    "brand",
+    "created_utc",
+    "author",
+    "title",
+    "body",
+    "url",
+    "subreddit",
+    "source_context",
+    "rating",
+    "version",
+    # Computed at ingest by ingestion/preprocess.py
+    "normalized_text",
+    "content_hash",
+    "token_count",
+    "lang",
+)
+
+
+def insert_mentions(rows, conn=None) -> int:
+    """
+    Inserts rows into mentions_raw, preprocessing their text first.
+    (source, source_id) duplicates are dropped by the mentions_raw_dedup
+    trigger (see migration 0002).
+    Pass conn to reuse a shared connection (it is committed, not closed).
+    Returns the number of rows actually inserted.
+    """
     if not rows:
-        return
+        return 0
 
-    conn = psycopg2.connect(
-        host=os.getenv("PGHOST"),
-        port=os.getenv("PGPORT"),
-        database=os.getenv("PGDATABASE"),
-        user=os.getenv("PGUSER"),
-        password=os.getenv("PGPASSWORD"),
-    )
+    owns_conn = conn is None
+    if owns_conn:
+        conn = psycopg2.connect(
+            host=os.getenv("PGHOST"),
+            port=os.getenv("PGPORT"),
+            database=os.getenv("PGDATABASE"),
+            user=os.getenv("PGUSER"),
+            password=os.getenv("PGPASSWORD"),
+        )
 
+    preprocess_rows(rows)
     cur = conn.cursor()
 
-    query = """
-        INSERT INTO mentions_raw (
-            source,
-            source_id,
-            brand,
-            created_utc,
-            author,
-            title,
-            body,
-            url,
-            source_context,
-            rating,
-            version
-        )
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (source, source_id) DO NOTHING;
+    query = f"""
+        INSERT INTO mentions_raw ({', '.join(MENTION_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(MENTION_COLUMNS))});
     """
 
+    inserted = 0
     for r in rows:
-        cur.execute(
-            query,
-            (
-                r.get("source"),
-                r.get("source_id"),
-                r.get("brand"),
-                r.get("created_utc"),
-                r.get("author"),
-                r.get("title"),
-                r.get("body"),
-                r.get("url"),
-                r.get("source_context"),
-                r.get("rating"),
-                r.get("version"),
-            ),
-        )
+        cur.execute(query, tuple(r.get(c) for c in MENTION_COLUMNS))
+        inserted += cur.rowcount
 
     conn.commit()
     cur.close()
-    conn.close()
+    if owns_conn:
+        conn.close()
+
+    return inserted
+
+
+def insert_mentions_bulk(cur, rows, page_size: int = 1000) -> int:
+    """
+    Multi-row INSERT of mention dicts on an open cursor; the caller commits.
+    Returns the number of rows actually inserted (duplicates are dropped by
+    the dedup trigger and not counted).
+    """
+    preprocess_rows(rows)
+    inserted = 0
+    for i in range(0, len(rows), page_size):
+        chunk = rows[i : i + page_size]
+        execute_values(
+            cur,
+            f"INSERT INTO mentions_raw ({', '.join(MENTION_COLUMNS)}) VALUES %s;",
+            [tuple(r.get(c) for c in MENTION_COLUMNS) for r in chunk],
+            page_size=len(chunk),
+        )
+        inserted += cur.rowcount
+    return inserted
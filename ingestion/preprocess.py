@@ -0,0 +1,78 @@
+"""
+Ingest-time text preprocessing, computed once per row and stored on
+mentions_raw so the ML stages never re-derive it:
+
+- normalized_text: analytics.sentiment.normalize_text, vectorized
+- content_hash:    signed 64-bit prefix of md5(normalized_text), for cheap
+                   dedupe / reuse of per-text results
+- token_count:     whitespace tokens of normalized_text
+- lang:            coarse script check ("en" / "und"); NULL for empty text
+
+The normalization must stay identical to normalize_text, which remains the
+fallback for rows ingested before migration 0009 until they are backfilled
+(scripts/backfill_preprocess.py).
+"""
+
+import hashlib
+from typing import List, Optional
+
+import pandas as pd
+
+# Same patterns as analytics.sentiment.normalize_text
+_URL_PATTERN = r"http\S+|www\S+"
+_SPACE_PATTERN = r"\s+"
+
+# Share of letters that must be ASCII to call a text English. Both sources
+# are requested in English; this only flags obviously foreign-script rows.
+EN_ASCII_SHARE = 0.9
+
+PREPROCESS_COLUMNS = ("normalized_text", "content_hash", "token_count", "lang")
+
+
+def content_hash(text: str) -> int:
+    return int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+def preprocess_texts(texts: List[Optional[str]]) -> pd.DataFrame:
+    """One vectorized pass over a batch; returns PREPROCESS_COLUMNS per input."""
+    s = pd.Series(texts, dtype="object").fillna("").astype(str)
+
+    norm = (
+        s.str.lower()
+        .str.replace(_URL_PATTERN, "", regex=True)
+        .str.replace(_SPACE_PATTERN, " ", regex=True)
+        .str.strip()
+    )
+    empty = norm.str.len() == 0
+
+    tokens = norm.str.count(" ") + 1
+    tokens[empty] = 0
+
+    ascii_letters = norm.str.count(r"[a-z]")
+    non_ascii = norm.str.count(r"[^\x00-\x7f]")
+    letters = ascii_letters + non_ascii
+    lang = pd.Series("und", index=norm.index, dtype="object")
+    lang[ascii_letters >= EN_ASCII_SHARE * letters] = "en"
+    lang[letters == 0] = None
+
+    return pd.DataFrame(
+        {
+            "normalized_text": norm,
+            "content_hash": [content_hash(t) for t in norm],
+            "token_count": tokens.astype(int),
+            "lang": lang,
+        }
+    )
+
+
+def preprocess_rows(rows: List[dict]) -> List[dict]:
+    """Adds PREPROCESS_COLUMNS to mention dicts in place, from `body`."""
+    if not rows:
+        return rows
+    df = preprocess_texts([r.get("body") for r in rows])
+    for r, rec in zip(rows, df.itertuples(index=False)):
+        r["normalized_text"] = rec.normalized_text
+        r["content_hash"] = int(rec.content_hash)
+        r["token_count"] = int(rec.token_count)
+        r["lang"] = rec.lang
+    return rows
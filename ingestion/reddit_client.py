@@ -1,44 +1,133 @@
 import requests
 from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from observability.instrument import count, timer
 
 BASE_URL = "https://api.pullpush.io/reddit/search/submission"
+PULLPUSH_HOST = "api.pullpush.io"
 
-def scrape_reddit(brand: str, limit: int = 50):
+PAGE_SIZE = 100  # PullPush maximum per request
+REQUEST_TIMEOUT = 10
+USER_AGENT = "reputation-ml-intel/1.0"
+
+
+def make_session() -> requests.Session:
     """
-    Scrape Reddit submissions using PullPush (Pushshift mirror).
-    Fails gracefully if the upstream service is unavailable.
+    Keep-alive session with backoff on 429/5xx. Reuse one per worker
+    thread across pages rather than opening a connection per request.
     """
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=1.0,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    session.mount("https://", HTTPAdapter(max_retries=retry))
+    session.mount("http://", HTTPAdapter(max_retries=retry))
+    session.headers["User-Agent"] = USER_AGENT
+    return session
 
+
+def post_to_row(post: dict, brand: str) -> dict:
+    permalink = post.get("permalink")
+    return {
+        "source": "reddit",
+        "source_id": str(post.get("id")),
+        "brand": brand.lower(),
+        "created_utc": datetime.fromtimestamp(
+            post.get("created_utc"), tz=timezone.utc
+        ),
+        "author": post.get("author") or "",
+        "title": post.get("title") or "",
+        "body": post.get("selftext") or "",
+        "url": post.get("full_link") or (f"https://www.reddit.com{permalink}" if permalink else ""),
+        "subreddit": post.get("subreddit") or "",
+    }
+
+
+def fetch_page(session: requests.Session, brand: str, before: Optional[int] = None,
+               after: Optional[int] = None, size: int = PAGE_SIZE,
+               base_url: str = BASE_URL) -> List[dict]:
+    """One PullPush request, newest first. Raises on HTTP/network errors."""
     params = {
         "q": brand,
-        "size": limit,
+        "size": size,
         "sort": "desc",
-        "sort_type": "created_utc"
+        "sort_type": "created_utc",
     }
+    if before is not None:
+        params["before"] = before
+    if after is not None:
+        params["after"] = after
 
     try:
-        response = requests.get(BASE_URL, params=params, timeout=10)
+        with timer("http_seconds", api="pullpush"):
+            response = session.get(base_url, params=params, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        data = response.json().get("data", [])
+    except requests.RequestException:
+        count("http_errors_total", api="pullpush")
+        raise
+    return response.json().get("data", [])
+
+
+def iter_reddit_batches(brand: str, before: Optional[int] = None, after: Optional[int] = None,
+                        page_size: int = PAGE_SIZE, max_pages: Optional[int] = None,
+                        session: Optional[requests.Session] = None,
+                        base_url: str = BASE_URL, before_request=None) -> Iterator[Tuple[List[dict], int]]:
+    """
+    Pages backward in time from `before` (exclusive, epoch seconds; None =
+    now) down to `after`, yielding (rows, next_before) per page. next_before
+    is the cursor to resume from once those rows are stored. Stops on an
+    empty page; HTTP errors propagate so the caller keeps its last cursor.
+    """
+    session = session or make_session()
+    pages = 0
+    seen_at_boundary = set()
+
+    while max_pages is None or pages < max_pages:
+        if before_request is not None:
+            before_request()
+        posts = fetch_page(session, brand, before=before, after=after, size=page_size, base_url=base_url)
+        posts = [p for p in posts if p.get("id") is not None and p.get("created_utc") is not None]
+        if not posts:
+            return
+
+        oldest = min(int(p["created_utc"]) for p in posts)
+        # `before` is exclusive, so posts sharing the oldest second could be
+        # cut off: ask again from oldest + 1 and drop what we already yielded
+        next_before = oldest + 1
+        if before is not None and next_before >= before:
+            next_before = before - 1  # whole page in one second: step past it
+
+        rows = [
+            post_to_row(p, brand)
+            for p in posts
+            if str(p["id"]) not in seen_at_boundary
+        ]
+        seen_at_boundary = {str(p["id"]) for p in posts if int(p["created_utc"]) == oldest}
+
+        pages += 1
+        yield rows, next_before
+
+        if next_before <= (after or 0):
+            return
+        before = next_before
+
+
+def scrape_reddit(brand: str, limit: int = 50):
+    """
+    Scrape Reddit submissions using PullPush (Pushshift mirror).
+    Fails gracefully if the upstream service is unavailable.
+    """
+    try:
+        for rows, _ in iter_reddit_batches(brand, page_size=min(limit, PAGE_SIZE), max_pages=1):
+            return rows
     except Exception as e:
         # IMPORTANT: never crash the app due to ingestion
         print(f"[WARN] Reddit ingestion failed for brand='{brand}': {e}")
-        return []
-
-    results = []
-    for post in data:
-        results.append({
-            "source": "reddit",
-            "source_id": str(post.get("id")),
-            "brand": brand.lower(),
-            "created_utc": datetime.fromtimestamp(
-                post.get("created_utc"), tz=timezone.utc
-            ),
-            "author": post.get("author") or "",
-            "title": post.get("title") or "",
-            "body": post.get("selftext") or "",
-            "url": post.get("full_link") or "",
-            "subreddit": post.get("subreddit") or "",
-        })
-
-    return results
+    return []
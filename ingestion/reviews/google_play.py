@@ -1,5 +1,12 @@
 from google_play_scraper import reviews, Sort
+from google_play_scraper.features.reviews import _ContinuationToken
 from datetime import datetime, timezone
+from typing import Optional
+
+from observability.instrument import count, timer
+
+# All traffic goes to this host; rate limits are per host
+GOOGLE_PLAY_HOST = "play.google.com"
 
 
 def fetch_google_play_reviews(
@@ -9,15 +16,17 @@ def fetch_google_play_reviews(
     continuation_token=None
 ):
     try:
-        result, token = reviews(
-            app_id,
-            lang="en",
-            country="us",
-            sort=Sort.NEWEST,
-            count=limit,
-            continuation_token=continuation_token,
-        )
+        with timer("http_seconds", api="google_play"):
+            result, token = reviews(
+                app_id,
+                lang="en",
+                country="us",
+                sort=Sort.NEWEST,
+                count=limit,
+                continuation_token=continuation_token,
+            )
     except Exception as e:
+        count("http_errors_total", api="google_play")
         print(f"[WARN] Google Play ingestion failed for {app_id}: {e}")
         return [], None
 
@@ -42,3 +51,20 @@ def fetch_google_play_reviews(
         )
 
     return rows, token
+
+
+def token_to_str(continuation_token) -> Optional[str]:
+    """Opaque page token to persist, or None once the app is exhausted."""
+    if continuation_token is None:
+        return None
+    return continuation_token.token
+
+
+def token_from_str(token: Optional[str], limit: int):
+    """
+    Rebuilds a continuation token persisted with token_to_str. The page size
+    comes from the token, so a resumed backfill can use a different limit.
+    """
+    if not token:
+        return None
+    return _ContinuationToken(token, "en", "us", Sort.NEWEST.value, limit, None, None)
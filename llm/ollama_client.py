@@ -1,5 +1,7 @@
 import requests
 
+from observability.instrument import count, timer
+
 OLLAMA_URL = "http://localhost:11434/api/generate"
 OLLAMA_MODEL = "llama3.1:8b"
 
@@ -14,6 +16,12 @@ def call_ollama(prompt: str) -> str:
         "stream": False
     }
 
-    resp = requests.post(OLLAMA_URL, json=payload, timeout=600)
-    resp.raise_for_status()
+    count("llm_prompt_chars_total", len(prompt), model=OLLAMA_MODEL)
+    try:
+        with timer("llm_call_seconds", model=OLLAMA_MODEL):
+            resp = requests.post(OLLAMA_URL, json=payload, timeout=600)
+        resp.raise_for_status()
+    except requests.RequestException:
+        count("llm_errors_total", model=OLLAMA_MODEL)
+        raise
     return resp.json()["response"]
@@ -0,0 +1,471 @@
+"""
+Per-stage instrumentation: timers, counters and latency histograms.
+
+    with stage("sentiment") as st:
+        with timer("model_forward_seconds", model="roberta"):
+            ...
+        count("rows_failed_total", len(failed))
+        st.add_rows(len(results))
+
+Every metric goes into one process-wide registry and is labelled with the
+stage that is current in the calling context (a contextvar, so stages
+running concurrently in run_pipeline.py's threads keep their own labels).
+Threads started inside a stage should run through bind() (or bind_iter()
+for an iterator another thread drains) to inherit it.
+
+Outputs:
+- a JSON line per finished stage (and per event()) on stderr, or appended
+  to the file in INSTRUMENT_LOG ("off" disables them)
+- the whole registry in Prometheus text format, rewritten atomically to
+  METRICS_TEXTFILE (a file, or a directory for one file per script) after
+  every stage, for node_exporter's textfile collector
+- PROFILE_STAGES=sentiment,embedding (or "all"): cProfile for those stages,
+  dumped to PROFILE_DIR/<stage>-<ts>.prof, top functions in the summary
+- TRACEMALLOC_STAGES=...: peak traced memory and top allocation sites in
+  the summary (tracemalloc is process-wide; concurrent stages share it)
+
+Database round trips are timed by connecting with
+connection_factory=InstrumentedConnection.
+"""
+
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import functools
+import threading
+import contextvars
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from psycopg2 import extensions
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+METRIC_PREFIX = "rmi_"
+INSTRUMENT_LOG = os.getenv("INSTRUMENT_LOG", "stderr")
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+PROFILE_STAGES = os.getenv("PROFILE_STAGES", "")
+TRACEMALLOC_STAGES = os.getenv("TRACEMALLOC_STAGES", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(ROOT, "data", "profiles"))
+
+# Seconds; spans a PK lookup up to a slow LLM call
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+PROFILE_TOP_N = 15
+TRACEMALLOC_TOP_N = 10
+
+_current_stage: contextvars.ContextVar[str] = contextvars.ContextVar("instrument_stage", default="")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+# ------------------------------------------------------------
+# REGISTRY
+# ------------------------------------------------------------
+class _Histogram:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Registry:
+    """Counters, gauges and histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+
+    def inc(self, name: str, labels: Labels, value: float = 1):
+        with self._lock:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, labels: Labels, value: float):
+        with self._lock:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, name: str, labels: Labels, value: float):
+        with self._lock:
+            key = (name, labels)
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = _Histogram()
+            hist.observe(value)
+
+    def snapshot(self, stage_name: str) -> Dict[Tuple[str, Labels], Tuple[float, float]]:
+        """{key: (count, sum)} of this stage's counters and histograms."""
+        label = ("stage", stage_name)
+        with self._lock:
+            out = {k: (v, 0.0) for k, v in self.counters.items() if label in k[1]}
+            out.update({k: (h.count, h.sum) for k, h in self.histograms.items() if label in k[1]})
+        return out
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({k[0] for k in series}):
+                    lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+                    for (n, labels), value in sorted(series.items()):
+                        if n == name:
+                            lines.append(f"{METRIC_PREFIX}{name}{_fmt_labels(labels)} {float(value)!r}")
+
+            for name in sorted({k[0] for k in self.histograms}):
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} histogram")
+                for (n, labels), hist in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, c in zip(LATENCY_BUCKETS, hist.buckets):
+                        cumulative += c
+                        lines.append(f"{METRIC_PREFIX}{name}_bucket{_fmt_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{METRIC_PREFIX}{name}_bucket{_fmt_labels(labels + (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{METRIC_PREFIX}{name}_sum{_fmt_labels(labels)} {hist.sum:.6f}")
+                    lines.append(f"{METRIC_PREFIX}{name}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _fmt_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    labels.setdefault("stage", _current_stage.get())
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+# ------------------------------------------------------------
+# RECORDING API
+# ------------------------------------------------------------
+def current_stage() -> str:
+    return _current_stage.get()
+
+
+def count(name: str, value: float = 1, **labels):
+    REGISTRY.inc(name, _labels(labels), value)
+
+
+def gauge(name: str, value: float, **labels):
+    REGISTRY.set(name, _labels(labels), value)
+
+
+def observe(name: str, seconds: float, **labels):
+    REGISTRY.observe(name, _labels(labels), seconds)
+
+
+@contextmanager
+def timer(name: str, **labels) -> Iterator[None]:
+    """Records the block's wall time into histogram `name`, also on error."""
+    key = _labels(labels)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, key, time.perf_counter() - t0)
+
+
+def bind(fn: Callable) -> Callable:
+    """fn running in the caller's stage context, for Thread / pool.submit targets."""
+    ctx = contextvars.copy_context()
+    # A Context can only be entered by one thread at a time
+    return lambda *args, **kwargs: ctx.copy().run(fn, *args, **kwargs)
+
+
+def bind_iter(iterable: Iterable) -> Iterator:
+    """Iterates in the caller's stage context, for iterators drained by another thread."""
+    # Captured here, not in the generator body: that first runs on the consumer
+    ctx = contextvars.copy_context()
+    it = iter(iterable)
+
+    def run():
+        while True:
+            try:
+                item = ctx.run(next, it)
+            except StopIteration:
+                return
+            yield item
+    return run()
+
+
+# ------------------------------------------------------------
+# OUTPUTS
+# ------------------------------------------------------------
+_log_lock = threading.Lock()
+# Stages on different threads finish concurrently; one render-and-replace at a time
+_textfile_lock = threading.Lock()
+
+
+def event(name: str, **fields):
+    """One structured JSON log line."""
+    if INSTRUMENT_LOG.lower() in ("", "off", "none"):
+        return
+    record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": name}
+    record.update(fields)
+    line = json.dumps(record, default=str, separators=(",", ":"))
+    with _log_lock:
+        if INSTRUMENT_LOG.lower() == "stderr":
+            print(line, file=sys.stderr, flush=True)
+        else:
+            with open(INSTRUMENT_LOG, "a") as f:
+                f.write(line + "\n")
+
+
+def write_textfile(path: Optional[str] = METRICS_TEXTFILE):
+    """
+    Rewrites the Prometheus textfile atomically (no-op without a path). A
+    directory gets one <script>.prom per process, so separate cron jobs
+    don't overwrite each other.
+    """
+    if not path:
+        return
+    if os.path.isdir(path):
+        script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0] or "python"
+        path = os.path.join(path, f"{script}.prom")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with _textfile_lock:
+        with open(tmp, "w") as f:
+            f.write(REGISTRY.render())
+        os.replace(tmp, path)
+
+
+# ------------------------------------------------------------
+# STAGES
+# ------------------------------------------------------------
+def _selected(setting: str, stage_name: str) -> bool:
+    names = {s.strip() for s in setting.split(",") if s.strip()}
+    return "all" in names or stage_name in names
+
+
+class StageRun:
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.fields: Dict[str, object] = {}
+
+    def add_rows(self, n: int):
+        """Rows this stage produced; drives rows/sec."""
+        self.rows += n
+
+    def note(self, **fields):
+        """Extra fields for the stage's JSON summary."""
+        self.fields.update(fields)
+
+
+def _profile_summary(profiler: cProfile.Profile, stage_name: str) -> dict:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{stage_name.replace(':', '_')}-{int(time.time())}.prof")
+    profiler.dump_stats(path)
+
+    stats = pstats.Stats(profiler).sort_stats("cumulative")
+    top = []
+    for func in stats.fcn_list[:PROFILE_TOP_N]:
+        _, ncalls, tottime, cumtime, _ = stats.stats[func]
+        filename, line, fn_name = func
+        top.append({
+            "func": f"{os.path.relpath(filename, ROOT) if filename.startswith(ROOT) else filename}:{line}({fn_name})",
+            "calls": ncalls,
+            "tottime_s": round(tottime, 4),
+            "cumtime_s": round(cumtime, 4),
+        })
+    return {"profile_path": path, "profile_top": top}
+
+
+def _tracemalloc_summary() -> dict:
+    _, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP_N]
+    return {
+        "tracemalloc_peak_mb": round(peak / 2**20, 2),
+        "tracemalloc_top": [
+            {"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "size_mb": round(s.size / 2**20, 2), "count": s.count}
+            for s in top
+        ],
+    }
+
+
+@contextmanager
+def stage(name: str) -> Iterator[StageRun]:
+    """
+    Scopes metrics to stage `name` and, on exit, records stage_seconds,
+    stage_rows_total and stage_rows_per_second, emits a stage_completed
+    JSON line with every metric the stage touched, and rewrites the
+    Prometheus textfile.
+    """
+    run = StageRun(name)
+    token = _current_stage.set(name)
+    before = REGISTRY.snapshot(name)
+
+    profiler = None
+    if _selected(PROFILE_STAGES, name):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active in this thread (nested stage)
+            profiler = None
+
+    owns_tracemalloc = _selected(TRACEMALLOC_STAGES, name) and not tracemalloc.is_tracing()
+    if owns_tracemalloc:
+        tracemalloc.start()
+
+    status = "ok"
+    t0 = time.perf_counter()
+    try:
+        yield run
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        extra = {}
+        if profiler is not None:
+            profiler.disable()
+            extra.update(_profile_summary(profiler, name))
+        if owns_tracemalloc:
+            extra.update(_tracemalloc_summary())
+            tracemalloc.stop()
+
+        labels = (("stage", name),)
+        REGISTRY.observe("stage_seconds", labels, elapsed)
+        REGISTRY.inc("stage_rows_total", labels, run.rows)
+        REGISTRY.set("stage_rows_per_second", labels, run.rows / elapsed if elapsed > 0 else 0.0)
+        REGISTRY.set("stage_last_run_timestamp_seconds", labels + (("status", status),), time.time())
+
+        metrics = {}
+        for key, (c, s) in REGISTRY.snapshot(name).items():
+            metric, metric_labels = key
+            if metric.startswith("stage_"):
+                continue
+            c0, s0 = before.get(key, (0, 0.0))
+            if c == c0:
+                continue
+            suffix = ",".join(f"{k}={v}" for k, v in metric_labels if k != "stage")
+            label = f"{metric}{{{suffix}}}" if suffix else metric
+            if key in REGISTRY.histograms:
+                n = c - c0
+                metrics[label] = {"count": n, "sum_s": round(s - s0, 4), "mean_ms": round((s - s0) / n * 1000, 3)}
+            else:
+                metrics[label] = c - c0
+
+        _current_stage.reset(token)
+        # Exporting metrics must never fail (or mask the error of) the stage
+        try:
+            event(
+                "stage_completed",
+                stage=name,
+                status=status,
+                secs=round(elapsed, 3),
+                rows=run.rows,
+                rows_per_sec=round(run.rows / elapsed, 1) if elapsed > 0 else None,
+                metrics=metrics,
+                **run.fields,
+                **extra,
+            )
+            write_textfile()
+        except OSError as e:
+            print(f"[WARN] Stage metrics export failed stage='{name}'. Error={e}", file=sys.stderr)
+
+
+def staged(name: str) -> Callable:
+    """
+    Decorator for a script's main(): runs it as stage `name`, counting an
+    int return value (the scripts' "rows produced") as the stage's rows.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with stage(name) as run:
+                result = fn(*args, **kwargs)
+                if isinstance(result, int):
+                    run.add_rows(result)
+                return result
+        return inner
+    return wrap
+
+
+# ------------------------------------------------------------
+# DATABASE ROUND TRIPS
+# ------------------------------------------------------------
+class InstrumentedCursor(extensions.cursor):
+    """
+    Times every statement into db_seconds{op=...}. fetch* calls are only
+    round trips (and only timed) on named, server-side cursors.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The stage that created the cursor, also when a helper thread
+        # (e.g. a COPY producer) ends up driving it
+        self._stage = _current_stage.get()
+
+    def _timed(self, op: str, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            REGISTRY.observe("db_seconds", (("op", op), ("stage", self._stage)), time.perf_counter() - t0)
+
+    def execute(self, query, vars=None):
+        return self._timed("execute", super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed("executemany", super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed("copy", super().copy_expert, sql, file, size)
+
+    def fetchone(self):
+        if self.name is None:
+            return super().fetchone()
+        return self._timed("fetch", super().fetchone)
+
+    def fetchmany(self, size=None):
+        fetch = super().fetchmany
+        if self.name is None:
+            return fetch() if size is None else fetch(size)
+        return self._timed("fetch", fetch) if size is None else self._timed("fetch", fetch, size)
+
+    def fetchall(self):
+        if self.name is None:
+            return super().fetchall()
+        return self._timed("fetch", super().fetchall)
+
+
+class InstrumentedConnection(extensions.connection):
+    """psycopg2 connection whose cursors and commits are timed."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = InstrumentedCursor
+
+    def commit(self):
+        t0 = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            REGISTRY.observe("db_seconds", _labels({"op": "commit"}), time.perf_counter() - t0)
@@ -2,14 +2,30 @@
 
 import os
 import sys
+import time
+import argparse
+
+import psycopg2
+from dotenv import load_dotenv
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 
-from ingestion.reviews.google_play import fetch_google_play_reviews
-from ingestion.load_to_db import insert_mentions
+from ingestion.backfill import (
+    DEFAULT_BURST,
+    DEFAULT_PAGES,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_RATE_PER_SEC,
+    DEFAULT_WORKERS,
+    reset_cursors,
+    run_backfill,
+)
+from ingestion.incremental import run_incremental
+from observability.instrument import InstrumentedConnection, staged
+
+load_dotenv(os.path.join(ROOT, ".env"))
 
 BRANDS = {
     "Chase": "com.chase.sig.android",
@@ -18,35 +34,85 @@ BRANDS = {
     "Wells Fargo": "com.wf.wellsfargomobile",
 }
 
-PAGES = 6        # 6 × 30 ≈ 180 reviews per brand
-PAGE_SIZE = 30  # keep small
 
-def backfill_brand(brand, app_id):
-    token = None
-    total = 0
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
+
 
-    for page in range(PAGES):
-        rows, token = fetch_google_play_reviews(
-            app_id=app_id,
-            brand=brand,
-            limit=PAGE_SIZE,
-            continuation_token=token
+@staged("google_play_ingest")
+def main(conn=None, pages: int = DEFAULT_PAGES, page_size: int = DEFAULT_PAGE_SIZE,
+         workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE_PER_SEC,
+         resume: bool = True, from_start: bool = False) -> int:
+    """
+    resume=True walks deep history from the saved cursors; resume=False polls
+    only what is newer than each app's high-water mark (pages is then a cap
+    and workers use pooled connections). Pass conn to reuse a shared
+    connection (it is left open). Returns the number of reviews inserted.
+    """
+    if not resume:
+        t0 = time.perf_counter()
+        stats = run_incremental(BRANDS, page_size=page_size, max_pages=pages, workers=workers, rate=rate)
+        print(
+            "[INFO] Google Play incremental poll completed | "
+            f"apps={stats['apps']} pages={stats['pages']} fetched={stats['fetched']} "
+            f"inserted={stats['inserted']} secs={time.perf_counter() - t0:.1f}"
         )
+        return stats["inserted"]
 
-        if not rows:
-            print(f"[INFO] No more reviews for {brand}")
-            break
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
 
-        insert_mentions(rows)
-        total += len(rows)
+    try:
+        if from_start:
+            with conn.cursor() as cur:
+                reset_cursors(cur, BRANDS.values())
+            conn.commit()
 
-        print(f"[OK] {brand}: page {page+1}, inserted {len(rows)}")
+        stats = run_backfill(
+            conn,
+            BRANDS,
+            pages=pages,
+            page_size=page_size,
+            workers=workers,
+            rate=rate,
+            burst=DEFAULT_BURST,
+            resume=resume,
+        )
+    finally:
+        if owns_conn:
+            conn.close()
 
-        if not token:
-            break
+    print(
+        "[INFO] Google Play backfill completed | "
+        f"apps={stats['apps']} pages={stats['pages']} fetched={stats['fetched']} "
+        f"inserted={stats['inserted']} secs={stats['secs']:.1f}"
+    )
+    return stats["inserted"]
 
-    print(f"[DONE] {brand}: total inserted ≈ {total}")
 
 if __name__ == "__main__":
-    for brand, app_id in BRANDS.items():
-        backfill_brand(brand, app_id)
+    parser = argparse.ArgumentParser(description="Backfill Google Play reviews for all brands")
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES, help="Pages per app this run (default: %(default)s)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Reviews per page (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Apps fetched concurrently (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_PER_SEC, help="Requests/sec to Google Play, all workers combined (default: %(default)s)")
+    parser.add_argument("--newest", action="store_true", help="Only fetch reviews newer than each app's high-water mark")
+    parser.add_argument("--from-start", action="store_true", help="Forget saved cursors and restart history from the newest review")
+    args = parser.parse_args()
+
+    main(
+        pages=args.pages,
+        page_size=args.page_size,
+        workers=args.workers,
+        rate=args.rate,
+        resume=not args.newest,
+        from_start=args.from_start,
+    )
@@ -0,0 +1,117 @@
+# scripts/backfill_preprocess.py
+
+import os
+import sys
+import argparse
+
+import psycopg2
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+from ingestion.preprocess import preprocess_texts
+from observability.instrument import InstrumentedConnection, staged
+
+load_dotenv(os.path.join(ROOT, ".env"))
+
+BATCH_SIZE = 5000
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
+
+
+def fetch_unprocessed(cur, after: int, limit: int):
+    # Range scan on the partial index idx_mentions_raw_unpreprocessed
+    cur.execute(
+        """
+        SELECT raw_id, created_utc, body
+        FROM mentions_raw
+        WHERE raw_id > %s
+          AND content_hash IS NULL
+        ORDER BY raw_id
+        LIMIT %s;
+        """,
+        (after, limit),
+    )
+    return cur.fetchall()
+
+
+def write_preprocessed(cur, rows, df):
+    execute_values(
+        cur,
+        """
+        UPDATE mentions_raw mr
+        SET normalized_text = v.normalized_text,
+            content_hash = v.content_hash,
+            token_count = v.token_count,
+            lang = v.lang
+        FROM (VALUES %s) AS v(raw_id, created_utc, normalized_text, content_hash, token_count, lang)
+        WHERE mr.raw_id = v.raw_id
+          AND mr.created_utc = v.created_utc;
+        """,
+        [
+            (raw_id, created_utc, rec.normalized_text, int(rec.content_hash), int(rec.token_count), rec.lang)
+            for (raw_id, created_utc, _), rec in zip(rows, df.itertuples(index=False))
+        ],
+        page_size=len(rows),
+    )
+
+
+@staged("preprocess_backfill")
+def main(conn=None, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Fills the ingest-time preprocessing columns for rows inserted before
+    migration 0009. Pass conn to reuse a shared connection (it is left
+    open). Returns the number of rows updated.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    cur = conn.cursor()
+
+    total = 0
+    after = 0
+    try:
+        while True:
+            rows = fetch_unprocessed(cur, after, batch_size)
+            if not rows:
+                break
+
+            df = preprocess_texts([r[2] for r in rows])
+            try:
+                write_preprocessed(cur, rows, df)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            after = rows[-1][0]
+            total += len(rows)
+            print(f"[INFO] Preprocessed {len(rows)} rows | total={total} last_raw_id={after}")
+    finally:
+        cur.close()
+        if owns_conn:
+            conn.close()
+
+    print(f"[INFO] Preprocess backfill completed | rows={total}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill normalized_text / content_hash / token_count / lang")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per transaction (default: %(default)s)")
+    args = parser.parse_args()
+
+    main(batch_size=args.batch_size)
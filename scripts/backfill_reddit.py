@@ -0,0 +1,106 @@
+# ingestion/scripts/backfill_reddit.py
+
+import os
+import sys
+import argparse
+
+import psycopg2
+from dotenv import load_dotenv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+from ingestion.backfill import (
+    DEFAULT_BURST,
+    DEFAULT_PAGES,
+    DEFAULT_RATE_PER_SEC,
+    DEFAULT_WORKERS,
+    REDDIT_SOURCE,
+    reset_cursors,
+    run_reddit_backfill,
+)
+from ingestion.reddit_client import BASE_URL, PAGE_SIZE
+from observability.instrument import InstrumentedConnection, staged
+
+load_dotenv(os.path.join(ROOT, ".env"))
+
+BRANDS = [
+    "Chase",
+    "Bank of America",
+    "Capital One",
+    "Wells Fargo",
+]
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
+
+
+@staged("reddit_backfill")
+def main(conn=None, pages: int = DEFAULT_PAGES, page_size: int = PAGE_SIZE,
+         workers: int = DEFAULT_WORKERS, rate: float = DEFAULT_RATE_PER_SEC,
+         from_start: bool = False, base_url: str = BASE_URL) -> int:
+    """
+    Walks each brand's Reddit history backward from its saved cursor.
+    Pass conn to reuse a shared connection (it is left open). Returns the
+    number of posts inserted.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+
+    try:
+        if from_start:
+            with conn.cursor() as cur:
+                reset_cursors(cur, [b.lower() for b in BRANDS], source=REDDIT_SOURCE)
+            conn.commit()
+
+        stats = run_reddit_backfill(
+            conn,
+            BRANDS,
+            pages=pages,
+            page_size=page_size,
+            workers=workers,
+            rate=rate,
+            burst=DEFAULT_BURST,
+            base_url=base_url,
+        )
+    finally:
+        if owns_conn:
+            conn.close()
+
+    print(
+        "[INFO] Reddit backfill completed | "
+        f"brands={stats['brands']} pages={stats['pages']} fetched={stats['fetched']} "
+        f"inserted={stats['inserted']} secs={stats['secs']:.1f}"
+    )
+    return stats["inserted"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill Reddit posts for all brands")
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES, help="Pages per brand this run (default: %(default)s)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Posts per page (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Brands fetched concurrently (default: %(default)s)")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE_PER_SEC, help="Requests/sec to PullPush, all workers combined (default: %(default)s)")
+    parser.add_argument("--from-start", action="store_true", help="Forget saved cursors and restart history from the newest post")
+    parser.add_argument("--base-url", default=BASE_URL, help="PullPush-compatible search endpoint (default: %(default)s)")
+    args = parser.parse_args()
+
+    main(
+        pages=args.pages,
+        page_size=args.page_size,
+        workers=args.workers,
+        rate=args.rate,
+        from_start=args.from_start,
+        base_url=args.base_url,
+    )
@@ -0,0 +1,202 @@
+# scripts/build_feature_store.py
+
+import os
+import sys
+import shutil
+import argparse
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+from analytics.features import (
+    FEATURE_STORE_DIR,
+    fetch_feature_batches,
+    load_rescored_through,
+    load_state,
+    rewrite_partition,
+    save_rescored_through,
+    save_state,
+    write_features,
+)
+from db.pipeline_state import get_watermark, processed_at_cap
+from observability.instrument import InstrumentedConnection, staged
+
+load_dotenv(os.path.join(ROOT, ".env"))
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
+
+
+def fetch_brands(cur) -> List[str]:
+    # Loose index scan: one probe per brand on mentions_raw(brand, ...)
+    cur.execute(
+        """
+        WITH RECURSIVE brands AS (
+            SELECT MIN(brand) AS brand
+            FROM mentions_raw
+            UNION ALL
+            SELECT (
+                SELECT MIN(mr.brand)
+                FROM mentions_raw mr
+                WHERE mr.brand > b.brand
+            )
+            FROM brands b
+            WHERE b.brand IS NOT NULL
+        )
+        SELECT brand FROM brands WHERE brand IS NOT NULL ORDER BY brand;
+        """
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+def ready_bounds(cur) -> Dict[str, int]:
+    """
+    Highest raw_id per brand whose features are settled: at or below both the
+    sentiment and the brand's clustering watermark (which never pass an id
+    a still-open transaction could commit), and below the brand's lowest
+    row still waiting on a sentiment, embedding or clustering retry. Dead
+    retries are settled: they stay NULL.
+    """
+    sentiment = get_watermark(cur, "sentiment")
+    bounds = {}
+    for brand in fetch_brands(cur):
+        stage = f"clustering:{brand}"
+        cur.execute("SELECT watermark_id FROM pipeline_state WHERE stage = %s;", (stage,))
+        row = cur.fetchone()
+        upto = min(sentiment, row[0]) if row and row[0] is not None else sentiment
+        cur.execute(
+            """
+            SELECT MIN(pr.raw_id)
+            FROM pipeline_retries pr
+            JOIN mentions_raw mr ON mr.raw_id = pr.raw_id
+            WHERE pr.stage = ANY(%s)
+              AND pr.dead_at IS NULL
+              AND mr.brand = %s;
+            """,
+            (["sentiment", "embedding", stage], brand),
+        )
+        pending = cur.fetchone()[0]
+        if pending is not None:
+            upto = min(upto, pending - 1)
+        bounds[brand] = upto
+    return bounds
+
+
+def fetch_rescored_partitions(cur, since, state: Dict[str, int]) -> List[Tuple[str, str]]:
+    """
+    (brand, month) partitions holding an already materialized row whose
+    mentions_ml row was written or rescored after `since`.
+    """
+    if not state:
+        return []
+    brands = sorted(state)
+    cur.execute(
+        """
+        SELECT DISTINCT mr.brand, to_char(mr.created_utc, 'YYYY-MM')
+        FROM mentions_ml ml
+        JOIN mentions_raw mr ON mr.raw_id = ml.raw_id
+        JOIN unnest(%s::text[], %s::int[]) AS s(brand, upto)
+          ON s.brand = mr.brand AND mr.raw_id <= s.upto
+        WHERE ml.processed_at > %s
+        ORDER BY 1, 2;
+        """,
+        (brands, [state[b] for b in brands], since),
+    )
+    return [(r[0], r[1]) for r in cur.fetchall()]
+
+
+def has_pending(cur) -> bool:
+    """Cheap probe used by the pipeline runner to skip an idle stage."""
+    state = load_state()
+    if any(upto > state.get(brand, 0) for brand, upto in ready_bounds(cur).items()):
+        return True
+    if not state:
+        return False
+    since = load_rescored_through() or datetime.min
+    cur.execute("SELECT EXISTS (SELECT 1 FROM mentions_ml WHERE processed_at > %s);", (since,))
+    return cur.fetchone()[0]
+
+
+@staged("features")
+def main(conn=None, rebuild: bool = False, root: str = FEATURE_STORE_DIR) -> int:
+    """
+    Appends every settled raw_id range not yet in the feature store, then
+    rewrites the partitions whose materialized rows were rescored since the
+    last run. Pass conn to reuse a shared connection (it is left open).
+    Returns the number of rows written.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+
+    if rebuild and os.path.isdir(root):
+        shutil.rmtree(root)
+    state = load_state(root)
+    rescored_through = load_rescored_through(root)
+
+    total = 0
+    try:
+        with conn.cursor() as cur:
+            bounds = ready_bounds(cur)
+            # Taken before any features are read, so later rescores are seen
+            # next run; stops short of writers still open (processed_at is
+            # their transaction start)
+            cap = processed_at_cap(cur)
+            cur.execute("SELECT MAX(processed_at) FROM mentions_ml;")
+            newest = cur.fetchone()[0]
+            # A store from before rescores were tracked is rewritten once
+            since = rescored_through if rescored_through is not None else datetime.min
+            rescored = fetch_rescored_partitions(cur, since, state)
+
+        for brand, upto in bounds.items():
+            after = state.get(brand, 0)
+            if upto <= after:
+                continue
+
+            written = write_features(fetch_feature_batches(conn, brand, after, upto), after, root)
+            conn.rollback()  # end the read transaction of the named cursor
+
+            # Files first, then state: a crash rewrites the same part-<after> files
+            state[brand] = upto
+            save_state(state, root)
+            total += written
+            print(f"[INFO] Features written | brand={brand} raw_id=({after}, {upto}] rows={written}")
+
+        for brand, month in rescored:
+            written = rewrite_partition(fetch_feature_batches(conn, brand, 0, state[brand], month=month), root)
+            conn.rollback()
+            total += written
+            print(f"[INFO] Features rewritten | brand={brand} month={month} rows={written}")
+
+        if newest is not None:
+            save_rescored_through(min(newest, cap), root)
+    finally:
+        if owns_conn:
+            conn.close()
+
+    print(f"[INFO] Feature store updated | rows={total} root={root}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Materialize the per-review Parquet feature store")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the store and rebuild it from scratch")
+    parser.add_argument("--root", default=FEATURE_STORE_DIR, help="Dataset directory (default: %(default)s)")
+    args = parser.parse_args()
+
+    main(rebuild=args.rebuild, root=args.root)
@@ -0,0 +1,175 @@
+"""
+Calibration report for the VADER -> transformer sentiment cascade.
+
+    python scripts/calibrate_sentiment_cascade.py
+    python scripts/calibrate_sentiment_cascade.py --sample 5000 --brand Chase --out data/cascade.json
+
+Scores a random sample of reviews with both VADER and the transformer once,
+then for a grid of thresholds reports the fraction of reviews the cascade
+would route to the transformer, how often its final label agrees with the
+transformer-only label (overall and on the rows VADER settled alone), and
+the speedup implied by the measured per-text cost of each model.
+Read-only: nothing is written to the database.
+"""
+
+import os
+import sys
+import argparse
+import json
+import time
+from typing import List, Optional
+
+import numpy as np
+import psycopg2
+from dotenv import load_dotenv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from analytics.sentiment import (
+    CascadeThresholds,
+    cascade_route,
+    combine_sentiment,
+    normalize_text,
+    sentiment_label,
+    transformer_sentiment_batch,
+    vader_sentiment_batch,
+)
+from observability.instrument import InstrumentedConnection, staged
+from scripts.run_sentiment_pipeline import cascade_from_env
+
+load_dotenv()
+
+DEFAULT_SAMPLE = 2000
+BANDS = [0.05, 0.15, 0.25, 0.35, 0.5, 0.65, 0.8]
+RATING_GAPS = [0.75, 1.0, 1.25]
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
+
+
+def fetch_sample(cur, n: int, brand: Optional[str], seed: float) -> List[tuple]:
+    # One pass over the table; fine for an offline report
+    brand = brand.lower() if brand else None  # mentions_raw.brand is stored lowercase
+    cur.execute("SELECT setseed(%s);", (seed,))
+    cur.execute(
+        """
+        SELECT rating, COALESCE(normalized_text, body)
+        FROM mentions_raw
+        WHERE body IS NOT NULL
+          AND LENGTH(TRIM(body)) > 0
+          AND (%s::text IS NULL OR brand = %s)
+        ORDER BY random()
+        LIMIT %s;
+        """,
+        (brand, brand, n),
+    )
+    return cur.fetchall()
+
+
+def labels(text_scores: np.ndarray, ratings: List[Optional[int]]) -> np.ndarray:
+    return np.array([sentiment_label(combine_sentiment(float(s), r)) for s, r in zip(text_scores, ratings)])
+
+
+def evaluate(vader: np.ndarray, roberta: np.ndarray, ratings: List[Optional[int]],
+             reference: np.ndarray, thresholds: CascadeThresholds,
+             vader_cost: float, roberta_cost: float) -> dict:
+    routed = cascade_route(vader, ratings, thresholds)
+    cascaded = labels(np.where(routed, roberta, vader), ratings)
+    agree = cascaded == reference
+    settled = ~routed
+    # Per-text cost: VADER on everything plus the transformer on routed rows
+    cost = vader_cost + routed.mean() * roberta_cost
+    return {
+        "ambiguous_band": thresholds.ambiguous_band,
+        "max_rating_gap": thresholds.max_rating_gap,
+        "routed_frac": round(float(routed.mean()), 4),
+        "agreement": round(float(agree.mean()), 4),
+        "agreement_vader_settled": round(float(agree[settled].mean()), 4) if settled.any() else None,
+        "est_speedup": round(roberta_cost / cost, 2) if cost else 1.0,
+    }
+
+
+@staged("sentiment_cascade_calibration")
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Routed fraction and label agreement of the sentiment cascade")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE, help="Reviews to sample (default: %(default)s)")
+    parser.add_argument("--brand", help="Only sample this brand")
+    parser.add_argument("--seed", type=float, default=0.42, help="setseed() value in [-1, 1] (default: %(default)s)")
+    parser.add_argument("--out", help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            rows = fetch_sample(cur, args.sample, args.brand, args.seed)
+    finally:
+        conn.close()
+
+    if not rows:
+        print("[INFO] No reviews to sample. Done.")
+        return 0
+
+    ratings = [r[0] for r in rows]
+    texts = [normalize_text(r[1]) for r in rows]
+    print(f"[INFO] Calibrating on {len(rows)} sampled reviews | rated={sum(r is not None for r in ratings)}")
+
+    t0 = time.perf_counter()
+    vader = np.asarray(vader_sentiment_batch(texts, normalized=True))
+    t1 = time.perf_counter()
+    roberta = np.asarray(transformer_sentiment_batch(texts, normalized=True))
+    t2 = time.perf_counter()
+    vader_cost = (t1 - t0) / len(rows)
+    roberta_cost = (t2 - t1) / len(rows)
+
+    reference = labels(roberta, ratings)
+    vader_only = labels(vader, ratings)
+
+    configured = cascade_from_env()
+    grid = sorted({CascadeThresholds(b, g) for b in BANDS for g in RATING_GAPS} | {configured})
+    results = [evaluate(vader, roberta, ratings, reference, t, vader_cost, roberta_cost) for t in grid]
+
+    print(
+        f"[INFO] Per-text cost | vader={vader_cost * 1e3:.3f}ms transformer={roberta_cost * 1e3:.3f}ms | "
+        f"VADER-only agreement={float((vader_only == reference).mean()):.3f}"
+    )
+    print(f"\n{'band':>6} {'gap':>6} {'routed':>8} {'agree':>7} {'agree@vader':>12} {'speedup':>8}")
+    for r in results:
+        mark = "  <- configured" if (r["ambiguous_band"], r["max_rating_gap"]) == tuple(configured) else ""
+        settled = f"{r['agreement_vader_settled']:.3f}" if r["agreement_vader_settled"] is not None else "-"
+        print(
+            f"{r['ambiguous_band']:>6.2f} {r['max_rating_gap']:>6.2f} {r['routed_frac']:>8.1%} "
+            f"{r['agreement']:>7.3f} {settled:>12} {r['est_speedup']:>7.2f}x{mark}"
+        )
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(
+                {
+                    "sample": len(rows),
+                    "brand": args.brand,
+                    "configured": configured._asdict(),
+                    "vader_ms_per_text": round(vader_cost * 1e3, 4),
+                    "transformer_ms_per_text": round(roberta_cost * 1e3, 4),
+                    "vader_only_agreement": round(float((vader_only == reference).mean()), 4),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"[INFO] Report written to {args.out}")
+    return len(rows)
+
+
+if __name__ == "__main__":
+    main()
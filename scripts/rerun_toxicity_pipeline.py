@@ -1,6 +1,11 @@
 import os
 import sys
+import json
+from typing import Dict
+
 import psycopg2
+import pyarrow as pa
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
 # ------------------------
@@ -10,49 +15,141 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from analytics.toxicity import toxicity_score, escalation_flag
+from analytics.toxicity import toxicity_config, toxicity_score, escalation_flag
+from analytics.versions import config_version
+from db.copy_reader import copy_arrow_batches
+from observability.instrument import InstrumentedConnection, staged
 
 load_dotenv()
 
-conn = psycopg2.connect(
-    host=os.getenv("PGHOST"),
-    port=os.getenv("PGPORT"),
-    database=os.getenv("PGDATABASE"),
-    user=os.getenv("PGUSER"),
-    password=os.getenv("PGPASSWORD"),
-)
-
-cur = conn.cursor()
-
-cur.execute("""
-    SELECT
-        r.raw_id,
-        r.body,
-        m.sentiment_score
-    FROM mentions_raw r
-    JOIN mentions_ml m
-        ON r.raw_id = m.raw_id
-""")
-
-rows = cur.fetchall()
-print(f"[INFO] Recomputing toxicity for {len(rows)} reviews")
-
-for raw_id, body, sentiment_score in rows:
-    tox = toxicity_score(body)
-    esc = escalation_flag(sentiment_score, tox, body)
-
-    cur.execute(
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
+
+
+def restamped_versions(cur) -> Dict[str, str]:
+    """
+    Maps every recorded scoring config version to the one with the same
+    sentiment settings and the current toxicity rules, registering those.
+    A row rescored here is only as current as its sentiment part: if that
+    is stale, so is the new version, and --recompute still picks it up.
+    """
+    cur.execute("SELECT config_version, sentiment_model, config FROM scoring_configs;")
+    versions = {}
+    for version, model, config in cur.fetchall():
+        config = {**config, **toxicity_config()}
+        versions[version] = config_version(config)
+        cur.execute(
+            """
+            INSERT INTO scoring_configs (config_version, sentiment_model, config)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (config_version) DO NOTHING;
+            """,
+            (versions[version], model, json.dumps(config)),
+        )
+    return versions
+
+
+def update_toxicity(cur, updates):
+    """
+    updates: [(raw_id, toxicity_score, escalation_score, scoring_config)]
+    processed_at moves so the rollup picks the new scores up.
+    """
+    if not updates:
+        return
+    execute_values(
+        cur,
         """
-        UPDATE mentions_ml
-        SET toxicity_score = %s,
-            escalation_score = %s
-        WHERE raw_id = %s
+        UPDATE mentions_ml m
+        SET toxicity_score = v.toxicity_score,
+            escalation_score = v.escalation_score,
+            scoring_config = v.scoring_config,
+            processed_at = NOW()
+        FROM (VALUES %s) AS v(raw_id, toxicity_score, escalation_score, scoring_config)
+        WHERE m.raw_id = v.raw_id
         """,
-        (round(tox, 3), float(esc), raw_id),
+        updates,
+        template="(%s, %s::numeric, %s::numeric, %s)",
+        page_size=len(updates),
     )
 
-conn.commit()
-cur.close()
-conn.close()
 
-print("[INFO] Toxicity reprocessing completed")
+@staged("toxicity_rerun")
+def main(conn=None) -> int:
+    """
+    Recomputes toxicity / escalation for every scored review, committing
+    each streamed batch. Pass conn to reuse a shared connection (it is left
+    open); the COPY stream holds a connection of its own. Returns the
+    number of rows updated.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    # COPY keeps its connection busy until the stream ends, so the per-batch
+    # updates go through conn
+    reader = connect()
+    cur = conn.cursor()
+
+    total = 0
+    try:
+        versions = restamped_versions(cur)
+        conn.commit()
+
+        # Streamed as Arrow batches via COPY instead of one fetchall() of every row
+        batches = copy_arrow_batches(
+            reader,
+            """
+            SELECT
+                r.raw_id,
+                r.body,
+                m.sentiment_score::float8 AS sentiment_score,
+                m.scoring_config
+            FROM mentions_raw r
+            JOIN mentions_ml m
+                ON r.raw_id = m.raw_id
+            """,
+            column_types={
+                "raw_id": pa.int64(),
+                "body": pa.string(),
+                "sentiment_score": pa.float64(),
+                "scoring_config": pa.string(),
+            },
+        )
+
+        for batch in batches:
+            cols = batch.to_pydict()
+            updates = []
+            for raw_id, body, sentiment_score, cfg in zip(
+                cols["raw_id"], cols["body"], cols["sentiment_score"], cols["scoring_config"]
+            ):
+                tox = toxicity_score(body)
+                esc = escalation_flag(sentiment_score, tox, body or "")
+                # NULL (scored before versions were tracked) stays unknown, and
+                # so does a version missing from scoring_configs
+                updates.append((raw_id, round(tox, 3), float(esc), versions.get(cfg)))
+            update_toxicity(cur, updates)
+            conn.commit()
+            total += len(updates)
+            print(f"[INFO] Recomputed toxicity for {total} reviews")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        reader.close()
+        if owns_conn:
+            conn.close()
+
+    print("[INFO] Toxicity reprocessing completed")
+    return total
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Anomaly detection over sentiment_timeseries
+
+Purpose:
+- Load the daily rollup for all brands as one matrix
+- Flag sentiment drops, toxicity rises and volume spikes
+  (rolling z-score, EWMA control limits, spike ratio)
+- Write anomaly_flag / anomaly_reason back in one bulk UPDATE
+
+Default is incremental: only the newest --days are re-evaluated (with enough
+trailing history loaded for the baselines). --full re-evaluates everything.
+
+Run AFTER:
+- run_timeseries_rollup.py
+"""
+
+import os
+import sys
+import argparse
+import time
+from datetime import date, timedelta
+
+import psycopg2
+import pandas as pd
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+load_dotenv(os.path.join(ROOT, ".env"))
+
+from analytics.anomalies import BASELINE_WINDOW, detect_anomalies
+from observability.instrument import InstrumentedConnection, staged
+
+DEFAULT_EVAL_DAYS = 7
+# Baseline window plus a couple of weeks for the EWMA to warm up
+HISTORY_DAYS = BASELINE_WINDOW + 14
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
+
+
+def fetch_timeseries(conn, since=None) -> pd.DataFrame:
+    q = """
+    SELECT
+        brand,
+        date,
+        mention_count,
+        avg_sentiment_score,
+        avg_toxicity_score
+    FROM sentiment_timeseries
+    WHERE (%s::date IS NULL OR date >= %s::date)
+    """
+    with conn.cursor() as cur:
+        cur.execute(q, (since, since))
+        cols = [d[0] for d in cur.description]
+        return pd.DataFrame(cur.fetchall(), columns=cols)
+
+
+def write_flags(cur, results: pd.DataFrame) -> int:
+    rows = list(
+        zip(
+            results["brand"],
+            results["date"],
+            results["anomaly_flag"].astype(bool),
+            results["anomaly_reason"],
+        )
+    )
+    if not rows:
+        return 0
+
+    execute_values(
+        cur,
+        """
+        UPDATE sentiment_timeseries st
+        SET anomaly_flag = v.anomaly_flag,
+            anomaly_reason = v.anomaly_reason,
+            updated_at = NOW()
+        FROM (VALUES %s) AS v(brand, date, anomaly_flag, anomaly_reason)
+        WHERE st.brand = v.brand
+          AND st.date = v.date::date
+          AND (st.anomaly_flag IS DISTINCT FROM v.anomaly_flag
+               OR st.anomaly_reason IS DISTINCT FROM v.anomaly_reason);
+        """,
+        rows,
+        template="(%s, %s, %s::boolean, %s::text)",
+        page_size=1000,
+    )
+    return len(rows)
+
+
+@staged("anomalies")
+def main(days: int = DEFAULT_EVAL_DAYS, full: bool = False, conn=None) -> int:
+    """
+    Pass conn to reuse a shared connection (it is left open).
+    Returns the number of (brand, date) rows evaluated.
+    """
+    print(f"[INFO] Anomaly detection starting | mode={'full' if full else f'last {days}d'}")
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    cur = conn.cursor()
+
+    try:
+        evaluate_from = None if full else date.today() - timedelta(days=days - 1)
+        since = None if full else evaluate_from - timedelta(days=HISTORY_DAYS)
+
+        df = fetch_timeseries(conn, since)
+        if df.empty:
+            print("[INFO] sentiment_timeseries is empty. Run the rollup first.")
+            return 0
+
+        t0 = time.perf_counter()
+        results = detect_anomalies(df, evaluate_from=evaluate_from)
+        elapsed = time.perf_counter() - t0
+
+        written = write_flags(cur, results)
+        conn.commit()
+
+        print(
+            "[INFO] Anomaly detection completed | "
+            f"brands={df['brand'].nunique()} days_loaded={df['date'].nunique()} "
+            f"evaluated={written} flagged={int(results['anomaly_flag'].sum())} "
+            f"detect_secs={elapsed:.3f}"
+        )
+        return written
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cur.close()
+        if owns_conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flag anomalous days in sentiment_timeseries")
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=DEFAULT_EVAL_DAYS,
+        help="Re-evaluate only the newest N days (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-evaluate every day for every brand",
+    )
+    args = parser.parse_args()
+    main(days=args.days, full=args.full)
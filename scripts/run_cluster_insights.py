@@ -6,6 +6,7 @@ Purpose:
 - Compute week-over-week trends
 - Persist durable, append-only insights
 - No UI triggers, no real-time inference
+- --backfill-from rebuilds one insight per Monday-aligned week of history
 
 Run AFTER:
 - ingestion
@@ -17,11 +18,16 @@ Run AFTER:
 import os
 import sys
 import json
+import hashlib
+import argparse
 from collections import defaultdict
 from datetime import date, timedelta
-from typing import Dict, List, Any, Tuple
+from typing import Dict, Iterator, List, Any, NamedTuple, Optional, Tuple
 
+import numpy as np
+import pandas as pd
 import psycopg2
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 
 def log(msg: str):
@@ -36,8 +42,10 @@ if ROOT not in sys.path:
 
 load_dotenv(os.path.join(ROOT, ".env"))
 
-from llm.ollama_client import call_ollama
+from llm.ollama_client import OLLAMA_MODEL, call_ollama
 from prompts.cluster_summary_prompt import build_cluster_summary_prompt
+from db.pipeline_state import get_watermark_ts, processed_at_cap, set_watermark_ts
+from observability.instrument import InstrumentedConnection, count, staged
 
 ENABLE_LLM = os.getenv("ENABLE_LLM", "false").lower() == "true"
 
@@ -47,12 +55,36 @@ ENABLE_LLM = os.getenv("ENABLE_LLM", "false").lower() == "true"
 TREND_THRESHOLD = 3
 MAX_CLUSTERS_PER_BRAND = 12
 EXAMPLES_PER_CLUSTER = 5
+WINDOW_DAYS = 7
 
-TODAY = date.today()
-WINDOW_END = TODAY
-WINDOW_START = TODAY - timedelta(days=7)
-PREV_WINDOW_START = TODAY - timedelta(days=14)
-PREV_WINDOW_END = TODAY - timedelta(days=7)
+# pipeline_state row for the rollup's sentiment refresh (migration 0015)
+DAILY_COUNTS_STAGE = "cluster_daily_counts"
+
+
+class Windows(NamedTuple):
+    """[start, end) compared against the equally long window just before it."""
+    start: date
+    end: date
+    prev_start: date
+
+
+def trend_windows(end: Optional[date] = None, days: int = WINDOW_DAYS) -> Windows:
+    # Evaluated per run, not at import: a long-lived process gets fresh windows
+    end = end or date.today()
+    return Windows(end - timedelta(days=days), end, end - timedelta(days=2 * days))
+
+
+def backfill_windows(start: date, end: date) -> List[Windows]:
+    """
+    Every complete Monday-aligned week [monday, monday + 7) from the week
+    containing start up to end (exclusive), oldest first.
+    """
+    monday = start - timedelta(days=start.weekday())
+    weeks = []
+    while monday + timedelta(days=WINDOW_DAYS) <= end:
+        weeks.append(trend_windows(monday + timedelta(days=WINDOW_DAYS)))
+        monday += timedelta(days=WINDOW_DAYS)
+    return weeks
 
 # ------------------------------------------------------------
 # DB CONNECTION
@@ -64,71 +96,218 @@ def get_db_connection():
         database=os.getenv("PGDATABASE"),
         user=os.getenv("PGUSER"),
         password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
     )
 
+# ------------------------------------------------------------
+# ROLLUP REFRESH
+# ------------------------------------------------------------
+def refresh_daily_sentiment(conn) -> int:
+    """
+    Re-aggregates cluster_daily_counts for every (brand, day) whose
+    mentions_ml rows were written or rescored (--recompute moves
+    processed_at) since the last refresh. Clustering often rolls reviews up
+    before sentiment scores them; this folds those scores in. Values are
+    recomputed in full, so re-reading rows above the watermark (it stops
+    short of open writers, db/pipeline_state.processed_at_cap) is idempotent.
+    Returns the number of rollup rows rewritten.
+    """
+    with conn.cursor() as cur:
+        cap = processed_at_cap(cur)
+        # Served by idx_mentions_ml_processed (backward index scan, one row)
+        cur.execute("SELECT MAX(processed_at) FROM mentions_ml;")
+        until = cur.fetchone()[0]
+        since = get_watermark_ts(cur, DAILY_COUNTS_STAGE)
+        if until is None or (since is not None and since >= until):
+            return 0
+
+        cur.execute(
+            """
+            WITH touched AS (
+                SELECT DISTINCT r.brand, r.created_utc::date AS day
+                FROM mentions_ml m
+                JOIN mentions_raw r ON r.raw_id = m.raw_id
+                WHERE (%(since)s::timestamp IS NULL OR m.processed_at > %(since)s::timestamp)
+                  AND m.processed_at <= %(until)s
+            )
+            INSERT INTO cluster_daily_counts AS cdc (brand, cluster_id, day, count, scored_count, sentiment_sum)
+            SELECT t.brand, rc.cluster_id, t.day, COUNT(*),
+                   COUNT(ml.sentiment_score), COALESCE(SUM(ml.sentiment_score), 0)
+            FROM touched t
+            JOIN mentions_raw r
+                ON r.brand = t.brand
+               AND r.created_utc >= t.day
+               AND r.created_utc < t.day + 1
+            JOIN review_clusters rc ON rc.raw_id = r.raw_id
+            LEFT JOIN mentions_ml ml ON ml.raw_id = r.raw_id
+            WHERE rc.cluster_id IS NOT NULL
+            GROUP BY t.brand, rc.cluster_id, t.day
+            ON CONFLICT (brand, cluster_id, day) DO UPDATE
+            SET count = EXCLUDED.count,
+                scored_count = EXCLUDED.scored_count,
+                sentiment_sum = EXCLUDED.sentiment_sum;
+            """,
+            {"since": since, "until": until},
+        )
+        rewritten = cur.rowcount
+        # Rollup and watermark land in the same transaction
+        watermark = min(until, cap)
+        set_watermark_ts(cur, DAILY_COUNTS_STAGE, watermark)
+    conn.commit()
+    log(f"Refreshed cluster_daily_counts sentiment | rows={rewritten} watermark={watermark}")
+    return rewritten
+
 # ------------------------------------------------------------
 # DATA FETCH
 # ------------------------------------------------------------
-def fetch_current_clusters(conn) -> List[Tuple[str, int, int, float]]:
+def fetch_cluster_trends(conn, windows: Windows) -> pd.DataFrame:
+    """
+    Every (brand, cluster) with its all-time size and average sentiment and
+    its counts in both windows, from the cluster_daily_counts rollup
+    (maintained by the clustering job) in one aggregate.
+    """
     q = """
     SELECT
-        mr.brand,
-        rc.cluster_id,
-        COUNT(*) AS cluster_size,
-        AVG(ml.sentiment_score) AS avg_sentiment
-    FROM review_clusters rc
-    JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
-    JOIN mentions_ml ml ON ml.raw_id = rc.raw_id
-    GROUP BY mr.brand, rc.cluster_id;
+        brand,
+        cluster_id,
+        SUM(count) AS cluster_size,
+        SUM(sentiment_sum) / NULLIF(SUM(scored_count), 0) AS avg_sentiment,
+        COALESCE(SUM(count) FILTER (WHERE day >= %(start)s AND day < %(end)s), 0) AS count_last,
+        COALESCE(SUM(count) FILTER (WHERE day >= %(prev_start)s AND day < %(start)s), 0) AS count_prev
+    FROM cluster_daily_counts
+    GROUP BY brand, cluster_id;
     """
     with conn.cursor() as cur:
-        cur.execute(q)
-        return cur.fetchall()
+        cur.execute(q, windows._asdict())
+        cols = [d[0] for d in cur.description]
+        df = pd.DataFrame(cur.fetchall(), columns=cols)
+    for col in ("cluster_size", "count_last", "count_prev"):
+        df[col] = df[col].astype(np.int64)
+    df["avg_sentiment"] = pd.to_numeric(df["avg_sentiment"], errors="coerce").astype(np.float64)
+    return df.assign(window_start=windows.start, window_end=windows.end)
 
 
-def fetch_cluster_counts(conn, start_date, end_date) -> Dict[Tuple[str, int], int]:
+def fetch_weekly_cluster_counts(conn, until: date) -> pd.DataFrame:
+    """
+    Review count and sentiment sum per (brand, cluster, Monday-aligned week)
+    for every day before until, in one date_trunc-grouped scan of the rollup.
+    """
     q = """
     SELECT
-        mr.brand,
-        rc.cluster_id,
-        COUNT(*) AS review_count
-    FROM review_clusters rc
-    JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
-    WHERE mr.created_utc >= %s
-      AND mr.created_utc < %s
-    GROUP BY mr.brand, rc.cluster_id;
+        brand,
+        cluster_id,
+        date_trunc('week', day)::date AS week,
+        SUM(count) AS n,
+        SUM(scored_count) AS scored,
+        SUM(sentiment_sum) AS sentiment_sum
+    FROM cluster_daily_counts
+    WHERE day < %s
+    GROUP BY brand, cluster_id, date_trunc('week', day);
     """
     with conn.cursor() as cur:
-        cur.execute(q, (start_date, end_date))
-        return {(b, cid): c for b, cid, c in cur.fetchall()}
+        cur.execute(q, (until,))
+        cols = [d[0] for d in cur.description]
+        df = pd.DataFrame(cur.fetchall(), columns=cols)
+    df["n"] = df["n"].astype(np.int64)
+    df["scored"] = df["scored"].astype(np.int64)
+    df["sentiment_sum"] = pd.to_numeric(df["sentiment_sum"]).astype(np.float64)
+    return df
 
 
-def fetch_cluster_examples(conn, brand: str, cluster_id: int) -> List[str]:
+def weekly_cluster_trends(weekly: pd.DataFrame, weeks: List[Windows]) -> pd.DataFrame:
+    """
+    The fetch_cluster_trends frame for every window in weeks at once. Size
+    and average sentiment are as of each window's end, so older windows see
+    the clusters as they were then. Clusters with no reviews yet are dropped.
+    """
+    if weekly.empty or not weeks:
+        return pd.DataFrame({
+            "brand": pd.Series(dtype=object),
+            "cluster_id": pd.Series(dtype=np.int64),
+            "cluster_size": pd.Series(dtype=np.int64),
+            "avg_sentiment": pd.Series(dtype=np.float64),
+            "count_last": pd.Series(dtype=np.int64),
+            "count_prev": pd.Series(dtype=np.int64),
+            "window_start": pd.Series(dtype=object),
+            "window_end": pd.Series(dtype=object),
+        })
+
+    # (pair, week) matrices over a dense weekly axis, so empty weeks count 0
+    first = min(weekly["week"].min(), weeks[0].prev_start)
+    week_pos = np.array([(w - first).days // WINDOW_DAYS for w in weekly["week"]])
+    pair_codes = weekly.groupby(["brand", "cluster_id"], sort=False).ngroup().to_numpy()
+    pairs = weekly[["brand", "cluster_id"]].drop_duplicates().reset_index(drop=True)
+
+    shape = (len(pairs), (weeks[-1].start - first).days // WINDOW_DAYS + 1)
+    counts = np.zeros(shape, dtype=np.int64)
+    scored = np.zeros(shape, dtype=np.int64)
+    sums = np.zeros(shape, dtype=np.float64)
+    np.add.at(counts, (pair_codes, week_pos), weekly["n"].to_numpy())
+    np.add.at(scored, (pair_codes, week_pos), weekly["scored"].to_numpy())
+    np.add.at(sums, (pair_codes, week_pos), weekly["sentiment_sum"].to_numpy())
+
+    cols_last = np.array([(w.start - first).days // WINDOW_DAYS for w in weeks])
+    size = counts.cumsum(axis=1)[:, cols_last]
+    n_scored = scored.cumsum(axis=1)[:, cols_last]
+    sentiment = sums.cumsum(axis=1)[:, cols_last]
+    avg = np.full(size.shape, np.nan)
+    np.divide(sentiment, n_scored, out=avg, where=n_scored > 0)
+
+    # Long format, pair-major: row (pair i, week j) is flat index i * len(weeks) + j
+    n_weeks = len(weeks)
+    df = pd.DataFrame({
+        "brand": np.repeat(pairs["brand"].to_numpy(), n_weeks),
+        "cluster_id": np.repeat(pairs["cluster_id"].to_numpy(), n_weeks),
+        "cluster_size": size.ravel(),
+        "avg_sentiment": avg.ravel(),
+        "count_last": counts[:, cols_last].ravel(),
+        "count_prev": counts[:, cols_last - 1].ravel(),
+        "window_start": np.tile([w.start for w in weeks], len(pairs)),
+        "window_end": np.tile([w.end for w in weeks], len(pairs)),
+    })
+    return df[df["cluster_size"] > 0].reset_index(drop=True)
+
+
+def fetch_cluster_examples(conn) -> Dict[Tuple[str, int], List[str]]:
+    # Centroid-nearest reviews of every cluster, precomputed by the clustering job
     q = """
-    SELECT mr.body
-    FROM review_clusters rc
-    JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
-    JOIN mentions_ml ml ON ml.raw_id = mr.raw_id
-    WHERE mr.brand = %s
-      AND rc.cluster_id = %s
-      AND mr.body IS NOT NULL
-      AND LENGTH(TRIM(mr.body)) > 0
-    ORDER BY ml.sentiment_score ASC
-    LIMIT %s;
+    SELECT brand, cluster_id, body
+    FROM cluster_exemplars
+    WHERE rank <= %s
+    ORDER BY brand, cluster_id, rank;
     """
+    out: Dict[Tuple[str, int], List[str]] = defaultdict(list)
     with conn.cursor() as cur:
-        cur.execute(q, (brand, cluster_id, EXAMPLES_PER_CLUSTER))
-        return [r[0] for r in cur.fetchall()]
+        cur.execute(q, (EXAMPLES_PER_CLUSTER,))
+        for brand, cluster_id, body in cur.fetchall():
+            out[(brand, cluster_id)].append(body)
+    return out
+
+
+def fetch_known_summaries(conn, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Newest stored LLM output for each content hash already summarized."""
+    q = """
+    SELECT DISTINCT ON (content_hash) content_hash, summary, primary_issue, user_impact
+    FROM cluster_insights
+    WHERE content_hash = ANY(%s)
+    ORDER BY content_hash, generated_at DESC;
+    """
+    with conn.cursor() as cur:
+        cur.execute(q, (hashes,))
+        return {
+            h: {"summary": s, "primary_issue": p, "user_impact": u}
+            for h, s, p, u in cur.fetchall()
+        }
 
 # ------------------------------------------------------------
 # DERIVED LOGIC
 # ------------------------------------------------------------
-def trend_label(delta: int) -> str:
-    if delta >= TREND_THRESHOLD:
-        return "growing"
-    if delta <= -TREND_THRESHOLD:
-        return "declining"
-    return "stable"
+def trend_labels(delta: np.ndarray) -> np.ndarray:
+    return np.select(
+        [delta >= TREND_THRESHOLD, delta <= -TREND_THRESHOLD],
+        ["growing", "declining"],
+        default="stable",
+    )
 
 
 def size_descriptor(size: int) -> str:
@@ -140,6 +319,9 @@ def size_descriptor(size: int) -> str:
 
 
 def sentiment_descriptor(avg: float) -> str:
+    # NaN: no scored review in the cluster yet (scored_count = 0)
+    if np.isnan(avg):
+        return "unknown"
     if avg < -0.3:
         return "strongly negative"
     if avg < 0.2:
@@ -147,15 +329,86 @@ def sentiment_descriptor(avg: float) -> str:
     return "positive"
 
 
-def pct(delta: int, prev: int):
-    if prev <= 0:
-        return None
-    return round((delta / prev) * 100, 2)
+def pct_change(delta: np.ndarray, prev: np.ndarray) -> np.ndarray:
+    """Percent change; NaN where there is no previous count."""
+    out = np.full(len(delta), np.nan)
+    np.divide(delta * 100.0, prev, out=out, where=prev > 0)
+    return np.round(out, 2)
+
+
+def add_trends(df: pd.DataFrame) -> pd.DataFrame:
+    """Deltas, percent changes and trend labels for every cluster in one pass."""
+    last = df["count_last"].to_numpy()
+    prev = df["count_prev"].to_numpy()
+    delta = last - prev
+    return df.assign(
+        delta_count=delta,
+        delta_pct=pct_change(delta, prev),
+        trend_label=trend_labels(delta),
+    )
+
+
+def content_hash(brand: str, payload: Dict[str, Any]) -> str:
+    """Fingerprint of everything the LLM sees for one cluster."""
+    blob = json.dumps(
+        {"brand": brand, "model": OLLAMA_MODEL, "cluster": payload},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def prompt_batches(pending: Dict[str, Dict[str, Any]]) -> Iterator[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Splits {hash: payload} into prompts of at most MAX_CLUSTERS_PER_BRAND
+    clusters. The LLM answers by cluster_id, so a cluster appears at most
+    once per prompt; its other versions go into later prompts.
+    """
+    queue = list(pending.items())
+    while queue:
+        batch, seen, rest = [], set(), []
+        for h, payload in queue:
+            if payload["cluster_id"] in seen or len(batch) >= MAX_CLUSTERS_PER_BRAND:
+                rest.append((h, payload))
+                continue
+            seen.add(payload["cluster_id"])
+            batch.append((h, payload))
+        yield batch
+        queue = rest
+
+
+def summarize_clusters(brand: str, pending: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """LLM output for each pending content hash, batched per prompt."""
+    out = {}
+    for batch in prompt_batches(pending):
+        prompt = build_cluster_summary_prompt(brand, [payload for _, payload in batch])
+        log(f"Calling Ollama for brand={brand} with {len(batch)} clusters (this may take ~30–60s)")
+        raw = call_ollama(prompt)
+
+        try:
+            llm_json = json.loads(raw)
+            log(f"Ollama completed for brand={brand}")
+        except json.JSONDecodeError:
+            count("llm_invalid_json_total")
+            raise RuntimeError(f"Ollama returned invalid JSON:\n{raw}")
+
+        summaries = {s["cluster_id"]: s for s in llm_json.get("cluster_summaries", [])}
+        for h, payload in batch:
+            s = summaries.get(payload["cluster_id"])
+            if s:
+                out[h] = s
+    return out
 
 # ------------------------------------------------------------
 # INSERT
 # ------------------------------------------------------------
-def insert_cluster_insights(conn, rows: List[Dict[str, Any]]):
+def insert_cluster_insights(conn, rows: List[Dict[str, Any]]) -> int:
+    """
+    Bulk-inserts rows (each with its own window) in one statement. A row
+    whose window was already stored with the same content is skipped, so
+    re-running a run or a backfill does not duplicate insights.
+    Returns the number of rows inserted.
+    """
     q = """
     INSERT INTO cluster_insights (
         brand,
@@ -169,129 +422,185 @@ def insert_cluster_insights(conn, rows: List[Dict[str, Any]]):
         count_prev_7d,
         delta_count,
         delta_pct,
-        trend_label
+        trend_label,
+        content_hash
     )
-    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);
+    SELECT v.*
+    FROM (VALUES %s) AS v(
+        brand, cluster_id, summary, primary_issue, user_impact,
+        window_start, window_end, count_last_7d, count_prev_7d,
+        delta_count, delta_pct, trend_label, content_hash
+    )
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM cluster_insights ci
+        WHERE ci.content_hash = v.content_hash
+          AND ci.window_end = v.window_end
+          AND ci.window_start = v.window_start
+    );
     """
+    if not rows:
+        return 0
     with conn.cursor() as cur:
-        for r in rows:
-            cur.execute(q, (
+        execute_values(
+            cur,
+            q,
+            [(
                 r["brand"],
                 r["cluster_id"],
                 r["summary"],
                 r["primary_issue"],
                 r["user_impact"],
-                WINDOW_START,
-                WINDOW_END,
+                r["window_start"],
+                r["window_end"],
                 r["count_last_7d"],
                 r["count_prev_7d"],
                 r["delta_count"],
                 r["delta_pct"],
                 r["trend_label"],
-            ))
+                r["content_hash"],
+            ) for r in rows],
+            # Typed so all-NULL columns (delta_pct) still match the table
+            template="(%s,%s::int,%s,%s,%s,%s::date,%s::date,%s::int,%s::int,%s::int,%s::numeric,%s,%s)",
+            page_size=len(rows),
+        )
+        return cur.rowcount
 
 # ------------------------------------------------------------
 # MAIN
 # ------------------------------------------------------------
-def main():
+def select_clusters(trends: pd.DataFrame, examples: Dict[Tuple[str, int], List[str]]) -> pd.DataFrame:
+    """
+    The MAX_CLUSTERS_PER_BRAND largest clusters of each brand and window,
+    minus clusters with no exemplars, with their LLM payload and content hash.
+    """
+    top = (
+        trends.sort_values(["brand", "window_start", "cluster_size"], ascending=[True, True, False])
+        .groupby(["brand", "window_start"], sort=False)
+        .head(MAX_CLUSTERS_PER_BRAND)
+    )
+    payloads, hashes = [], []
+    for r in top.itertuples(index=False):
+        quotes = examples.get((r.brand, int(r.cluster_id)))
+        if not quotes:
+            payloads.append(None)
+            hashes.append(None)
+            continue
+        payload = {
+            "cluster_id": int(r.cluster_id),
+            "size": size_descriptor(int(r.cluster_size)),
+            "sentiment": sentiment_descriptor(float(r.avg_sentiment)),
+            "trend": r.trend_label,
+            "examples": quotes,
+        }
+        payloads.append(payload)
+        hashes.append(content_hash(r.brand, payload))
+    top = top.assign(payload=payloads, content_hash=hashes)
+    return top[top["content_hash"].notna()]
+
+
+@staged("cluster_insights")
+def main(conn=None, end: Optional[date] = None, backfill_from: Optional[date] = None) -> int:
+    """
+    Pass conn to reuse a shared connection (it is left open). end is the
+    exclusive end of the current window (default: today). With
+    backfill_from, one insight per complete Monday-aligned week from
+    backfill_from up to end is written instead of the current window.
+    Returns the number of insight rows inserted.
+    """
     log("Starting cluster insights batch job")
-    conn = get_db_connection()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = get_db_connection()
 
     try:
-        clusters = fetch_current_clusters(conn)
-        log(f"Fetched {len(clusters)} brand-cluster rows")
-        last_7d = fetch_cluster_counts(conn, WINDOW_START, WINDOW_END)
-        prev_7d = fetch_cluster_counts(conn, PREV_WINDOW_START, PREV_WINDOW_END)
-
-        by_brand = defaultdict(list)
-
-        for brand, cid, size, avg_sent in clusters:
-            last = last_7d.get((brand, cid), 0)
-            prev = prev_7d.get((brand, cid), 0)
-            delta = last - prev
-
-            by_brand[brand].append({
-                "cluster_id": cid,
-                "cluster_size": size,
-                "avg_sentiment": avg_sent,
-                "count_last_7d": last,
-                "count_prev_7d": prev,
-                "delta_count": delta,
-                "delta_pct": pct(delta, prev),
-                "trend_label": trend_label(delta),
-            })
+        refresh_daily_sentiment(conn)
+
+        if backfill_from is None:
+            windows = trend_windows(end)
+            trends = fetch_cluster_trends(conn, windows)
+            log(f"Fetched {len(trends)} brand-cluster rows | window={windows.start}..{windows.end}")
+        else:
+            weeks = backfill_windows(backfill_from, end or date.today())
+            if not weeks:
+                log(f"No complete week between {backfill_from} and {end or date.today()}")
+                return 0
+            weekly = fetch_weekly_cluster_counts(conn, weeks[-1].end)
+            trends = weekly_cluster_trends(weekly, weeks)
+            log(
+                f"Fetched {len(weekly)} brand-cluster-week counts | "
+                f"{len(weeks)} windows {weeks[0].start}..{weeks[-1].end}"
+            )
+        trends = add_trends(trends)
 
         if not ENABLE_LLM:
             print("LLM disabled. Exiting without generation.")
-            return
-
-        total_inserted = 0
+            return 0
 
-        for brand, clist in by_brand.items():
-            log(f"Processing brand={brand} with {len(clist)} clusters")
-            clist = sorted(clist, key=lambda x: x["cluster_size"], reverse=True)[:MAX_CLUSTERS_PER_BRAND]
-
-            clusters_payload = []
-            for c in clist:
-                examples = fetch_cluster_examples(conn, brand, c["cluster_id"])
-                if not examples:
-                    continue
-
-                clusters_payload.append({
-                    "cluster_id": c["cluster_id"],
-                    "size": size_descriptor(c["cluster_size"]),
-                    "sentiment": sentiment_descriptor(c["avg_sentiment"]),
-                    "trend": c["trend_label"],
-                    "examples": examples,
-                })
+        selected = select_clusters(trends, fetch_cluster_examples(conn))
+        known = fetch_known_summaries(conn, selected["content_hash"].unique().tolist())
+        log(f"{len(selected)} insights to write | {selected['content_hash'].isin(list(known)).sum()} reuse a stored summary")
 
-            if not clusters_payload:
-                continue
-
-            prompt = build_cluster_summary_prompt(brand, clusters_payload)
-            log(f"Calling Ollama for brand={brand} (this may take ~30–60s)")
-            raw = call_ollama(prompt)
+        total_inserted = 0
 
-            try:
-                llm_json = json.loads(raw)
-                log(f"Ollama completed for brand={brand}")
-            except json.JSONDecodeError:
-                raise RuntimeError(f"Ollama returned invalid JSON:\n{raw}")
+        for brand, group in selected.groupby("brand", sort=True):
+            pending = {
+                h: payload
+                for h, payload in zip(group["content_hash"], group["payload"])
+                if h not in known
+            }
+            log(f"Processing brand={brand} | {len(group)} insights, {len(pending)} new cluster contents")
+            summaries = {**known, **summarize_clusters(brand, pending)}
+            count("insights_summaries_reused_total", len(group) - len(pending))
 
-            summaries = {s["cluster_id"]: s for s in llm_json.get("cluster_summaries", [])}
             insert_rows = []
-
-            for c in clist:
-                s = summaries.get(c["cluster_id"])
+            for c in group.itertuples(index=False):
+                s = summaries.get(c.content_hash)
                 if not s:
                     continue
 
                 insert_rows.append({
                     "brand": brand,
-                    "cluster_id": c["cluster_id"],
+                    "cluster_id": int(c.cluster_id),
                     "summary": s["summary"][:2000],
                     "primary_issue": s["primary_issue"][:200],
                     "user_impact": s["user_impact"],
-                    "count_last_7d": c["count_last_7d"],
-                    "count_prev_7d": c["count_prev_7d"],
-                    "delta_count": c["delta_count"],
-                    "delta_pct": c["delta_pct"],
-                    "trend_label": c["trend_label"],
+                    "window_start": c.window_start,
+                    "window_end": c.window_end,
+                    "count_last_7d": int(c.count_last),
+                    "count_prev_7d": int(c.count_prev),
+                    "delta_count": int(c.delta_count),
+                    "delta_pct": None if pd.isna(c.delta_pct) else float(c.delta_pct),
+                    "trend_label": c.trend_label,
+                    "content_hash": c.content_hash,
                 })
 
-            insert_cluster_insights(conn, insert_rows)
+            inserted = insert_cluster_insights(conn, insert_rows)
             conn.commit()
-            log(f"Inserted {len(insert_rows)} insights for brand={brand}")
+            log(f"Inserted {inserted} insights for brand={brand}")
 
-
-            total_inserted += len(insert_rows)
-            print(f"[OK] {brand}: inserted {len(insert_rows)} insights")
+            total_inserted += inserted
+            print(f"[OK] {brand}: inserted {inserted} insights")
 
         print(f"DONE. Total rows inserted: {total_inserted}")
         log("Cluster insights batch job finished")
+        return total_inserted
     finally:
-        conn.close()
+        if owns_conn:
+            conn.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate cluster insights with week-over-week trends")
+    parser.add_argument(
+        "--end",
+        type=date.fromisoformat,
+        help="Exclusive end of the current window, YYYY-MM-DD (default: today)",
+    )
+    parser.add_argument(
+        "--backfill-from",
+        type=date.fromisoformat,
+        help="Write one insight per complete Monday-aligned week from this date up to --end",
+    )
+    args = parser.parse_args()
+    main(end=args.end, backfill_from=args.backfill_from)
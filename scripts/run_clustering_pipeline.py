@@ -1,10 +1,13 @@
 import os
 import sys
-from typing import List, Tuple, Optional
+import argparse
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 import psycopg2
 import numpy as np
+import pyarrow as pa
 from dotenv import load_dotenv
+from psycopg2.extras import execute_values
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import normalize
 
@@ -12,12 +15,67 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
+from analytics.clustering import (
+    EXEMPLARS_PER_CLUSTER,
+    assign_nearest,
+    centroids,
+    cluster_top_terms,
+    nearest_to_centroid,
+)
+from db.copy_reader import read_arrow, read_fixed_binary
+from db.pipeline_state import (
+    advance_watermark,
+    clear_retries,
+    count_skips,
+    fetch_due_retries,
+    get_watermark,
+    record_skips,
+)
+from observability.instrument import InstrumentedConnection, count, staged, timer
+
 load_dotenv()
 
 CLUSTERING_MODEL_NAME = "kmeans_v1_cosine_norm"
 MIN_REVIEWS_PER_BRAND = 15
 FETCH_LIMIT_PER_BRAND = 5000
 MAX_K = 8  # upper cap, adaptive selection below
+EMBEDDING_DIM = 384
+# Nearest reviews considered per cluster; extras cover ones with an empty body
+EXEMPLAR_CANDIDATES = 2 * EXEMPLARS_PER_CLUSTER
+# Upstream stage: its watermark caps ours (see main)
+EMBEDDING_STAGE = "embedding"
+
+
+class EmbeddingRows(NamedTuple):
+    raw_ids: np.ndarray   # int64, ascending
+    vectors: np.ndarray   # float32 (n, EMBEDDING_DIM); zeros where not valid
+    valid: np.ndarray     # bool; False = NULL or wrong-size embedding
+
+
+class Centroids(NamedTuple):
+    cluster_ids: np.ndarray  # int64, ascending
+    vectors: np.ndarray      # float32 (k, EMBEDDING_DIM); mean of L2-normalized members
+    counts: np.ndarray       # int64 members behind each mean
+
+
+# Binary COPY needs fixed-width fields: bad embeddings are swapped for a zero
+# vector and flagged, instead of being decoded row by row in Python
+_EMBEDDING_COLUMNS = """
+    re.raw_id,
+    COALESCE(octet_length(re.embedding), 0) = %(bytes)s,
+    CASE WHEN octet_length(re.embedding) = %(bytes)s
+         THEN re.embedding
+         ELSE decode(repeat('00', %(bytes)s), 'hex')
+    END
+"""
+
+_EMBEDDING_FIELDS = [("raw_id", ">i4"), ("valid", "?"), ("embedding", f"V{EMBEDDING_DIM * 4}")]
+_CLUSTERED_FIELDS = _EMBEDDING_FIELDS + [("cluster_id", ">i4")]
+
+
+def stage_name(brand: str) -> str:
+    # Each brand is clustered independently, so each gets its own watermark
+    return f"clustering:{brand}"
 
 
 def connect():
@@ -27,58 +85,328 @@ def connect():
         database=os.getenv("PGDATABASE"),
         user=os.getenv("PGUSER"),
         password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
     )
 
 
-def fetch_brands_with_unclustered(cur) -> List[str]:
+def fetch_brands_with_new_embeddings(cur) -> List[str]:
+    """
+    Brands with embeddings above their clustering watermark, or with due
+    retries. Distinct brands come from a loose index scan over
+    idx_review_embeddings_brand_raw (one probe per brand, not per row).
+    """
     cur.execute(
         """
-        SELECT DISTINCT mr.brand
-        FROM mentions_raw mr
-        JOIN review_embeddings re ON re.raw_id = mr.raw_id
-        LEFT JOIN review_clusters rc ON rc.raw_id = mr.raw_id
-        WHERE rc.raw_id IS NULL
-        ORDER BY mr.brand;
+        WITH RECURSIVE brands AS (
+            SELECT MIN(brand) AS brand
+            FROM review_embeddings
+            UNION ALL
+            SELECT (
+                SELECT MIN(re.brand)
+                FROM review_embeddings re
+                WHERE re.brand > b.brand
+            )
+            FROM brands b
+            WHERE b.brand IS NOT NULL
+        )
+        SELECT b.brand
+        FROM brands b
+        LEFT JOIN pipeline_state ps ON ps.stage = 'clustering:' || b.brand
+        WHERE b.brand IS NOT NULL
+          AND (
+              EXISTS (
+                  SELECT 1 FROM review_embeddings re
+                  WHERE re.brand = b.brand
+                    AND re.raw_id > COALESCE(ps.watermark_id, 0)
+              )
+              OR EXISTS (
+                  SELECT 1 FROM pipeline_retries pr
+                  WHERE pr.stage = 'clustering:' || b.brand
+                    AND pr.dead_at IS NULL
+                    AND pr.next_attempt_at <= NOW()
+              )
+          )
+        ORDER BY b.brand;
         """
     )
     return [r[0] for r in cur.fetchall()]
 
 
-def fetch_embeddings_for_brand(cur, brand: str, limit: int) -> List[Tuple[int, bytes]]:
-    cur.execute(
-        """
-        SELECT re.raw_id, re.embedding
+def _read_embeddings(cur, query: str, params: dict) -> EmbeddingRows:
+    params = dict(params, bytes=EMBEDDING_DIM * 4)
+    cols = read_fixed_binary(cur.connection, query, params, _EMBEDDING_FIELDS)
+    # bytea holds the embedding pipeline's ndarray.tobytes(), i.e. native float32
+    vectors = cols["embedding"].view(np.float32).reshape(-1, EMBEDDING_DIM)
+    return EmbeddingRows(cols["raw_id"].astype(np.int64), vectors, cols["valid"])
+
+
+def fetch_embeddings_for_brand(cur, brand: str, after: int, limit: int) -> EmbeddingRows:
+    return _read_embeddings(
+        cur,
+        f"""
+        SELECT {_EMBEDDING_COLUMNS}
         FROM review_embeddings re
-        JOIN mentions_raw mr ON mr.raw_id = re.raw_id
-        LEFT JOIN review_clusters rc ON rc.raw_id = re.raw_id
-        WHERE rc.raw_id IS NULL
-          AND mr.brand = %s
+        WHERE re.brand = %(brand)s
+          AND re.raw_id > %(after)s
+          AND NOT EXISTS (
+              SELECT 1 FROM review_clusters rc WHERE rc.raw_id = re.raw_id
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM pipeline_retries pr
+              WHERE pr.stage = %(stage)s AND pr.raw_id = re.raw_id
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM pipeline_skips ps
+              WHERE ps.stage = %(stage)s AND ps.raw_id = re.raw_id
+                AND ps.model_version = %(model)s
+          )
         ORDER BY re.raw_id ASC
-        LIMIT %s;
+        LIMIT %(limit)s
         """,
-        (brand, limit),
+        {
+            "brand": brand,
+            "after": after,
+            "stage": stage_name(brand),
+            "model": CLUSTERING_MODEL_NAME,
+            "limit": limit,
+        },
     )
-    return cur.fetchall()
 
 
-def insert_clusters(cur, rows: List[Tuple[int, int, str]]):
-    cur.executemany(
-        """
-        INSERT INTO review_clusters (raw_id, cluster_id, clustering_model)
-        VALUES (%s, %s, %s)
-        ON CONFLICT (raw_id) DO NOTHING;
+def fetch_embeddings_by_ids(cur, raw_ids: List[int]) -> EmbeddingRows:
+    if not raw_ids:
+        return EmbeddingRows(
+            np.empty(0, dtype=np.int64),
+            np.empty((0, EMBEDDING_DIM), dtype=np.float32),
+            np.empty(0, dtype=bool),
+        )
+    return _read_embeddings(
+        cur,
+        f"""
+        SELECT {_EMBEDDING_COLUMNS}
+        FROM review_embeddings re
+        WHERE re.raw_id = ANY(%(ids)s::int[])
+        ORDER BY re.raw_id ASC
+        """,
+        {"ids": list(raw_ids)},
+    )
+
+
+# Rolls up only the rows the insert actually added, so a re-clustered
+# raw_id (ON CONFLICT DO NOTHING) is never counted twice. Rows sentiment has
+# not scored yet count towards count but not scored_count; the insights job
+# folds their scores in later (refresh_daily_sentiment).
+_DAILY_COUNTS_FROM = """
+    SELECT c.brand, c.cluster_id, mr.created_utc::date, COUNT(*),
+           COUNT(ml.sentiment_score), COALESCE(SUM(ml.sentiment_score), 0)
+    FROM {source} c
+    JOIN mentions_raw mr ON mr.raw_id = c.raw_id
+    LEFT JOIN mentions_ml ml ON ml.raw_id = c.raw_id
+    WHERE c.brand IS NOT NULL
+      AND c.cluster_id IS NOT NULL
+    GROUP BY c.brand, c.cluster_id, mr.created_utc::date
+"""
+
+
+def insert_clusters(cur, rows: List[Tuple[int, str, int, str]]):
+    """
+    Inserts cluster assignments and adds them to cluster_daily_counts, in
+    one statement. Adding is only sound because cluster ids are stable
+    between refits (stored centroids); refit_clusters rebuilds the brand's
+    rollup instead.
+    """
+    if not rows:
+        return
+    execute_values(
+        cur,
+        f"""
+        WITH inserted AS (
+            INSERT INTO review_clusters (raw_id, brand, cluster_id, clustering_model)
+            VALUES %s
+            ON CONFLICT (raw_id) DO NOTHING
+            RETURNING raw_id, brand, cluster_id
+        )
+        INSERT INTO cluster_daily_counts AS cdc (brand, cluster_id, day, count, scored_count, sentiment_sum)
+        {_DAILY_COUNTS_FROM.format(source="inserted")}
+        ON CONFLICT (brand, cluster_id, day) DO UPDATE
+        SET count = cdc.count + EXCLUDED.count,
+            scored_count = cdc.scored_count + EXCLUDED.scored_count,
+            sentiment_sum = cdc.sentiment_sum + EXCLUDED.sentiment_sum;
         """,
         rows,
+        page_size=len(rows),
     )
 
 
-def bytes_to_vec(b: bytes, dim: int = 384) -> Optional[np.ndarray]:
-    if b is None:
-        return None
-    v = np.frombuffer(b, dtype=np.float32)
-    if v.shape[0] != dim:
+def rebuild_brand_daily_counts(cur, brand: str) -> int:
+    """Replaces one brand's cluster_daily_counts with a rollup of its current assignments."""
+    cur.execute("DELETE FROM cluster_daily_counts WHERE brand = %s;", (brand,))
+    cur.execute(
+        f"""
+        INSERT INTO cluster_daily_counts (brand, cluster_id, day, count, scored_count, sentiment_sum)
+        {_DAILY_COUNTS_FROM.format(source="(SELECT * FROM review_clusters WHERE brand = %(brand)s)")};
+        """,
+        {"brand": brand},
+    )
+    return cur.rowcount
+
+
+@staged("cluster_daily_counts")
+def rebuild_daily_counts(conn=None) -> int:
+    """
+    Rebuilds cluster_daily_counts from review_clusters, e.g. after a manual
+    edit. Rescored sentiment does not need it: the insights job refreshes
+    the days whose scores changed. Returns the number of rollup rows written.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM cluster_daily_counts;")
+            cur.execute(
+                f"""
+                INSERT INTO cluster_daily_counts (brand, cluster_id, day, count, scored_count, sentiment_sum)
+                {_DAILY_COUNTS_FROM.format(source="review_clusters")};
+                """
+            )
+            written = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if owns_conn:
+            conn.close()
+    print(f"[INFO] cluster_daily_counts rebuilt | rows={written}")
+    return written
+
+
+def write_exemplars(cur, brand: str, cluster_ids: np.ndarray, raw_ids: np.ndarray,
+                    distances: np.ndarray, model: str):
+    """
+    Replaces the exemplars of these clusters with the candidates given
+    (nearest_to_centroid output), keeping the EXEMPLARS_PER_CLUSTER nearest
+    with a non-empty body, and mirrors their raw_ids into
+    cluster_summaries.example_post_ids.
+    """
+    if not len(raw_ids):
+        return
+    cids = sorted({int(c) for c in cluster_ids})
+    cur.execute("DELETE FROM cluster_exemplars WHERE brand = %s AND cluster_id = ANY(%s);", (brand, cids))
+    rows = [
+        (brand, int(c), int(rid), float(d), model)
+        for c, rid, d in zip(cluster_ids, raw_ids, distances)
+    ]
+    # One page: ranks are assigned across the whole VALUES list
+    execute_values(
+        cur,
+        f"""
+        INSERT INTO cluster_exemplars (brand, cluster_id, rank, raw_id, distance, body, clustering_model)
+        SELECT brand, cluster_id, rank, raw_id, distance, body, clustering_model
+        FROM (
+            SELECT v.brand, v.cluster_id, v.raw_id, v.distance, v.clustering_model, mr.body,
+                   ROW_NUMBER() OVER (PARTITION BY v.cluster_id ORDER BY v.distance, v.raw_id) AS rank
+            FROM (VALUES %s) AS v(brand, cluster_id, raw_id, distance, clustering_model)
+            JOIN mentions_raw mr ON mr.raw_id = v.raw_id
+            WHERE mr.body IS NOT NULL
+              AND LENGTH(TRIM(mr.body)) > 0
+        ) ranked
+        WHERE rank <= {EXEMPLARS_PER_CLUSTER};
+        """,
+        rows,
+        template="(%s, %s, %s, %s::real, %s)",
+        page_size=len(rows),
+    )
+    cur.execute(
+        """
+        INSERT INTO cluster_summaries (brand, cluster_id, example_post_ids, updated_at)
+        SELECT %(brand)s, c.cluster_id,
+               (SELECT string_agg(ce.raw_id::text, ',' ORDER BY ce.rank)
+                FROM cluster_exemplars ce
+                WHERE ce.brand = %(brand)s AND ce.cluster_id = c.cluster_id),
+               NOW()
+        FROM unnest(%(cids)s::int[]) AS c(cluster_id)
+        ON CONFLICT (brand, cluster_id) DO UPDATE
+        SET example_post_ids = EXCLUDED.example_post_ids, updated_at = EXCLUDED.updated_at;
+        """,
+        {"brand": brand, "cids": cids},
+    )
+
+
+# ------------------------------------------------------------
+# CENTROIDS (stable cluster ids across runs, migration 0016)
+# ------------------------------------------------------------
+def load_centroids(cur, brand: str) -> Optional[Centroids]:
+    cur.execute(
+        """
+        SELECT cluster_id, centroid, member_count
+        FROM cluster_centroids
+        WHERE brand = %s AND clustering_model = %s
+        ORDER BY cluster_id;
+        """,
+        (brand, CLUSTERING_MODEL_NAME),
+    )
+    rows = cur.fetchall()
+    if not rows:
         return None
-    return v
+    return Centroids(
+        np.array([r[0] for r in rows], dtype=np.int64),
+        np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows]),
+        np.array([r[2] for r in rows], dtype=np.int64),
+    )
+
+
+def save_centroids(cur, brand: str, cents: Centroids, replace: bool = False):
+    """Upserts the brand's centroids; replace=True first drops every other cluster of the brand."""
+    if replace:
+        cur.execute("DELETE FROM cluster_centroids WHERE brand = %s;", (brand,))
+    execute_values(
+        cur,
+        """
+        INSERT INTO cluster_centroids (brand, cluster_id, centroid, member_count, clustering_model, updated_at)
+        VALUES %s
+        ON CONFLICT (brand, cluster_id) DO UPDATE
+        SET centroid = EXCLUDED.centroid,
+            member_count = EXCLUDED.member_count,
+            clustering_model = EXCLUDED.clustering_model,
+            updated_at = EXCLUDED.updated_at;
+        """,
+        [
+            (brand, int(c), v.astype(np.float32).tobytes(), int(n), CLUSTERING_MODEL_NAME)
+            for c, v, n in zip(cents.cluster_ids, cents.vectors, cents.counts)
+        ],
+        template="(%s, %s, %s, %s, %s, NOW())",
+    )
+
+
+def membership_centroids(Xn: np.ndarray, labels: np.ndarray) -> Centroids:
+    """Centroids of the clusters present in labels, as member means."""
+    ids = np.unique(labels)
+    return Centroids(
+        ids.astype(np.int64),
+        centroids(Xn, labels)[ids].astype(np.float32),
+        np.bincount(labels)[ids].astype(np.int64),
+    )
+
+
+def fold_in(cents: Centroids, pos: np.ndarray, Xn: np.ndarray) -> Centroids:
+    """Running means after adding rows Xn to the clusters at positions pos."""
+    sums = cents.vectors.astype(np.float64) * cents.counts[:, None]
+    np.add.at(sums, pos, Xn)
+    counts = cents.counts + np.bincount(pos, minlength=len(cents.cluster_ids))
+    return Centroids(cents.cluster_ids, (sums / np.maximum(counts, 1)[:, None]).astype(np.float32), counts)
+
+
+def fetch_exemplar_candidates(cur, brand: str, cluster_ids: List[int]) -> Tuple[EmbeddingRows, np.ndarray]:
+    """Current exemplars of these clusters with their embeddings, and their cluster ids."""
+    cur.execute(
+        "SELECT raw_id, cluster_id FROM cluster_exemplars WHERE brand = %s AND cluster_id = ANY(%s);",
+        (brand, cluster_ids),
+    )
+    by_id = dict(cur.fetchall())
+    rows = fetch_embeddings_by_ids(cur, sorted(by_id))
+    return rows, np.array([by_id[int(r)] for r in rows.raw_ids], dtype=np.int64)
 
 
 def choose_k(n: int) -> int:
@@ -96,92 +424,418 @@ def choose_k(n: int) -> int:
     return min(MAX_K, int(np.sqrt(n)))
 
 
-def main():
+# ------------------------------------------------------------
+# CLUSTER LABELS (c-TF-IDF top terms)
+# ------------------------------------------------------------
+def fetch_cluster_texts(conn) -> pa.Table:
+    # Rows ingested before migration 0009 have no normalized_text
+    return read_arrow(
+        conn,
+        """
+        SELECT rc.brand, rc.cluster_id, COALESCE(mr.normalized_text, lower(mr.body)) AS text
+        FROM review_clusters rc
+        JOIN mentions_raw mr ON mr.raw_id = rc.raw_id
+        WHERE rc.brand IS NOT NULL
+          AND rc.cluster_id IS NOT NULL
+        """,
+        column_types={"brand": pa.string(), "cluster_id": pa.int32(), "text": pa.string()},
+    )
+
+
+def write_top_terms(cur, terms: Dict[Tuple[str, int], List[str]]):
+    """Upserts cluster_summaries.top_terms and drops summaries of clusters that no longer exist."""
+    if terms:
+        execute_values(
+            cur,
+            """
+            INSERT INTO cluster_summaries (brand, cluster_id, top_terms, updated_at)
+            VALUES %s
+            ON CONFLICT (brand, cluster_id) DO UPDATE
+            SET top_terms = EXCLUDED.top_terms, updated_at = EXCLUDED.updated_at;
+            """,
+            [(brand, cid, ", ".join(t)) for (brand, cid), t in terms.items()],
+            template="(%s, %s, %s, NOW())",
+        )
+    cur.execute(
+        """
+        DELETE FROM cluster_summaries cs
+        WHERE NOT EXISTS (
+            SELECT 1 FROM review_clusters rc
+            WHERE rc.brand = cs.brand AND rc.cluster_id = cs.cluster_id
+        );
+        """
+    )
+
+
+@staged("cluster_terms")
+def refresh_top_terms(conn=None) -> int:
+    """
+    Recomputes c-TF-IDF top terms for every (brand, cluster) over all
+    clustered reviews in one pass (analytics/clustering.py). All brands at
+    once because the IDF is shared across every cluster. Returns the
+    number of clusters labelled.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    try:
+        table = fetch_cluster_texts(conn)
+        with timer("model_fit_seconds", model="ctfidf"):
+            terms = cluster_top_terms(
+                table.column("text"),
+                table.column("brand").to_numpy(zero_copy_only=False),
+                table.column("cluster_id").to_numpy(zero_copy_only=False),
+            )
+        with conn.cursor() as cur:
+            write_top_terms(cur, terms)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if owns_conn:
+            conn.close()
+
+    print(f"[INFO] Cluster top terms refreshed | reviews={table.num_rows} clusters={len(terms)}")
+    return len(terms)
+
+
+# ------------------------------------------------------------
+# EXEMPLAR REBUILD (clusters made before exemplars were tracked)
+# ------------------------------------------------------------
+def fetch_clustered_embeddings(cur, brand: str) -> Tuple[EmbeddingRows, np.ndarray]:
+    params = {"brand": brand, "bytes": EMBEDDING_DIM * 4}
+    cols = read_fixed_binary(
+        cur.connection,
+        f"""
+        SELECT {_EMBEDDING_COLUMNS}, rc.cluster_id
+        FROM review_clusters rc
+        JOIN review_embeddings re ON re.raw_id = rc.raw_id
+        WHERE rc.brand = %(brand)s
+          AND rc.cluster_id IS NOT NULL
+        """,
+        params,
+        _CLUSTERED_FIELDS,
+    )
+    vectors = cols["embedding"].view(np.float32).reshape(-1, EMBEDDING_DIM)
+    rows = EmbeddingRows(cols["raw_id"].astype(np.int64), vectors, cols["valid"])
+    return rows, cols["cluster_id"].astype(np.int64)
+
+
+@staged("cluster_exemplars")
+def rebuild_exemplars(conn=None) -> int:
+    """
+    Recomputes every cluster's exemplars from stored embeddings, with each
+    centroid taken as the mean of the cluster's current members, and
+    stores those centroids. Returns the number of clusters rebuilt.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    cur = conn.cursor()
+    total = 0
+    try:
+        cur.execute("SELECT DISTINCT brand FROM review_clusters WHERE brand IS NOT NULL ORDER BY brand;")
+        brands = [r[0] for r in cur.fetchall()]
+        for brand in brands:
+            rows, cluster_ids = fetch_clustered_embeddings(cur, brand)
+            labels = cluster_ids[rows.valid]
+            if not len(labels):
+                conn.rollback()
+                continue
+            Xn = normalize(rows.vectors[rows.valid], norm="l2")
+
+            nearest, dist = nearest_to_centroid(Xn, labels, centroids(Xn, labels), EXEMPLAR_CANDIDATES)
+            write_exemplars(
+                cur, brand, labels[nearest], rows.raw_ids[rows.valid][nearest], dist, CLUSTERING_MODEL_NAME
+            )
+            save_centroids(cur, brand, membership_centroids(Xn, labels), replace=True)
+            conn.commit()
+            clusters = len(np.unique(labels))
+            total += clusters
+            print(f"[INFO] brand='{brand}' exemplars rebuilt | clusters={clusters} rows={len(labels)}")
+    finally:
+        cur.close()
+        if owns_conn:
+            conn.close()
+    return total
+
+
+def bootstrap_centroids(cur, brand: str) -> Optional[Centroids]:
+    """
+    Centroids of a brand clustered before they were stored (migration
+    0016), from its current members; None for a brand never clustered.
+    """
+    rows, cluster_ids = fetch_clustered_embeddings(cur, brand)
+    labels = cluster_ids[rows.valid]
+    if not len(labels):
+        return None
+    return membership_centroids(normalize(rows.vectors[rows.valid], norm="l2"), labels)
+
+
+@staged("cluster_refit")
+def refit_clusters(conn=None, brands: Optional[Sequence[str]] = None) -> int:
+    """
+    Full rebuild: refits KMeans on every clustered review of each brand,
+    relabels all of them and replaces the brand's centroids, exemplars and
+    cluster_daily_counts, then refreshes top terms. Cluster ids are not comparable
+    across a refit. Returns the number of reviews relabelled.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    cur = conn.cursor()
+    total = 0
+    try:
+        cur.execute("SELECT DISTINCT brand FROM review_clusters WHERE brand IS NOT NULL ORDER BY brand;")
+        targets = [r[0] for r in cur.fetchall() if brands is None or r[0] in set(brands)]
+        for brand in targets:
+            rows, _ = fetch_clustered_embeddings(cur, brand)
+            raw_ids = rows.raw_ids[rows.valid]
+            if len(raw_ids) < MIN_REVIEWS_PER_BRAND:
+                conn.rollback()
+                print(f"[INFO] Skipping refit brand='{brand}' (rows={len(raw_ids)} < {MIN_REVIEWS_PER_BRAND})")
+                continue
+            Xn = normalize(rows.vectors[rows.valid], norm="l2")
+            k = choose_k(len(Xn))
+            with timer("model_fit_seconds", model="kmeans"):
+                labels = KMeans(n_clusters=k, random_state=42, n_init="auto").fit_predict(Xn)
+
+            execute_values(
+                cur,
+                """
+                UPDATE review_clusters rc
+                SET cluster_id = v.cluster_id, clustering_model = v.clustering_model
+                FROM (VALUES %s) AS v(raw_id, cluster_id, clustering_model)
+                WHERE rc.raw_id = v.raw_id;
+                """,
+                [(int(r), int(c), CLUSTERING_MODEL_NAME) for r, c in zip(raw_ids, labels)],
+                page_size=5000,
+            )
+            # Every member moved, so the rollup is rebuilt rather than added to
+            rebuild_brand_daily_counts(cur, brand)
+            cents = membership_centroids(Xn, labels)
+            save_centroids(cur, brand, cents, replace=True)
+            cur.execute("DELETE FROM cluster_exemplars WHERE brand = %s;", (brand,))
+            nearest, dist = nearest_to_centroid(Xn, labels, centroids(Xn, labels), EXEMPLAR_CANDIDATES)
+            write_exemplars(cur, brand, labels[nearest], raw_ids[nearest], dist, CLUSTERING_MODEL_NAME)
+            conn.commit()
+            total += len(raw_ids)
+            print(f"[INFO] brand='{brand}' refit | k={k} rows={len(raw_ids)}")
+
+        if total:
+            refresh_top_terms(conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        if owns_conn:
+            conn.close()
+    return total
+
+
+def has_pending(cur) -> bool:
+    """Cheap probe used by the pipeline runner to skip an idle stage."""
+    return bool(fetch_brands_with_new_embeddings(cur))
+
+
+@staged("clustering")
+def main(conn=None, refresh_terms: bool = True, brands: Optional[Sequence[str]] = None) -> int:
+    """
+    Clusters new embeddings per brand: a brand's first batch fits KMeans,
+    later ones are assigned to its stored centroids (cluster ids stay
+    stable until refit_clusters). Pass conn to reuse a shared
+    connection (it is left open), and brands to cluster only those. Unless
+    refresh_terms is False, top terms are recomputed afterwards when
+    anything was clustered. Returns the number of rows clustered.
+    """
     print(f"[INFO] Clustering pipeline starting | model={CLUSTERING_MODEL_NAME}")
 
-    conn = connect()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
     cur = conn.cursor()
 
     total_brands = 0
     total_clustered_rows = 0
     total_skipped_brands = 0
+    total_skipped_rows = 0
     total_failed_brands = 0
 
     try:
-        brands = fetch_brands_with_unclustered(cur)
-        if not brands:
-            print("[INFO] No brands found with unclustered embeddings. Done.")
-            return
-
-        for brand in brands:
+        pending = fetch_brands_with_new_embeddings(cur)
+        if brands is not None:
+            pending = [b for b in pending if b in set(brands)]
+        if not pending:
+            print("[INFO] No brands found with new embeddings. Done.")
+            return 0
+
+        for brand in pending:
             total_brands += 1
+            stage = stage_name(brand)
             try:
-                rows = fetch_embeddings_for_brand(cur, brand, FETCH_LIMIT_PER_BRAND)
-
-                if len(rows) < MIN_REVIEWS_PER_BRAND:
+                watermark = get_watermark(cur, stage)
+                # Every embedding at or below the embedding watermark was
+                # committed with it (later retries are enqueued to us), so
+                # ours may never pass it; rows above it are re-read next run
+                # and skipped by the review_clusters anti-join
+                cap = get_watermark(cur, EMBEDDING_STAGE)
+                retry_ids = fetch_due_retries(cur, stage, FETCH_LIMIT_PER_BRAND)
+                new_rows = fetch_embeddings_for_brand(
+                    cur, brand, watermark, FETCH_LIMIT_PER_BRAND
+                )
+                retry_rows = fetch_embeddings_by_ids(cur, retry_ids)
+                all_ids = np.concatenate([retry_rows.raw_ids, new_rows.raw_ids])
+                valid = np.concatenate([retry_rows.valid, new_rows.valid])
+
+                # Stored centroids keep cluster ids stable across runs; only
+                # a brand's first batch is fitted, and needs enough rows
+                stored = load_centroids(cur, brand) or bootstrap_centroids(cur, brand)
+                min_rows = MIN_REVIEWS_PER_BRAND if stored is None else 1
+
+                if len(all_ids) < min_rows:
+                    # Watermark stays put so these rows are picked up once
+                    # enough have accumulated
+                    conn.rollback()
                     total_skipped_brands += 1
-                    print(f"[INFO] Skipping brand='{brand}' (rows={len(rows)} < {MIN_REVIEWS_PER_BRAND})")
+                    print(f"[INFO] Skipping brand='{brand}' (rows={len(all_ids)} < {min_rows})")
                     continue
 
-                raw_ids: List[int] = []
-                vecs: List[np.ndarray] = []
-                bad = 0
+                raw_ids: List[int] = all_ids[valid].tolist()
+                bad_ids: List[int] = all_ids[~valid].tolist()
+                bad = len(bad_ids)
 
-                for rid, emb_bytes in rows:
-                    v = bytes_to_vec(emb_bytes)
-                    if v is None:
-                        bad += 1
-                        continue
-                    raw_ids.append(rid)
-                    vecs.append(v)
-
-                if len(vecs) < MIN_REVIEWS_PER_BRAND:
+                if len(raw_ids) < min_rows:
+                    # Undecodable rows are still recorded so they stop
+                    # counting towards this brand's backlog
+                    record_skips(cur, stage, bad_ids, "undecodable_embedding", CLUSTERING_MODEL_NAME)
+                    conn.commit()
                     total_skipped_brands += 1
-                    print(f"[INFO] Skipping brand='{brand}' after decode (valid={len(vecs)}, bad={bad})")
+                    total_skipped_rows += bad
+                    print(f"[INFO] Skipping brand='{brand}' after decode (valid={len(raw_ids)}, bad={bad})")
                     continue
 
-                X = np.vstack(vecs).astype(np.float32)
+                X = np.concatenate([retry_rows.vectors, new_rows.vectors])[valid]
 
                 # Normalize → cosine similarity via euclidean
                 Xn = normalize(X, norm="l2")
 
-                k = choose_k(len(Xn))
-                km = KMeans(
-                    n_clusters=k,
-                    random_state=42,
-                    n_init="auto",
-                )
-
-                labels = km.fit_predict(Xn)
-
-                out_rows = [(rid, int(lbl), CLUSTERING_MODEL_NAME) for rid, lbl in zip(raw_ids, labels)]
-
+                if stored is None:
+                    km = KMeans(
+                        n_clusters=choose_k(len(Xn)),
+                        random_state=42,
+                        n_init="auto",
+                    )
+                    with timer("model_fit_seconds", model="kmeans"):
+                        labels = km.fit_predict(Xn)
+                    cents = membership_centroids(Xn, labels)
+                    pos = np.searchsorted(cents.cluster_ids, labels)
+                    cand_X = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+                    cand_ids = cand_clusters = np.empty(0, dtype=np.int64)
+                else:
+                    pos = assign_nearest(Xn, stored.vectors)
+                    cents = fold_in(stored, pos, Xn)
+                    labels = stored.cluster_ids[pos]
+                    # Exemplars are the nearest of the cluster's current
+                    # exemplars and its new members to the moved centroid
+                    cand, cand_clusters = fetch_exemplar_candidates(
+                        cur, brand, sorted({int(c) for c in labels})
+                    )
+                    cand_ids, cand_clusters = cand.raw_ids[cand.valid], cand_clusters[cand.valid]
+                    cand_X = cand.vectors[cand.valid]
+                    if len(cand_X):
+                        cand_X = normalize(cand_X, norm="l2")
+
+                out_rows = [(rid, brand, int(lbl), CLUSTERING_MODEL_NAME) for rid, lbl in zip(raw_ids, labels)]
+
+                # Distances to each row's own (updated) centroid, nearest
+                # few per touched cluster
+                pool_X = np.concatenate([cand_X, Xn])
+                pool_ids = np.concatenate([cand_ids, np.asarray(raw_ids, dtype=np.int64)])
+                pool_pos = np.concatenate([np.searchsorted(cents.cluster_ids, cand_clusters), pos])
+                nearest, dist = nearest_to_centroid(pool_X, pool_pos, cents.vectors, EXEMPLAR_CANDIDATES)
+
+                # Output, centroids, retry bookkeeping and watermark commit together
                 insert_clusters(cur, out_rows)
+                save_centroids(cur, brand, cents)
+                write_exemplars(
+                    cur, brand, cents.cluster_ids[pool_pos[nearest]], pool_ids[nearest], dist, CLUSTERING_MODEL_NAME
+                )
+                record_skips(cur, stage, bad_ids, "undecodable_embedding", CLUSTERING_MODEL_NAME)
+                clear_retries(cur, stage, raw_ids)
+                if len(new_rows.raw_ids):
+                    advance_watermark(cur, stage, min(int(new_rows.raw_ids[-1]), cap))
                 conn.commit()
 
                 total_clustered_rows += len(out_rows)
+                total_skipped_rows += bad
 
                 print(
                     f"[INFO] brand='{brand}' clustered={len(out_rows)} "
-                    f"k={k} bad_vecs={bad}"
+                    f"k={len(cents.cluster_ids)} {'fit' if stored is None else 'assigned'} bad_vecs={bad}"
                 )
 
             except Exception as e:
                 conn.rollback()
+                count("brands_failed_total")
                 total_failed_brands += 1
                 print(f"[WARN] Brand clustering failed brand='{brand}'. Skipping. Error={e}")
 
+        skipped_ever = count_skips(cur, "clustering")
+
+        if total_clustered_rows and refresh_terms:
+            try:
+                refresh_top_terms(conn)
+            except Exception as e:
+                print(f"[WARN] Cluster top terms refresh failed. Error={e}")
+
     finally:
         cur.close()
-        conn.close()
+        if owns_conn:
+            conn.close()
 
     print(
         "[INFO] Clustering pipeline completed | "
         f"brands_seen={total_brands} skipped={total_skipped_brands} "
         f"failed={total_failed_brands} clustered_rows={total_clustered_rows}"
     )
+    print(f"[INFO] Permanently skipped rows | new={total_skipped_rows} total={skipped_ever}")
+    return total_clustered_rows
 
 
 if __name__ == "__main__":
-    main()
-import os
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cluster new review embeddings per brand")
+    parser.add_argument(
+        "--terms-only",
+        action="store_true",
+        help="Only recompute cluster_summaries.top_terms for every (brand, cluster)",
+    )
+    parser.add_argument(
+        "--exemplars-only",
+        action="store_true",
+        help="Only rebuild centroid-nearest exemplars for every (brand, cluster) from stored embeddings",
+    )
+    parser.add_argument(
+        "--refit",
+        action="store_true",
+        help="Refit KMeans on every clustered review per brand and relabel them (cluster ids change)",
+    )
+    parser.add_argument(
+        "--rebuild-daily-counts",
+        action="store_true",
+        help="Only rebuild cluster_daily_counts from review_clusters from scratch",
+    )
+    args = parser.parse_args()
+
+    if args.terms_only or args.exemplars_only or args.refit or args.rebuild_daily_counts:
+        if args.refit:
+            refit_clusters()
+        if args.terms_only:
+            refresh_top_terms()
+        if args.exemplars_only:
+            rebuild_exemplars()
+        if args.rebuild_daily_counts:
+            rebuild_daily_counts()
+    else:
+        main()
@@ -1,10 +1,12 @@
 import os
 import sys
 import math
+from functools import lru_cache
 from typing import List, Tuple, Optional
 
 import psycopg2
 import numpy as np
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 from sentence_transformers import SentenceTransformer
 
@@ -13,16 +15,30 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 from analytics.sentiment import normalize_text  # reuse same normalization
+from db.pipeline_state import (
+    HORIZON_WAIT_SECS,
+    advance_watermark,
+    capture_horizon,
+    clear_retries,
+    count_skips,
+    enqueue,
+    fetch_due_retries,
+    get_watermark,
+    read_cap,
+    record_failures,
+    record_skips,
+)
+from observability.instrument import InstrumentedConnection, count, staged, timer
 
 load_dotenv(os.path.join(ROOT, ".env"))
 
+STAGE_NAME = "embedding"
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 MIN_TOKENS = 1
 
 # Guardrails (not “fixed batch size for scale”, just safety caps)
 MAX_FETCH_ROWS = 2000
 MAX_EMBED_BATCH = 128
-COMMIT_EVERY = 256
 
 
 def token_count(text: str) -> int:
@@ -36,42 +52,151 @@ def connect():
         database=os.getenv("PGDATABASE"),
         user=os.getenv("PGUSER"),
         password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
     )
 
 
-def fetch_unembedded(cur, limit: int) -> List[Tuple[int, Optional[str]]]:
+# Rows: (raw_id, brand, body, normalized_text, token_count, content_hash)
+Row = Tuple[int, str, Optional[str], Optional[str], Optional[int], Optional[int]]
+
+
+def fetch_new(cur, after: int, limit: int) -> List[Row]:
+    # The NOT EXISTS probes are PK lookups bounded by raw_id > after, so
+    # this no longer grows with the size of review_embeddings.
     cur.execute(
         """
-        SELECT mr.raw_id, mr.body
+        SELECT mr.raw_id, mr.brand, mr.body, mr.normalized_text, mr.token_count, mr.content_hash
         FROM mentions_raw mr
-        LEFT JOIN review_embeddings re ON re.raw_id = mr.raw_id
-        WHERE re.raw_id IS NULL
+        WHERE mr.raw_id > %s
+          AND NOT EXISTS (
+              SELECT 1 FROM review_embeddings re WHERE re.raw_id = mr.raw_id
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM pipeline_retries pr
+              WHERE pr.stage = %s AND pr.raw_id = mr.raw_id
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM pipeline_skips ps
+              WHERE ps.stage = %s AND ps.raw_id = mr.raw_id
+                AND ps.model_version = %s
+          )
         ORDER BY mr.raw_id ASC
         LIMIT %s;
         """,
-        (limit,),
+        (after, STAGE_NAME, STAGE_NAME, EMBEDDING_MODEL_NAME, limit),
+    )
+    return cur.fetchall()
+
+
+def fetch_by_ids(cur, raw_ids: List[int]) -> List[Row]:
+    if not raw_ids:
+        return []
+    cur.execute(
+        """
+        SELECT raw_id, brand, body, normalized_text, token_count, content_hash
+        FROM mentions_raw
+        WHERE raw_id = ANY(%s::int[])
+        ORDER BY raw_id ASC;
+        """,
+        (raw_ids,),
     )
     return cur.fetchall()
 
 
-def insert_embeddings(cur, rows: List[Tuple[int, bytes, str]]):
-    cur.executemany(
+def insert_embeddings(cur, rows: List[Tuple[int, str, bytes, str]]):
+    if not rows:
+        return
+    execute_values(
+        cur,
         """
-        INSERT INTO review_embeddings (raw_id, embedding, embedding_model)
-        VALUES (%s, %s, %s)
+        INSERT INTO review_embeddings (raw_id, brand, embedding, embedding_model)
+        VALUES %s
         ON CONFLICT (raw_id) DO NOTHING;
         """,
         rows,
     )
 
 
-def main():
+@lru_cache(maxsize=1)
+def get_model() -> SentenceTransformer:
+    # Loaded once per process so the pipeline runner reuses a warm model
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def has_pending(cur) -> bool:
+    """Cheap probe used by the pipeline runner to skip an idle stage."""
+    watermark = get_watermark(cur, STAGE_NAME)
+    return bool(fetch_new(cur, watermark, 1) or fetch_due_retries(cur, STAGE_NAME, 1))
+
+
+def embed_rows(model, rows: List[Row]):
+    """
+    Returns (inserts, skipped_ids, failed) where failed maps raw_id -> error.
+    Rows sharing a content_hash are encoded once.
+    """
+    # key -> [(raw_id, brand)], in first-seen order
+    groups = {}
+    texts_by_key = {}
+    skipped: List[int] = []
+    for raw_id, brand, body, norm, tokens, chash in rows:
+        if norm is None:
+            # Ingested before migration 0009
+            norm = normalize_text(body or "")
+            tokens = token_count(norm)
+        if tokens < MIN_TOKENS:
+            skipped.append(raw_id)
+            continue
+        key = chash if chash is not None else norm
+        groups.setdefault(key, []).append((raw_id, brand))
+        texts_by_key[key] = norm
+
+    keys = list(groups)
+    count("duplicate_texts_total", len(rows) - len(skipped) - len(keys))
+    inserts: List[Tuple[int, str, bytes, str]] = []
+    failed = {}
+
+    num_batches = math.ceil(len(keys) / MAX_EMBED_BATCH)
+    for b in range(num_batches):
+        chunk = keys[b * MAX_EMBED_BATCH : (b + 1) * MAX_EMBED_BATCH]
+        texts = [texts_by_key[k] for k in chunk]
+
+        try:
+            with timer("model_forward_seconds", model="embedding"):
+                vecs = model.encode(
+                    texts,
+                    batch_size=min(32, len(texts)),
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=False,
+                )
+            vecs = np.asarray(vecs, dtype=np.float32)
+        except Exception as e:
+            print(f"[WARN] Batch embed failed (size={len(chunk)}). Parking for retry. Error={e}")
+            for k in chunk:
+                for raw_id, _ in groups[k]:
+                    failed[raw_id] = str(e)
+            continue
+
+        for k, v in zip(chunk, vecs):
+            blob = v.tobytes()
+            for raw_id, brand in groups[k]:
+                inserts.append((raw_id, brand, blob, EMBEDDING_MODEL_NAME))
+
+    return inserts, skipped, failed
+
+
+@staged(STAGE_NAME)
+def main(conn=None) -> int:
+    """
+    Embeds everything new since the watermark. Pass conn to reuse a shared
+    connection (it is left open). Returns the number of rows embedded.
+    """
     print(f"[INFO] Embedding pipeline starting | model={EMBEDDING_MODEL_NAME}")
-    print("[DEBUG] PGHOST =", os.getenv("PGHOST"))
-    print("[DEBUG] PGDATABASE =", os.getenv("PGDATABASE"))
-    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    model = get_model()
 
-    conn = connect()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
     cur = conn.cursor()
 
     total_seen = 0
@@ -79,98 +204,78 @@ def main():
     total_skipped = 0
     total_failed = 0
 
-    pending_inserts: List[Tuple[int, bytes, str]] = []
-
     try:
+        watermark = get_watermark(cur, STAGE_NAME)
+        # Watermarks only cover ids no open transaction can still commit;
+        # each read first takes the cap the watermark may reach with it
+        horizon = capture_horizon(cur)
+        cap, horizon = read_cap(cur, horizon, watermark, wait=HORIZON_WAIT_SECS)
+        after = watermark
+
         while True:
-            db_rows = fetch_unembedded(cur, MAX_FETCH_ROWS)
-            print("[DEBUG] fetched rows:", len(db_rows))
+            retry_ids = fetch_due_retries(cur, STAGE_NAME, MAX_EMBED_BATCH)
+            rows = fetch_new(cur, after, MAX_FETCH_ROWS)
+            retry_rows = fetch_by_ids(cur, retry_ids)
+            missing = set(retry_ids) - {r[0] for r in retry_rows}
 
-            non_null = sum(1 for _, body in db_rows if body)
-            print("[DEBUG] non-null bodies:", non_null)
+            if not rows and not retry_rows and not missing:
+                break
 
-            sample = next((body for _, body in db_rows if body), None)
-            print("[DEBUG] sample raw body:", repr(sample))
+            total_seen += len(rows) + len(retry_rows)
 
-            if not db_rows:
-                break
+            inserts, skipped, failed = embed_rows(model, retry_rows + rows)
+
+            # Retried rows sit below the clustering watermark; hand them over
+            retry_set = set(retry_ids)
+            late = {}
+            for raw_id, brand, _, _ in inserts:
+                if raw_id in retry_set:
+                    late.setdefault(brand, []).append(raw_id)
 
-            total_seen += len(db_rows)
-
-            filtered: List[Tuple[int, str]] = []
-            for raw_id, body in db_rows:
-                text = normalize_text(body or "")
-                if body and not text:
-                    print("[DEBUG] body wiped by normalize:", repr(body))
-                    total_skipped += 1
-                    continue
-                if token_count(text) < MIN_TOKENS:
-                    total_skipped += 1
-                    continue
-                filtered.append((raw_id, text))
-
-            if not filtered:
-                print("[INFO] No valid texts in this fetch window; continuing...")
-                continue
-
-            n = len(filtered)
-            num_batches = math.ceil(n / MAX_EMBED_BATCH)
-
-            for b in range(num_batches):
-                chunk = filtered[b * MAX_EMBED_BATCH : (b + 1) * MAX_EMBED_BATCH]
-                raw_ids = [x[0] for x in chunk]
-                texts = [x[1] for x in chunk]
-
-                try:
-                    vecs = model.encode(
-                        texts,
-                        batch_size=min(32, len(texts)),
-                        show_progress_bar=False,
-                        convert_to_numpy=True,
-                        normalize_embeddings=False,
-                    )
-                    vecs = np.asarray(vecs, dtype=np.float32)
-
-                    for rid, v in zip(raw_ids, vecs):
-                        pending_inserts.append((rid, v.tobytes(), EMBEDDING_MODEL_NAME))
-
-                except Exception as e:
-                    total_failed += len(chunk)
-                    print(f"[WARN] Batch embed failed (size={len(chunk)}). Skipping batch. Error={e}")
-                    continue
-
-                if len(pending_inserts) >= COMMIT_EVERY:
-                    try:
-                        insert_embeddings(cur, pending_inserts)
-                        conn.commit()
-                        total_inserted += len(pending_inserts)
-                        print(f"[INFO] Committed {len(pending_inserts)} embeddings | total_inserted={total_inserted}")
-                        pending_inserts = []
-                    except Exception as e:
-                        conn.rollback()
-                        total_failed += len(pending_inserts)
-                        print(f"[WARN] DB insert failed for a commit block. Skipping block. Error={e}")
-                        pending_inserts = []
-
-        if pending_inserts:
             try:
-                insert_embeddings(cur, pending_inserts)
+                insert_embeddings(cur, inserts)
+                record_skips(cur, STAGE_NAME, skipped, "empty_text", EMBEDDING_MODEL_NAME)
+                for raw_id, err in failed.items():
+                    record_failures(cur, STAGE_NAME, [raw_id], err)
+                clear_retries(
+                    cur,
+                    STAGE_NAME,
+                    [r[0] for r in inserts] + skipped + list(missing),
+                )
+                for brand, ids in late.items():
+                    enqueue(cur, f"clustering:{brand}", ids)
+                if rows:
+                    watermark = max(watermark, min(rows[-1][0], cap))
+                    advance_watermark(cur, STAGE_NAME, watermark)
                 conn.commit()
-                total_inserted += len(pending_inserts)
-                print(f"[INFO] Final commit {len(pending_inserts)} embeddings | total_inserted={total_inserted}")
-            except Exception as e:
+            except Exception:
                 conn.rollback()
-                total_failed += len(pending_inserts)
-                print(f"[WARN] Final DB insert failed. Error={e}")
+                raise
+
+            if rows:
+                after = rows[-1][0]
+            cap, horizon = read_cap(cur, horizon, cap)
+
+            count("rows_failed_total", len(failed))
+            count("rows_skipped_total", len(skipped))
+            total_inserted += len(inserts)
+            total_skipped += len(skipped)
+            total_failed += len(failed)
+            print(f"[INFO] Committed {len(inserts)} embeddings | total_inserted={total_inserted} watermark={watermark}")
+
+        skipped_ever = count_skips(cur, STAGE_NAME)
 
     finally:
         cur.close()
-        conn.close()
+        if owns_conn:
+            conn.close()
 
     print(
         "[INFO] Embedding pipeline completed | "
         f"seen={total_seen} inserted={total_inserted} skipped={total_skipped} failed={total_failed}"
     )
+    print(f"[INFO] Permanently skipped rows | new={total_skipped} total={skipped_ever}")
+    return total_inserted
 
 
 if __name__ == "__main__":
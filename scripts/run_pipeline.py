@@ -0,0 +1,259 @@
+"""
+Pipeline runner: every batch stage as one DAG in one process.
+
+    ingest ──┬── sentiment ── rollup ── anomalies
+             │        └───────────────┬── features
+             └── embedding ── clustering ── insights
+
+Independent stages (sentiment / embedding) run concurrently. All stages
+borrow connections from one pool (db/connection.py) and, because the stage
+modules are imported once, reuse already-loaded models across stages and
+across --interval rounds. A stage whose input has not changed is skipped:
+watermark stages ask their own has_pending(); downstream-only stages run
+when an upstream produced rows since their last successful run.
+
+Every stage outcome and its timing is written to pipeline_runs; stage
+metrics (observability/instrument.py) go to JSON logs and METRICS_TEXTFILE.
+
+Usage:
+    python scripts/run_pipeline.py                 # full DAG once
+    python scripts/run_pipeline.py --skip-ingest   # process what is already loaded
+    python scripts/run_pipeline.py --interval 900  # keep running, models stay warm
+"""
+
+import os
+import sys
+import time
+import uuid
+import argparse
+import importlib
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from db.connection import close_pool, pooled_connection
+from observability.instrument import count, event, write_textfile
+
+# How a stage decides it has nothing to do
+PROBE_ALWAYS = "always"      # external input (ingestion): always run
+PROBE_MODULE = "module"      # module.has_pending(cur)
+PROBE_UPSTREAM = "upstream"  # an upstream produced rows since our last ok run
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    module: str
+    deps: Tuple[str, ...] = ()
+    probe: str = PROBE_MODULE
+    kwargs: Dict = field(default_factory=dict)
+
+
+STAGES: List[Stage] = [
+    # Only reviews above each app's high-water mark; deep history is
+    # backfill_google_play.py's job
+    Stage("ingest", "scripts.backfill_google_play", probe=PROBE_ALWAYS,
+          kwargs={"resume": False}),
+    Stage("sentiment", "scripts.run_sentiment_pipeline", deps=("ingest",)),
+    Stage("embedding", "scripts.run_embedding_pipeline", deps=("ingest",)),
+    Stage("clustering", "scripts.run_clustering_pipeline", deps=("embedding",)),
+    Stage("rollup", "scripts.run_timeseries_rollup", deps=("sentiment",)),
+    Stage("anomalies", "scripts.run_anomaly_detection", deps=("rollup",), probe=PROBE_UPSTREAM),
+    Stage("insights", "scripts.run_cluster_insights", deps=("sentiment", "clustering"), probe=PROBE_UPSTREAM),
+    Stage("features", "scripts.build_feature_store", deps=("sentiment", "clustering")),
+]
+
+FAILED_STATES = ("failed", "upstream_failed")
+
+
+# ------------------------------------------------------------
+# RUN LOG
+# ------------------------------------------------------------
+def record_run(conn, run_id: str, stage: str, status: str, rows_out: Optional[int],
+               started_at: datetime, finished_at: datetime, duration_ms: int,
+               error: Optional[str] = None):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO pipeline_runs (
+                run_id, stage, status, rows_out,
+                started_at, finished_at, duration_ms, error
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+            """,
+            (run_id, stage, status, rows_out, started_at, finished_at, duration_ms, error),
+        )
+    conn.commit()
+
+
+def upstream_changed(cur, stage: Stage) -> bool:
+    cur.execute(
+        """
+        SELECT MAX(finished_at)
+        FROM pipeline_runs
+        WHERE stage = %s AND status = 'ok';
+        """,
+        (stage.name,),
+    )
+    last_ok = cur.fetchone()[0]
+    if last_ok is None:
+        return True
+
+    cur.execute(
+        """
+        SELECT EXISTS (
+            SELECT 1
+            FROM pipeline_runs
+            WHERE stage = ANY(%s)
+              AND status = 'ok'
+              AND rows_out > 0
+              AND finished_at > %s
+        );
+        """,
+        (list(stage.deps), last_ok),
+    )
+    return cur.fetchone()[0]
+
+
+# ------------------------------------------------------------
+# STAGE EXECUTION
+# ------------------------------------------------------------
+def has_input(conn, stage: Stage) -> bool:
+    if stage.probe == PROBE_ALWAYS:
+        return True
+    with conn.cursor() as cur:
+        if stage.probe == PROBE_UPSTREAM:
+            pending = upstream_changed(cur, stage)
+        else:
+            pending = importlib.import_module(stage.module).has_pending(cur)
+    conn.rollback()
+    return pending
+
+
+def run_stage(stage: Stage, run_id: str, force: bool) -> str:
+    started_at = datetime.now()
+    t0 = time.perf_counter()
+    rows_out = None
+    error = None
+
+    with pooled_connection() as conn:
+        try:
+            if not force and not has_input(conn, stage):
+                status = "skipped"
+            else:
+                module = importlib.import_module(stage.module)
+                rows_out = module.main(conn=conn, **stage.kwargs)
+                status = "ok"
+        except Exception:
+            conn.rollback()
+            status = "failed"
+            error = traceback.format_exc()
+
+        duration_ms = int((time.perf_counter() - t0) * 1000)
+        record_run(conn, run_id, stage.name, status, rows_out,
+                   started_at, datetime.now(), duration_ms, error)
+
+    count("pipeline_stage_runs_total", stage=stage.name, status=status)
+    print(f"[INFO] stage={stage.name} status={status} rows={rows_out} secs={duration_ms / 1000:.2f}")
+    if error:
+        print(f"[WARN] stage={stage.name} failed:\n{error}")
+    return status
+
+
+def run_dag(stages: List[Stage], force: bool = False, max_workers: int = 2) -> Dict[str, str]:
+    """
+    Runs stages as soon as their dependencies finish. Dependencies outside
+    `stages` (e.g. ingest with --skip-ingest) count as satisfied.
+    """
+    run_id = str(uuid.uuid4())
+    selected = {s.name for s in stages}
+    waiting = {s.name: s for s in stages}
+    status: Dict[str, str] = {}
+    running = {}
+
+    print(f"[INFO] Pipeline run starting | run_id={run_id} stages={[s.name for s in stages]}")
+    t0 = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while waiting or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, stage in list(waiting.items()):
+                    deps = [d for d in stage.deps if d in selected]
+                    if any(d not in status for d in deps):
+                        continue
+                    del waiting[name]
+                    progressed = True
+                    if any(status[d] in FAILED_STATES for d in deps):
+                        status[name] = "upstream_failed"
+                        count("pipeline_stage_runs_total", stage=name, status=status[name])
+                        now = datetime.now()
+                        with pooled_connection() as conn:
+                            record_run(conn, run_id, name, status[name], None, now, now, 0)
+                        print(f"[WARN] stage={name} not run: upstream failed")
+                        continue
+                    running[pool.submit(run_stage, stage, run_id, force)] = name
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                status[running.pop(fut)] = fut.result()
+
+    secs = time.perf_counter() - t0
+    print(
+        f"[INFO] Pipeline run completed | run_id={run_id} "
+        f"secs={secs:.2f} "
+        + " ".join(f"{s.name}={status[s.name]}" for s in stages)
+    )
+    event("pipeline_run_completed", run_id=run_id, secs=round(secs, 3), status=status)
+    write_textfile()
+    return status
+
+
+def select_stages(only: Optional[List[str]], skip_ingest: bool) -> List[Stage]:
+    names = {s.name for s in STAGES}
+    unknown = set(only or []) - names
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {sorted(unknown)}. Known: {sorted(names)}")
+
+    stages = [s for s in STAGES if not only or s.name in only]
+    if skip_ingest:
+        stages = [s for s in stages if s.name != "ingest"]
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the batch pipeline as a DAG")
+    parser.add_argument("--only", nargs="+", metavar="STAGE", help="Run only these stages")
+    parser.add_argument("--skip-ingest", action="store_true", help="Do not fetch new reviews")
+    parser.add_argument("--force", action="store_true", help="Run stages even if they look idle")
+    parser.add_argument("--workers", type=int, default=2, help="Stages run concurrently (default: %(default)s)")
+    parser.add_argument("--interval", type=int, default=0, help="Repeat every N seconds (0 = run once)")
+    args = parser.parse_args()
+
+    stages = select_stages(args.only, args.skip_ingest)
+
+    try:
+        while True:
+            status = run_dag(stages, force=args.force, max_workers=args.workers)
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    finally:
+        close_pool()
+
+    if any(s in FAILED_STATES for s in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
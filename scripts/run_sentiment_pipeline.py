@@ -1,75 +1,642 @@
-import psycopg2
-import os
-from dotenv import load_dotenv
-
 import os
 import sys
+import json
+import time
+import argparse
+import functools
+import multiprocessing as mp
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+import torch
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 
+from analytics import sentiment, toxicity
 from analytics.sentiment import (
+    SENTIMENT_MODEL,
+    VADER_MODEL,
+    CascadeThresholds,
+    cascade_route,
+    normalize_text,
     transformer_sentiment,
+    transformer_sentiment_batch,
+    vader_sentiment_batch,
     combine_sentiment,
     sentiment_label
 )
 from analytics.toxicity import toxicity_score, escalation_flag
+from analytics.versions import config_version
+from db.pipeline_state import (
+    HORIZON_WAIT_SECS,
+    advance_watermark,
+    capture_horizon,
+    clear_retries,
+    fetch_due_retries,
+    get_watermark,
+    read_cap,
+    record_failures,
+)
+from observability.instrument import InstrumentedConnection, count, observe, staged, timer
 
 load_dotenv()
 
-conn = psycopg2.connect(
-    host=os.getenv("PGHOST"),
-    port=os.getenv("PGPORT"),
-    database=os.getenv("PGDATABASE"),
-    user=os.getenv("PGUSER"),
-    password=os.getenv("PGPASSWORD"),
-)
-cur = conn.cursor()
-
-cur.execute("""
-    SELECT raw_id, body, rating
-    FROM mentions_raw
-    WHERE raw_id NOT IN (
-        SELECT raw_id FROM mentions_ml
-    );
-""")
-
-rows = cur.fetchall()
-print(f"[INFO] Processing {len(rows)} reviews")
-
-insert_q = """
-INSERT INTO mentions_ml (
-    raw_id,
-    sentiment_label,
-    sentiment_score,
-    toxicity_score,
-    escalation_score
-)
-VALUES (%s, %s, %s, %s, %s)
-ON CONFLICT (raw_id) DO NOTHING;
-"""
+STAGE_NAME = "sentiment"
+BATCH_SIZE = 256
+MODEL_BATCH_SIZE = 32
+
+# Worker-pool mode: max raw_id span per task handed to a worker. Small
+# enough that workers finish together, large enough to amortize the task
+# overhead.
+SHARD_SPAN = 20_000
+
+# Recompute mode: rows rescored and written per transaction
+RECOMPUTE_CHUNK = 2000
+
+# Bump when scoring changes in a way scoring_config() does not capture
+SCORING_REVISION = 1
+
+
+def cascade_from_env() -> CascadeThresholds:
+    return CascadeThresholds(
+        ambiguous_band=float(os.getenv("CASCADE_AMBIGUOUS_BAND", sentiment.CASCADE_AMBIGUOUS_BAND)),
+        max_rating_gap=float(os.getenv("CASCADE_MAX_RATING_GAP", sentiment.CASCADE_MAX_RATING_GAP)),
+    )
+
+
+# Cascade mode: VADER settles clear-cut reviews and only the rest go through
+# the transformer. Off unless SENTIMENT_CASCADE=true or --cascade.
+DEFAULT_CASCADE = cascade_from_env() if os.getenv("SENTIMENT_CASCADE", "false").lower() == "true" else None
+
+
+def scoring_config(cascade: Optional[CascadeThresholds] = None) -> dict:
+    """Everything besides the model that decides a mentions_ml row."""
+    config = {
+        "revision": SCORING_REVISION,
+        "text_weight": sentiment.TEXT_WEIGHT,
+        "rating_weight": sentiment.RATING_WEIGHT,
+        "label_threshold": sentiment.LABEL_THRESHOLD,
+        **toxicity.toxicity_config(),
+    }
+    if cascade is not None:
+        # Transformer-only rows keep their version when the cascade is added
+        config["cascade"] = dict(cascade._asdict(), vader_model=VADER_MODEL)
+    return config
+
+
+SCORING_CONFIG_VERSION = config_version(scoring_config())
+
+
+@functools.lru_cache(maxsize=None)
+def active_version(cascade: Optional[CascadeThresholds] = None) -> str:
+    return config_version(scoring_config(cascade))
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
 
-for raw_id, body, rating in rows:
-    text_score = transformer_sentiment(body)
+
+def fetch_new(cur, after: int, limit: int, upto: Optional[int] = None) -> List[Tuple]:
+    # raw_id > after keeps this a short range scan on the partial index
+    # idx_mentions_raw_unprocessed; parked retries are excluded so their
+    # backoff is respected. upto bounds a worker's shard.
+    upper = "AND mr.raw_id <= %s" if upto is not None else ""
+    cur.execute(
+        f"""
+        SELECT raw_id, created_utc, brand, body, rating, normalized_text, content_hash
+        FROM mentions_raw mr
+        WHERE mr.raw_id > %s
+          {upper}
+          AND NOT mr.ml_processed
+          AND NOT EXISTS (
+              SELECT 1 FROM pipeline_retries pr
+              WHERE pr.stage = %s AND pr.raw_id = mr.raw_id
+          )
+        ORDER BY mr.raw_id
+        LIMIT %s;
+        """,
+        (after,) + ((upto,) if upto is not None else ()) + (STAGE_NAME, limit),
+    )
+    return cur.fetchall()
+
+
+def fetch_by_ids(cur, raw_ids: List[int]) -> List[Tuple]:
+    if not raw_ids:
+        return []
+    cur.execute(
+        """
+        SELECT raw_id, created_utc, brand, body, rating, normalized_text, content_hash
+        FROM mentions_raw
+        WHERE raw_id = ANY(%s::int[])
+        ORDER BY raw_id;
+        """,
+        (raw_ids,),
+    )
+    return cur.fetchall()
+
+
+def score_row(text: str, rating, text_score: float = None):
+    """text is normalized; pass text_score to reuse a duplicate's model output."""
+    if text_score is None:
+        text_score = transformer_sentiment(text, normalized=True)
     final_score = combine_sentiment(text_score, rating)
-    tox = toxicity_score(body)
-    esc = escalation_flag(final_score, tox, body)
+    tox = toxicity_score(text, normalized=True)
+    esc = escalation_flag(final_score, tox, text, normalized=True)
+    return (
+        sentiment_label(final_score),
+        round(final_score, 3),
+        round(tox, 3),
+        float(esc),
+    )
+
+
+def score_rows(rows: List[Tuple],
+               cascade: Optional[CascadeThresholds] = None) -> Tuple[List[Tuple], Dict[int, str]]:
+    """
+    rows as returned by fetch_new / fetch_by_ids. Returns (results, failed),
+    failed mapping raw_id -> error. Identical texts go through the model
+    once, in MODEL_BATCH_SIZE forward passes. With a cascade, every text is
+    scored by VADER first and only the rows cascade_route() flags reach
+    the transformer; each result records the model that settled it.
+    """
+    texts = {}
+    prepared = []
+    for raw_id, created_utc, brand, body, rating, norm, chash in rows:
+        # Rows ingested before migration 0009 have no normalized_text
+        text = norm if norm is not None else normalize_text(body)
+        key = chash if chash is not None else text
+        texts.setdefault(key, text)
+        prepared.append((raw_id, created_utc, brand, rating, text, key))
+    count("duplicate_texts_total", len(prepared) - len(texts))
+
+    version = active_version(cascade)
+    routed = None
+    keys = list(texts)
+    if cascade is not None:
+        with timer("model_forward_seconds", model="vader"):
+            vader_scores = dict(zip(keys, vader_sentiment_batch([texts[k] for k in keys], normalized=True)))
+        routed = cascade_route(
+            [vader_scores[p[5]] for p in prepared], [p[3] for p in prepared], cascade
+        ).tolist()
+        keys = list(dict.fromkeys(p[5] for p, r in zip(prepared, routed) if r))
+        count("cascade_rows_total", sum(routed), route="transformer")
+        count("cascade_rows_total", len(routed) - sum(routed), route="vader")
 
+    text_scores = {}
+    try:
+        with timer("model_forward_seconds", model="sentiment"):
+            scores = transformer_sentiment_batch(
+                [texts[k] for k in keys], normalized=True, batch_size=MODEL_BATCH_SIZE
+            )
+        text_scores = dict(zip(keys, scores))
+    except Exception:
+        # One bad input fails the whole batch: score one by one to isolate it
+        for k in keys:
+            try:
+                text_scores[k] = transformer_sentiment(texts[k], normalized=True)
+            except Exception as e:
+                text_scores[k] = e
+
+    results = []
+    failed = {}
+    for i, (raw_id, created_utc, brand, rating, text, key) in enumerate(prepared):
+        if routed is not None and not routed[i]:
+            text_score, model = vader_scores[key], VADER_MODEL
+        else:
+            text_score, model = text_scores[key], SENTIMENT_MODEL
+        if isinstance(text_score, Exception):
+            failed[raw_id] = str(text_score)
+            continue
+        try:
+            results.append((raw_id, created_utc, brand) + score_row(text, rating, text_score) + (model, version))
+        except Exception as e:
+            failed[raw_id] = str(e)
+    return results, failed
+
+
+def register_config(cur, cascade: Optional[CascadeThresholds] = None):
+    """Records what a scoring config version stands for (first writer wins)."""
     cur.execute(
-        insert_q,
-        (
+        """
+        INSERT INTO scoring_configs (config_version, sentiment_model, config)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (config_version) DO NOTHING;
+        """,
+        (active_version(cascade), SENTIMENT_MODEL, json.dumps(scoring_config(cascade))),
+    )
+
+
+def write_results(cur, results: List[Tuple]):
+    """
+    results: [(raw_id, created_utc, brand, label, score, tox, esc, model, config)]
+    """
+    if not results:
+        return
+    execute_values(
+        cur,
+        """
+        INSERT INTO mentions_ml (
             raw_id,
-            sentiment_label(final_score),
-            round(final_score, 3),
-            round(tox, 3),
-            float(esc),
-        ),
+            brand,
+            sentiment_label,
+            sentiment_score,
+            toxicity_score,
+            escalation_score,
+            sentiment_model,
+            scoring_config
+        )
+        VALUES %s
+        ON CONFLICT (raw_id) DO NOTHING;
+        """,
+        [(r[0], r[2], r[3], r[4], r[5], r[6], r[7], r[8]) for r in results],
+    )
+    execute_values(
+        cur,
+        """
+        UPDATE mentions_raw mr
+        SET ml_processed = TRUE
+        FROM (VALUES %s) AS v(raw_id, created_utc)
+        WHERE mr.raw_id = v.raw_id
+          AND mr.created_utc = v.created_utc;
+        """,
+        [(r[0], r[1]) for r in results],
     )
 
-conn.commit()
-cur.close()
-conn.close()
 
-print("[INFO] Sentiment pipeline completed")
+def has_pending(cur) -> bool:
+    """Cheap probe used by the pipeline runner to skip an idle stage."""
+    watermark = get_watermark(cur, STAGE_NAME)
+    return bool(fetch_new(cur, watermark, 1) or fetch_due_retries(cur, STAGE_NAME, 1))
+
+
+# ------------------------------------------------------------
+# WORKER POOL
+# ------------------------------------------------------------
+_worker_conn = None
+_worker_cascade = None
+
+
+def _init_worker(threads: int, cascade: Optional[CascadeThresholds]):
+    # Spawned, so this process imported analytics.sentiment (the model) once
+    global _worker_conn, _worker_cascade
+    torch.set_num_threads(threads)
+    _worker_conn = connect()
+    _worker_cascade = cascade
+
+
+def score_shard(shard: Tuple[int, int]) -> dict:
+    """
+    Worker task: scores unprocessed rows with lo < raw_id <= hi and commits
+    them (and their failures) on the worker's own connection, batch by batch.
+    """
+    lo, hi = shard
+    conn = _worker_conn
+    t0 = time.perf_counter()
+    scored = 0
+    failed = 0
+
+    with conn.cursor() as cur:
+        after = lo
+        while True:
+            rows = fetch_new(cur, after, BATCH_SIZE, upto=hi)
+            if not rows:
+                break
+
+            results, failures = score_rows(rows, _worker_cascade)
+            try:
+                write_results(cur, results)
+                for raw_id, err in failures.items():
+                    record_failures(cur, STAGE_NAME, [raw_id], err)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            after = rows[-1][0]
+            scored += len(results)
+            failed += len(failures)
+
+    return {"lo": lo, "hi": hi, "scored": scored, "failed": failed, "secs": time.perf_counter() - t0}
+
+
+def fetch_max_raw_id(cur) -> int:
+    cur.execute("SELECT COALESCE(MAX(raw_id), 0) FROM mentions_raw;")
+    return cur.fetchone()[0]
+
+
+def run_sharded(after: int, upto: int, workers: int,
+                cascade: Optional[CascadeThresholds] = None) -> Tuple[int, int]:
+    """
+    Scores (after, upto] on `workers` processes, each with an equal share of
+    the host's cores for torch. Returns (scored, failed).
+    """
+    # At least a few shards per worker so a small backlog still spreads out
+    span = max(1, min(SHARD_SPAN, -(-(upto - after) // (workers * 4))))
+    shards = [(lo, min(lo + span, upto)) for lo in range(after, upto, span)]
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(
+        f"[INFO] Sharding raw_id ({after}, {upto}] | shards={len(shards)} "
+        f"workers={workers} torch_threads={threads}"
+    )
+
+    scored = 0
+    failed = 0
+    # spawn, not fork: forking a process that already ran torch can deadlock
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(threads, cascade)) as pool:
+        for done, res in enumerate(pool.imap_unordered(score_shard, shards), start=1):
+            scored += res["scored"]
+            failed += res["failed"]
+            observe("shard_seconds", res["secs"])
+            print(
+                f"[INFO] Shard ({res['lo']}, {res['hi']}] scored={res['scored']} failed={res['failed']} "
+                f"secs={res['secs']:.1f} | shards={done}/{len(shards)} total_scored={scored}"
+            )
+
+    count("rows_failed_total", failed)
+    return scored, failed
+
+
+# ------------------------------------------------------------
+# RECOMPUTE
+# ------------------------------------------------------------
+def fetch_version_counts(cur) -> List[Tuple]:
+    cur.execute(
+        """
+        SELECT sentiment_model, scoring_config, COUNT(*)
+        FROM mentions_ml
+        GROUP BY sentiment_model, scoring_config
+        ORDER BY COUNT(*) DESC;
+        """
+    )
+    return cur.fetchall()
+
+
+def update_results(cur, results: List[Tuple]):
+    """Overwrites existing scores; processed_at moves so the rollup picks them up."""
+    if not results:
+        return
+    execute_values(
+        cur,
+        """
+        UPDATE mentions_ml ml
+        SET sentiment_label = v.sentiment_label,
+            sentiment_score = v.sentiment_score,
+            toxicity_score = v.toxicity_score,
+            escalation_score = v.escalation_score,
+            sentiment_model = v.sentiment_model,
+            scoring_config = v.scoring_config,
+            processed_at = NOW()
+        FROM (VALUES %s) AS v(
+            raw_id, sentiment_label, sentiment_score, toxicity_score,
+            escalation_score, sentiment_model, scoring_config
+        )
+        WHERE ml.raw_id = v.raw_id;
+        """,
+        [(r[0], r[3], r[4], r[5], r[6], r[7], r[8]) for r in results],
+        template="(%s, %s, %s::numeric, %s::numeric, %s::numeric, %s, %s)",
+        page_size=len(results),
+    )
+
+
+@staged("sentiment_recompute")
+def recompute(conn=None, chunk_size: int = RECOMPUTE_CHUNK, limit: Optional[int] = None,
+              cascade: Optional[CascadeThresholds] = DEFAULT_CASCADE) -> int:
+    """
+    Rescores rows whose sentiment_model / scoring_config differ from the
+    current ones (NULL = scored before versions were tracked), newest
+    reviews first, committing every chunk_size rows. Safe to stop and rerun:
+    finished rows are no longer stale. Returns the number of rows rescored.
+    In cascade mode rows settled by either model are current.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+
+    with conn.cursor() as cur:
+        register_config(cur, cascade)
+        versions = fetch_version_counts(cur)
+    conn.commit()
+
+    version = active_version(cascade)
+    models = [SENTIMENT_MODEL] + ([VADER_MODEL] if cascade is not None else [])
+
+    def is_current(model, cfg):
+        return model in models and cfg == version
+
+    stale = sum(n for model, cfg, n in versions if not is_current(model, cfg))
+    print(f"[INFO] Sentiment recompute | current model={'+'.join(models)} config={version}")
+    for model, cfg, n in versions:
+        print(f"[INFO]   model={model} config={cfg} rows={n}{' (current)' if is_current(model, cfg) else ''}")
+
+    target = min(stale, limit) if limit is not None else stale
+    total = 0
+    total_failed = 0
+    if target:
+        # WITH HOLD: the ordered stale set survives the per-chunk commits,
+        # so it is sorted once instead of re-queried per chunk
+        reader = conn.cursor(name="sentiment_recompute", withhold=True)
+        reader.itersize = chunk_size
+        writer = conn.cursor()
+        try:
+            reader.execute(
+                """
+                SELECT mr.raw_id, mr.created_utc, mr.brand, mr.body, mr.rating,
+                       mr.normalized_text, mr.content_hash
+                FROM mentions_ml ml
+                JOIN mentions_raw mr ON mr.raw_id = ml.raw_id
+                WHERE NOT COALESCE(ml.sentiment_model = ANY(%s) AND ml.scoring_config = %s, FALSE)
+                ORDER BY mr.created_utc DESC, mr.raw_id DESC
+                LIMIT %s;
+                """,
+                (models, version, limit),
+            )
+            while True:
+                rows = reader.fetchmany(chunk_size)
+                if not rows:
+                    break
+
+                results, failed = score_rows(rows, cascade)
+                try:
+                    update_results(writer, results)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+
+                count("rows_failed_total", len(failed))
+                total += len(results)
+                total_failed += len(failed)
+                print(
+                    f"[INFO] Recomputed {len(results)} scores | total={total}/{target} "
+                    f"failed={total_failed} reached={rows[-1][1]}"
+                )
+        finally:
+            writer.close()
+            reader.close()
+            conn.commit()
+            if owns_conn:
+                conn.close()
+    elif owns_conn:
+        conn.close()
+
+    print(f"[INFO] Sentiment recompute completed | rescored={total} failed={total_failed} stale_before={stale}")
+    return total
+
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+@staged(STAGE_NAME)
+def main(conn=None, workers: int = 1, cascade: Optional[CascadeThresholds] = DEFAULT_CASCADE) -> int:
+    """
+    Scores everything new since the watermark. Pass conn to reuse a shared
+    connection (it is left open). workers > 1 first scores the backlog up
+    to the current max raw_id on a process pool, then finishes retries and
+    late arrivals in this process. cascade=None scores every row with the
+    transformer. Returns the number of rows scored.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    cur = conn.cursor()
+
+    total_scored = 0
+    total_failed = 0
+    total_retried = 0
+
+    try:
+        register_config(cur, cascade)
+        conn.commit()
+        watermark = get_watermark(cur, STAGE_NAME)
+        print(
+            f"[INFO] Sentiment pipeline starting | watermark={watermark} workers={workers} "
+            f"config={active_version(cascade)} cascade={tuple(cascade) if cascade else 'off'}"
+        )
+
+        # The watermark only ever covers ids no open transaction can still
+        # commit (db/pipeline_state.py), so scanning from it misses nothing;
+        # the per-run read cursor then only moves forward. Each read first
+        # takes the cap the watermark may reach with it.
+        horizon = capture_horizon(cur)
+        cap, horizon = read_cap(cur, horizon, watermark, wait=HORIZON_WAIT_SECS)
+        after = watermark
+
+        if workers > 1:
+            upto = fetch_max_raw_id(cur)
+            conn.rollback()
+            if upto > after:
+                total_scored, total_failed = run_sharded(after, upto, workers, cascade)
+                # Every shard committed (a failed shard raises above), so the
+                # whole range has been scanned; its reads all started after
+                # the cap was taken
+                watermark = max(watermark, min(upto, cap))
+                advance_watermark(cur, STAGE_NAME, watermark)
+                conn.commit()
+                after = upto
+            cap, horizon = read_cap(cur, horizon, cap)
+
+        while True:
+            retry_ids = fetch_due_retries(cur, STAGE_NAME, BATCH_SIZE)
+            rows = fetch_new(cur, after, BATCH_SIZE)
+            retry_rows = fetch_by_ids(cur, retry_ids)
+            # Source row gone (e.g. partition dropped): nothing left to retry
+            missing = set(retry_ids) - {r[0] for r in retry_rows}
+
+            if not rows and not retry_rows and not missing:
+                break
+
+            results, failed = score_rows(retry_rows + rows, cascade)
+
+            try:
+                write_results(cur, results)
+                for raw_id, err in failed.items():
+                    record_failures(cur, STAGE_NAME, [raw_id], err)
+                clear_retries(cur, STAGE_NAME, [r[0] for r in results] + list(missing))
+                if rows:
+                    watermark = max(watermark, min(rows[-1][0], cap))
+                    advance_watermark(cur, STAGE_NAME, watermark)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            if rows:
+                after = rows[-1][0]
+            cap, horizon = read_cap(cur, horizon, cap)
+
+            count("rows_failed_total", len(failed))
+            total_scored += len(results)
+            total_failed += len(failed)
+            total_retried += len(retry_rows)
+            print(f"[INFO] Committed {len(results)} scores | watermark={watermark} failed={len(failed)}")
+
+    finally:
+        cur.close()
+        if owns_conn:
+            conn.close()
+
+    print(
+        "[INFO] Sentiment pipeline completed | "
+        f"scored={total_scored} failed={total_failed} retried={total_retried}"
+    )
+    return total_scored
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score new reviews for sentiment and toxicity")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Scoring processes for large backlogs; each loads the model once (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--recompute",
+        action="store_true",
+        help="Rescore rows produced by another model or scoring config, newest first",
+    )
+    parser.add_argument("--limit", type=int, help="With --recompute: stop after this many rows")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=RECOMPUTE_CHUNK,
+        help="With --recompute: rows per transaction (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        default=DEFAULT_CASCADE is not None,
+        help="Score with VADER first and send only ambiguous or rating-disagreeing reviews to the transformer",
+    )
+    parser.add_argument(
+        "--ambiguous-band",
+        type=float,
+        default=cascade_from_env().ambiguous_band,
+        help="With --cascade: |VADER| below this goes to the transformer (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-rating-gap",
+        type=float,
+        default=cascade_from_env().max_rating_gap,
+        help="With --cascade: max |VADER - rating| on [-1, 1] before it goes to the transformer (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    cascade = CascadeThresholds(args.ambiguous_band, args.max_rating_gap) if args.cascade else None
+    if args.recompute:
+        recompute(chunk_size=args.chunk_size, limit=args.limit, cascade=cascade)
+    else:
+        main(workers=args.workers, cascade=cascade)
@@ -0,0 +1,207 @@
+"""
+Daily sentiment rollup (sentiment_timeseries)
+
+Purpose:
+- Maintain one row per (brand, date) with mention volume and average
+  sentiment / toxicity, so the UI reads trends without raw joins
+- Incremental by default: only (brand, date) partitions touched since the
+  last watermark on mentions_ml.processed_at are recomputed
+- --full rebuilds every partition from scratch
+
+Run AFTER:
+- ingestion
+- sentiment
+"""
+
+import os
+import sys
+import argparse
+
+import psycopg2
+from dotenv import load_dotenv
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from db.pipeline_state import get_watermark_ts, processed_at_cap, set_watermark_ts
+from observability.instrument import InstrumentedConnection, staged
+
+load_dotenv(os.path.join(ROOT, ".env"))
+
+STAGE_NAME = "sentiment_timeseries"
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        port=os.getenv("PGPORT"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        connection_factory=InstrumentedConnection,
+    )
+
+
+# ------------------------------------------------------------
+# WATERMARK
+# ------------------------------------------------------------
+def fetch_latest_processed_at(cur):
+    # Served by idx_mentions_ml_processed (backward index scan, one row)
+    cur.execute("SELECT MAX(processed_at) FROM mentions_ml;")
+    return cur.fetchone()[0]
+
+
+# ------------------------------------------------------------
+# ROLLUP
+# ------------------------------------------------------------
+_UPSERT_TAIL = """
+ON CONFLICT (brand, date) DO UPDATE
+SET mention_count       = EXCLUDED.mention_count,
+    avg_sentiment_score = EXCLUDED.avg_sentiment_score,
+    avg_toxicity_score  = EXCLUDED.avg_toxicity_score,
+    updated_at          = NOW();
+"""
+
+
+def rollup_touched(cur, since, until) -> int:
+    """
+    Recompute only the (brand, date) partitions that received newly scored
+    rows in (since, until]. Each partition is re-aggregated in full from
+    mentions_raw via idx_mentions_brand_time, so the cost is proportional to
+    the number of touched days, not to total history.
+    """
+    cur.execute(
+        """
+        WITH touched AS (
+            SELECT DISTINCT
+                r.brand,
+                r.created_utc::date AS day
+            FROM mentions_ml m
+            JOIN mentions_raw r ON r.raw_id = m.raw_id
+            WHERE m.processed_at > %s
+              AND m.processed_at <= %s
+        )
+        INSERT INTO sentiment_timeseries (
+            brand,
+            date,
+            mention_count,
+            avg_sentiment_score,
+            avg_toxicity_score
+        )
+        SELECT
+            t.brand,
+            t.day,
+            COUNT(*),
+            AVG(m.sentiment_score),
+            AVG(m.toxicity_score)
+        FROM touched t
+        JOIN mentions_raw r
+            ON r.brand = t.brand
+           AND r.created_utc >= t.day
+           AND r.created_utc < t.day + 1
+        LEFT JOIN mentions_ml m ON m.raw_id = r.raw_id
+        GROUP BY t.brand, t.day
+        """ + _UPSERT_TAIL,
+        (since, until),
+    )
+    return cur.rowcount
+
+
+def rollup_all(cur) -> int:
+    cur.execute(
+        """
+        INSERT INTO sentiment_timeseries (
+            brand,
+            date,
+            mention_count,
+            avg_sentiment_score,
+            avg_toxicity_score
+        )
+        SELECT
+            r.brand,
+            r.created_utc::date,
+            COUNT(*),
+            AVG(m.sentiment_score),
+            AVG(m.toxicity_score)
+        FROM mentions_raw r
+        LEFT JOIN mentions_ml m ON m.raw_id = r.raw_id
+        GROUP BY r.brand, r.created_utc::date
+        """ + _UPSERT_TAIL
+    )
+    return cur.rowcount
+
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def has_pending(cur) -> bool:
+    """Cheap probe used by the pipeline runner to skip an idle stage."""
+    until = fetch_latest_processed_at(cur)
+    watermark = get_watermark_ts(cur, STAGE_NAME)
+    return until is not None and (watermark is None or watermark < until)
+
+
+@staged(STAGE_NAME)
+def main(full: bool = False, conn=None) -> int:
+    """
+    Pass conn to reuse a shared connection (it is left open).
+    Returns the number of (brand, date) partitions upserted.
+    """
+    print(f"[INFO] Timeseries rollup starting | mode={'full' if full else 'incremental'}")
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect()
+    cur = conn.cursor()
+
+    try:
+        # processed_at is a writer's transaction start: the watermark stops
+        # short of any transaction still open, and the rows above it are
+        # re-read next run (the upsert is idempotent)
+        cap = processed_at_cap(cur)
+        until = fetch_latest_processed_at(cur)
+        if until is None:
+            print("[INFO] No scored mentions yet. Done.")
+            return 0
+
+        watermark = None if full else get_watermark_ts(cur, STAGE_NAME)
+
+        if watermark is None:
+            upserted = rollup_all(cur)
+        elif watermark >= until:
+            print(f"[INFO] Nothing new since watermark={watermark}. Done.")
+            return 0
+        else:
+            upserted = rollup_touched(cur, watermark, until)
+
+        # Rollup and watermark land in the same transaction
+        watermark = min(until, cap)
+        set_watermark_ts(cur, STAGE_NAME, watermark)
+        conn.commit()
+
+        print(
+            "[INFO] Timeseries rollup completed | "
+            f"partitions_upserted={upserted} watermark={watermark}"
+        )
+        return upserted
+
+    except Exception:
+        conn.rollback()
+        raise
+
+    finally:
+        cur.close()
+        if owns_conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll up daily sentiment per brand")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rebuild every (brand, date) partition and reset the watermark",
+    )
+    args = parser.parse_args()
+    main(full=args.full)